@@ -1,18 +1,66 @@
+import asyncio
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Callable, Awaitable
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.core.config import settings, logger
-from app.core.state import ResearchState
+from app.core.state import ResearchState, APPEND_FIELDS, progress_log_for
+from app.core.routing import route_questions, question_concurrency
+from app.core.llm import CachedChatModel, llm_cache_enabled_for
+from app.core.llm_clients import shared_chat_model
+from app.core.events import artifact_streams
+from app.core.metrics import AGENT_ERRORS, NODE_DURATION, current_agent
+from app.utils.tokens import TokenBudget, agent_token_cap
+
+
+class AgentError(Exception):
+    """
+    An agent node failed. Raised out of the graph so the run stops there and
+    can be resumed from its last checkpoint.
+    """
+
 
 class BaseAgent(ABC):
-    def __init__(self, model_name: str = None):
+    # Graph node name used when routing research questions to this agent
+    role: Optional[str] = None
+
+    def __init__(self, model_name: str = None, use_cache: Optional[bool] = None):
         self.model_name = model_name or settings.OPENAI_MODEL_NAME
-        self.llm = ChatOpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            model=self.model_name,
-            temperature=0.7
-        )
+        # LLM memoization is opt-in (LLM_CACHE_ENABLED / LLM_CACHE_AGENTS) and
+        # forces a deterministic temperature so cached answers are reproducible
+        self.use_cache = llm_cache_enabled_for(self.agent_name) if use_cache is None else use_cache
+        self.temperature = settings.LLM_CACHE_TEMPERATURE if self.use_cache else 0.7
+        self.llm = self.build_llm(self.model_name)
+
+    def build_llm(self, model_name: str) -> Any:
+        """
+        Chat model with this agent's temperature and caching; agents that use a
+        second (e.g. cheaper) model build it through here too. The underlying
+        client is shared process-wide (see app.core.llm_clients).
+        """
+        llm = shared_chat_model(ChatOpenAI, model_name, self.temperature)
+        if self.use_cache:
+            llm = CachedChatModel(llm, model_name, self.temperature)
+        return llm
+
+    def token_budget(self, weight: float = 1.0, model_name: str = None) -> TokenBudget:
+        """
+        Prompt budget for one LLM call: the model's context window less the
+        output reserve, capped by this agent's AGENT_TOKEN_BUDGETS entry and
+        scaled by weight (see app.utils.tokens.priority_weight).
+        """
+        return TokenBudget(model_name or self.model_name, agent_token_cap(self.agent_name), weight)
+
+    @property
+    def agent_name(self) -> str:
+        """
+        Snake-case name used in settings, e.g. ResearchPlannerAgent -> research_planner.
+        """
+        name = re.sub(r"Agent$", "", self.__class__.__name__)
+        name = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1_\2", name)
+        return re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name).lower()
 
     @abstractmethod
     async def invoke(self, state: ResearchState) -> ResearchState:
@@ -22,19 +70,119 @@ class BaseAgent(ABC):
         """
         pass
 
-    async def run_agent(self, state: ResearchState) -> ResearchState:
+    def assigned_questions(self, state: ResearchState) -> List[Dict[str, Any]]:
+        """
+        Questions this agent should handle: the single question dispatched to it
+        by the graph, or its share of the research plan when called directly.
+        """
+        if state.get("question"):
+            return [state["question"]]
+        return route_questions(state.get("research_plan")).get(self.role, [])
+
+    async def map_questions(
+        self,
+        state: ResearchState,
+        questions: List[Dict[str, Any]],
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ) -> List[Any]:
+        """
+        Runs handler for each question concurrently, capped by the run's limit.
+        Results keep the order of questions.
+        """
+        semaphore = asyncio.Semaphore(question_concurrency(state.get("customization")))
+
+        async def bounded(q):
+            async with semaphore:
+                return await handler(q)
+
+        return await asyncio.gather(*(bounded(q) for q in questions))
+
+    async def generate_text(self, state: ResearchState, messages: List[Any], field: str) -> str:
+        """
+        Runs the LLM and returns the full text. Within a tracked run the tokens
+        are also streamed to /research/{id}/stream/{field} as they arrive;
+        the returned text is the same either way.
+        """
+        research_id = (state.get("metadata") or {}).get("research_id")
+        if not research_id or not settings.STREAM_TOKENS:
+            response = await self.llm.ainvoke(messages)
+            return response.content
+
+        parts = []
+        artifact_streams.open(research_id, field)
+        try:
+            async for chunk in self.llm.astream(messages):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                if text:
+                    parts.append(text)
+                    artifact_streams.append(research_id, field, text)
+        finally:
+            artifact_streams.close(research_id, field)
+        return "".join(parts)
+
+    async def run_agent(self, state: ResearchState) -> Dict[str, Any]:
         """
         Wrapper method to handle logging and error management.
+
+        Agents mutate a private working copy of the state; only the changes are
+        returned so that the graph reducers can merge parallel branches.
         """
         agent_name = self.__class__.__name__
         logger.info(f"Starting execution of {agent_name}")
-        
+
+        working = self._working_copy(state)
+        # LLM calls made by this node are attributed to it in /metrics
+        agent_token = current_agent.set(self.agent_name)
+        start = time.perf_counter()
         try:
-            result = await self.invoke(state)
+            result = await self.invoke(working)
             logger.info(f"Constructed new state from {agent_name}")
-            return result
+            delta = self._state_delta(state, result if result is not None else working)
         except Exception as e:
             logger.error(f"Error in {agent_name}: {str(e)}")
-            state["errors"].append(f"{agent_name}: {str(e)}")
-            state["status"] = "failed"
-            return state
+            NODE_DURATION.labels(self.agent_name, "failed").observe(time.perf_counter() - start)
+            # Errors recorded before the exception, plus the exception itself
+            AGENT_ERRORS.labels(self.agent_name).inc(len(working["errors"]) - len(state.get("errors") or []) + 1)
+            # Letting the graph run on would finish the run and drop its checkpoints;
+            # run_graph marks it as errored and it can be resumed from this node
+            raise AgentError(f"{agent_name}: {str(e)}") from e
+        finally:
+            current_agent.reset(agent_token)
+        NODE_DURATION.labels(self.agent_name, "ok").observe(time.perf_counter() - start)
+        if delta.get("errors"):
+            AGENT_ERRORS.labels(self.agent_name).inc(len(delta["errors"]))
+
+        progress_log = progress_log_for(delta, self.agent_name)
+        if progress_log:
+            delta["progress_log"] = progress_log
+        return delta
+
+    @staticmethod
+    def _working_copy(state: ResearchState) -> Dict[str, Any]:
+        working = dict(state)
+        for field in APPEND_FIELDS:
+            working[field] = list(state.get(field) or [])
+        working["metadata"] = dict(state.get("metadata") or {})
+        return working
+
+    @staticmethod
+    def _state_delta(original: ResearchState, updated: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Computes the update a node should return: new items for appended lists,
+        changed keys for metadata and changed values for everything else.
+        """
+        delta: Dict[str, Any] = {}
+        for key, value in updated.items():
+            if key in APPEND_FIELDS:
+                previous = original.get(key) or []
+                added = list(value or [])[len(previous):]
+                if added:
+                    delta[key] = added
+            elif key == "metadata":
+                previous = original.get("metadata") or {}
+                changed = {k: v for k, v in (value or {}).items() if k not in previous or previous[k] is not v}
+                if changed:
+                    delta["metadata"] = changed
+            elif key not in original or original[key] is not value:
+                delta[key] = value
+        return delta
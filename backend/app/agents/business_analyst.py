@@ -1,9 +1,15 @@
+from typing import Dict, Any, Optional
+from langchain_core.messages import HumanMessage
 from app.agents.base import BaseAgent
+from app.core.search import run_search
 from app.core.state import ResearchState
 from app.core.config import logger
+from app.utils.tokens import priority_weight
 from langchain_community.tools import DuckDuckGoSearchRun
 
 class BusinessAnalystAgent(BaseAgent):
+    role = "business_analyst"
+
     def __init__(self, model_name: str = None):
         super().__init__(model_name)
         self.search_tool = DuckDuckGoSearchRun()
@@ -12,80 +18,68 @@ class BusinessAnalystAgent(BaseAgent):
         logger.info("Business Analyst: Analyzing market and business implications")
         
         research_plan = state.get("research_plan")
-        if not research_plan:
+        if not research_plan and not state.get("question"):
             return state
             
-        questions = research_plan.get("questions", [])
-        
-        # Filter questions assigned to business_analyst
-        my_questions = [
-            q for q in questions 
-            if q.get("assigned_agent") == "business_analyst"
-            or q.get("category") in ["business", "market", "industry"]
-        ]
+        # Each question is routed to exactly one agent (see app.core.routing)
+        my_questions = self.assigned_questions(state)
         
-        # Remove duplicates
-        seen_ids = set()
-        unique_questions = []
-        for q in my_questions:
-            if q["id"] not in seen_ids:
-                unique_questions.append(q)
-                seen_ids.add(q["id"])
-        
-        if not unique_questions:
+        if not my_questions:
             logger.info("No business questions found.")
             return state
 
-        findings = []
-        
-        for q in unique_questions:
-            question_text = q["question"]
-            # Enhance query for business focus
-            search_query = f"{question_text} market size revenue trends business impact"
-            logger.info(f"Business Research: {search_query}")
-            
-            try:
-                state["progress_updates"].append(f"Business Analyst: Analyzing market data for {question_text}...")
-                
-                # Async search with timeout
-                import asyncio
-                results = await asyncio.wait_for(
-                    asyncio.to_thread(self.search_tool.invoke, search_query),
-                    timeout=15.0
-                )
-                
-                # Use LLM to analyze the business findings
-                analysis_prompt = f"""
-                You are a Strategic Business Analyst (MBA/McKinsey style).
-                Analyze these search results regarding: "{question_text}"
-                
-                Search Results:
-                {results}
-                
-                Provide a strategic insight (SWOT, Market Size, CAGR, or Competitive Landscape).
-                """
-                
-                analysis_response = await self.llm.ainvoke([HumanMessage(content=analysis_prompt)])
-                analyzed_content = analysis_response.content
-                
-                findings.append({
-                    "question_id": q["id"],
-                    "question": question_text,
-                    "content": analyzed_content,
-                    "raw_content": results,
-                    "source": "Business Analyst Agent",
-                    "type": "market_analysis",
-                    "url": "https://bloomberg.com" # Placeholder
-                })
-                
-                state["progress_updates"].append(f"Business Insight generated: {question_text}")
-                
-            except Exception as e:
-                logger.error(f"Error in Business Analyst for {question_text}: {e}")
-                state["errors"].append(f"Business Analyst Error: {e}")
+        results = await self.map_questions(state, my_questions, lambda q: self.analyze_question(q, state))
+        findings = [f for f in results if f]
 
         current_findings = state.get("business_findings", [])
         state["business_findings"] = current_findings + findings
         state["progress_updates"].append("Business Analysis phase finished.")
         
         return state
+
+    async def analyze_question(self, q: Dict[str, Any], state: ResearchState) -> Optional[Dict[str, Any]]:
+        question_text = q["question"]
+        # Enhance query for business focus
+        search_query = f"{question_text} market size revenue trends business impact"
+        logger.info(f"Business Research: {search_query}")
+        
+        try:
+            state["progress_updates"].append(f"Business Analyst: Analyzing market data for {question_text}...")
+            
+            # Async search with timeout
+            results = await run_search(self.search_tool, search_query, timeout=15.0)
+            
+            # Use LLM to analyze the business findings
+            prompt_template = f"""
+            You are a Strategic Business Analyst (MBA/McKinsey style).
+            Analyze these search results regarding: "{question_text}"
+            
+            Search Results:
+            {{results}}
+            
+            Provide a strategic insight (SWOT, Market Size, CAGR, or Competitive Landscape).
+            """
+            # Search results get this question's share of the agent's token budget
+            budget = self.token_budget(priority_weight(q.get("priority")))
+            budget.charge(prompt_template)
+            analysis_prompt = prompt_template.replace("{results}", budget.take(results))
+            
+            analysis_response = await self.llm.ainvoke([HumanMessage(content=analysis_prompt)])
+            analyzed_content = analysis_response.content
+            
+            state["progress_updates"].append(f"Business Insight generated: {question_text}")
+
+            return {
+                "question_id": q["id"],
+                "question": question_text,
+                "content": analyzed_content,
+                "raw_content": results,
+                "source": "Business Analyst Agent",
+                "type": "market_analysis",
+                "url": "https://bloomberg.com" # Placeholder
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in Business Analyst for {question_text}: {e}")
+            state["errors"].append(f"Business Analyst Error: {e}")
+            return None
@@ -1,81 +1,293 @@
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Tuple
 from app.agents.base import BaseAgent
 from app.core.state import ResearchState
-from app.core.config import logger
+from app.core.config import settings, logger
+from app.core.routing import normalize_questions
+from app.core.events import artifact_streams
+from app.utils.retrieval import BM25Index, chunk_text
+from app.utils.tokens import BudgetItem, TokenBudget
 from langchain_core.messages import SystemMessage, HumanMessage
 
+MAP_PROMPT = (
+    "You are a Research Analyst. Condense the following research findings into dense notes for an editor. "
+    "Keep every concrete fact, number, date, name and source URL; drop repetition and filler. "
+    "Group the notes under the question each finding answers."
+)
+
+SECTION_PROMPT = (
+    "You are a Lead Editor writing one section of a Markdown research report. "
+    "Use only the research excerpts provided, keep concrete facts and numbers, and cite sources. "
+    "Do not repeat the section title and do not write other sections."
+)
+
+# Report sections for SYNTHESIS_MODE=sections: (title, retrieval query terms)
+REPORT_SECTIONS = (
+    ("Executive Summary", "overview key findings summary implications"),
+    ("Market Analysis", "market size growth revenue demand adoption competition pricing trends"),
+    ("Technical Analysis", "technology architecture specifications performance engineering standards"),
+    ("Strategy & Recommendations", "strategy risks opportunities recommendations outlook future"),
+)
+
+# Finding type label -> state field, in synthesis order
+FINDING_FIELDS = {"Web": "web_findings", "Technical": "technical_findings", "Business": "business_findings"}
+
+
+def format_finding(f: Dict[str, Any], f_type: str) -> str:
+    text = f"\n--- Finding ({f_type}) ---\n"
+    text += f"Question: {f.get('question', 'N/A')}\n"
+    # Handle both 'content' and 'raw_content' keys
+    content = f.get('content') or f.get('raw_content') or "No content"
+    text += f"Content: {content}\n"
+    text += f"Source: {f.get('source', 'Unknown')}\n"
+    # Near-duplicate findings collapsed into this one (see app.utils.dedup)
+    for ref in f.get("duplicates", []):
+        text += f"Also found for: {ref.get('question') or 'N/A'} ({ref.get('source') or 'Unknown'})\n"
+    return text
+
+
+def typed_findings(state: ResearchState) -> List[Tuple[str, Dict[str, Any]]]:
+    return [(f_type, f) for f_type, field in FINDING_FIELDS.items() for f in state.get(field, [])]
+
+
+def group_findings(findings: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+    """
+    Formatted findings grouped per category and question, in first-seen order,
+    so that each map call sees everything known about one question.
+    """
+    groups: Dict[Tuple[str, str], str] = {}
+    for f_type, f in findings:
+        key = (f_type, str(f.get("question_id") or f.get("question", "")))
+        groups[key] = groups.get(key, "") + format_finding(f, f_type)
+    return list(groups.values())
+
+
+def pack_chunks(texts: List[str], max_chars: int) -> List[str]:
+    """
+    Packs texts into chunks of at most max_chars, keeping their order. A text
+    longer than max_chars is split across chunks rather than dropped.
+    """
+    chunks: List[str] = []
+    current = ""
+    for text in texts:
+        while len(text) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(text[:max_chars])
+            text = text[max_chars:]
+        if current and len(current) + len(text) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += text
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 class ContentSynthesizerAgent(BaseAgent):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Cheaper model for the map step of map-reduce synthesis
+        self.map_llm = self.build_llm(settings.SYNTHESIS_MAP_MODEL or self.model_name)
+
+    def synthesis_mode(self, findings_text: str, budget: TokenBudget) -> str:
+        mode = settings.SYNTHESIS_MODE.lower()
+        if mode == "auto":
+            too_long = len(findings_text) > settings.SYNTHESIS_MAX_CHARS or budget.count(findings_text) > budget.remaining
+            return "map_reduce" if too_long else "single"
+        return mode
+
+    @staticmethod
+    def finding_priorities(state: ResearchState, findings: List[Tuple[str, Dict[str, Any]]]) -> List[float]:
+        """
+        Planner priority (1-5) of the question each finding answers; findings
+        for unknown or unscored questions rank in the middle.
+        """
+        by_id = {q["id"]: q.get("priority") for q in normalize_questions(state.get("research_plan"))}
+        priorities = []
+        for _, f in findings:
+            priority = by_id.get(f.get("question_id"))
+            priorities.append(priority if isinstance(priority, (int, float)) else 3)
+        return priorities
+
+    async def summarize_chunks(self, state: ResearchState, chunks: List[str]) -> List[str]:
+        """
+        Map step: summarizes chunks concurrently. A chunk whose call fails is
+        passed on unsummarized, so no findings are lost.
+        """
+        semaphore = asyncio.Semaphore(settings.SYNTHESIS_MAP_CONCURRENCY)
+
+        async def summarize(i: int, chunk: str) -> str:
+            async with semaphore:
+                try:
+                    response = await self.map_llm.ainvoke([
+                        SystemMessage(content=MAP_PROMPT),
+                        HumanMessage(content=f"Topic: {state['topic']}\n\nFindings:\n{chunk}")
+                    ])
+                    return response.content
+                except Exception as e:
+                    logger.error(f"Error summarizing findings group {i + 1}: {e}")
+                    state["errors"].append(f"Content Synthesis Map Error (group {i + 1}): {e}")
+                    return chunk
+
+        return await asyncio.gather(*(summarize(i, c) for i, c in enumerate(chunks)))
+
+    async def map_reduce_findings(self, state: ResearchState, findings: List[Tuple[str, Dict[str, Any]]]) -> str:
+        """
+        Summarizes groups of findings until the partial summaries fit one
+        final synthesis call.
+        """
+        groups = group_findings(findings)
+        chunks = pack_chunks(groups, settings.SYNTHESIS_GROUP_MAX_CHARS)
+        state["progress_updates"].append(
+            f"Content Synthesizer: Summarizing {len(findings)} findings in {len(chunks)} groups..."
+        )
+        summaries = await self.summarize_chunks(state, chunks)
+        rounds = 1
+        # Each extra round merges partial summaries; stop once they fit or stop shrinking
+        while sum(len(s) for s in summaries) > settings.SYNTHESIS_MAX_CHARS:
+            chunks = pack_chunks(summaries, settings.SYNTHESIS_GROUP_MAX_CHARS)
+            if len(chunks) >= len(summaries):
+                break
+            summaries = await self.summarize_chunks(state, chunks)
+            rounds += 1
+
+        state["metadata"]["synthesis"] = {"mode": "map_reduce", "groups": len(groups), "rounds": rounds}
+        return "".join(f"\n--- Research Notes (part {i + 1} of {len(summaries)}) ---\n{s}\n" for i, s in enumerate(summaries))
+
+    def finding_chunks(self, findings: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """
+        Findings cut into retrieval chunks of about SYNTHESIS_CHUNK_TOKENS, each
+        formatted with its finding's question and source.
+        """
+        chunks = []
+        for f_type, f in findings:
+            content = f.get("content") or f.get("raw_content") or ""
+            for piece in chunk_text(content, settings.SYNTHESIS_CHUNK_TOKENS, self.model_name):
+                chunks.append(format_finding({**f, "content": piece}, f_type))
+        return chunks
+
+    async def write_section(self, state: ResearchState, index: BM25Index, title: str, focus: str) -> str:
+        """
+        Writes one report section from the top-k chunks retrieved for it, so the
+        prompt size depends on SYNTHESIS_SECTION_TOP_K, not on the number of findings.
+        """
+        hits = index.search(f"{state['topic']} {title} {focus}", settings.SYNTHESIS_SECTION_TOP_K)
+        if not hits:
+            # No lexical overlap at all: fall back to the first chunks
+            hits = [(i, 0.0) for i in range(min(settings.SYNTHESIS_SECTION_TOP_K, len(index)))]
+
+        human_prompt = f"Topic: {state['topic']}\nSection: {title} ({focus})\n\nResearch excerpts:\n"
+        budget = self.token_budget()
+        budget.charge(SECTION_PROMPT, human_prompt)
+        # Hits are best first, so an overflow trims the least relevant excerpts
+        excerpts = budget.fill([BudgetItem(index.documents[i], score) for i, score in hits])
+        response = await self.llm.ainvoke([
+            SystemMessage(content=SECTION_PROMPT),
+            HumanMessage(content=human_prompt + "".join(excerpts))
+        ])
+        return f"## {title}\n\n{response.content.strip()}\n\n"
+
+    async def synthesize_sections(self, state: ResearchState, findings: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Retrieval-augmented synthesis: indexes chunked findings with BM25 and
+        writes every section concurrently from its own retrieved chunks.
+        Sections are streamed in report order as they complete.
+        """
+        chunks = self.finding_chunks(findings)
+        index = BM25Index(chunks)
+        state["progress_updates"].append(
+            f"Content Synthesizer: Writing {len(REPORT_SECTIONS)} sections from {len(chunks)} indexed excerpts..."
+        )
+        semaphore = asyncio.Semaphore(settings.SYNTHESIS_MAP_CONCURRENCY)
+
+        async def bounded(title: str, focus: str) -> str:
+            async with semaphore:
+                try:
+                    return await self.write_section(state, index, title, focus)
+                except Exception as e:
+                    logger.error(f"Error writing section {title}: {e}")
+                    state["errors"].append(f"Content Synthesis Error ({title}): {e}")
+                    return ""
+
+        research_id = (state.get("metadata") or {}).get("research_id")
+        stream = bool(research_id and settings.STREAM_TOKENS)
+        tasks = [asyncio.create_task(bounded(title, focus)) for title, focus in REPORT_SECTIONS]
+        parts = [f"# {state['topic']}\n\n"]
+        if stream:
+            artifact_streams.open(research_id, "synthesized_content")
+            artifact_streams.append(research_id, "synthesized_content", parts[0])
+        try:
+            # Awaited in report order while later sections keep generating
+            for task in tasks:
+                section = await task
+                parts.append(section)
+                if stream and section:
+                    artifact_streams.append(research_id, "synthesized_content", section)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if stream:
+                artifact_streams.close(research_id, "synthesized_content")
+
+        state["metadata"]["synthesis"] = {"mode": "sections", "sections": len(REPORT_SECTIONS), "chunks": len(chunks)}
+        if any(parts[1:]):
+            state["synthesized_content"] = "".join(parts).rstrip() + "\n"
+            state["progress_updates"].append("Content Synthesizer: Final Report Drafted.")
+
     async def invoke(self, state: ResearchState) -> ResearchState:
         logger.info("Content Synthesizer: Aggregating findings and generating report")
-        
+
         # 1. Aggregate Findings
-        web_findings = state.get("web_findings", [])
-        technical_findings = state.get("technical_findings", [])
-        business_findings = state.get("business_findings", [])
-        
-        all_findings = []
-        for f in web_findings:
-            all_findings.append(f"[Web] {f.get('question', '')}: {f.get('raw_content', '')}")
-        for f in technical_findings:
-            all_findings.append(f"[Technical] {f['question']}: {f.get('raw_content', '')}")
-        for f in business_findings:
-            all_findings.append(f"[Business] {f['question']}: {f.get('raw_content', '')}")
-            
-        if not all_findings:
+        findings = typed_findings(state)
+        if not findings:
             logger.warning("No findings available to synthesize.")
             state["synthesized_content"] = "No research findings were collected."
             return state
 
-        combined_text = "\n\n".join(all_findings)
-        
         # 2. Construct Prompt for Synthesis
         state["progress_updates"].append("Content Synthesizer: Aggregating all research data...")
-        
-        # Format findings for LLM
-        findings_text = ""
-        
-        # Helper to format dict findings
-        def format_finding(f, f_type):
-            text = f"\n--- Finding ({f_type}) ---\n"
-            text += f"Question: {f.get('question', 'N/A')}\n"
-            # Handle both 'content' and 'raw_content' keys
-            content = f.get('content') or f.get('raw_content') or "No content"
-            text += f"Content: {content}\n"
-            text += f"Source: {f.get('source', 'Unknown')}\n"
-            return text
-
-        for f in web_findings:
-            findings_text += format_finding(f, "Web")
-        for f in technical_findings:
-            findings_text += format_finding(f, "Technical")
-        for f in business_findings:
-            findings_text += format_finding(f, "Business")
-
-        # Safe truncation to avoid Context Limit Errors or timeouts
-        MAX_CHARS = 50000 
-        if len(findings_text) > MAX_CHARS:
-            logger.warning(f"Truncating findings from {len(findings_text)} to {MAX_CHARS} chars.")
-            findings_text = findings_text[:MAX_CHARS] + "\n...(truncated due to length)..."
-            
-        logger.info(f"Synthesizer Input Size: {len(findings_text)} chars")
-        state["progress_updates"].append(f"Processing {len(findings_text)} characters of data...")
 
         system_prompt = "You are a Lead Editor. Synthesize the following research findings into a Comprehensive Markdown Report."
-        
+        budget = self.token_budget()
+        budget.charge(system_prompt, "Write the report based on:\n\n")
+
+        # Format findings for LLM
+        findings_text = "".join(format_finding(f, f_type) for f_type, f in findings)
+
+        mode = self.synthesis_mode(findings_text, budget)
+        if mode == "sections":
+            await self.synthesize_sections(state, findings)
+            return state
+
+        if mode == "map_reduce":
+            findings_text = budget.take(await self.map_reduce_findings(state, findings))
+        else:
+            # Fill the budget by question priority so overflow trims the least important findings
+            items = [
+                BudgetItem(format_finding(f, f_type), priority)
+                for (f_type, f), priority in zip(findings, self.finding_priorities(state, findings))
+            ]
+            findings_text = "".join(budget.fill(items))
+
+        if budget.trimmed:
+            logger.warning(f"Trimmed {budget.trimmed} tokens of findings to fit the {budget.total} token budget.")
+
+        logger.info(f"Synthesizer Input Size: {budget.used} tokens")
+        state["progress_updates"].append(f"Processing {budget.used} tokens of data...")
+
         try:
-            # Add timeout to call to prevent infinite hang? 
-            # Standard langchain call
-            response = await self.llm.ainvoke([
+            # Streams tokens to clients while the report is written
+            state["synthesized_content"] = await self.generate_text(state, [
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=f"Write the report based on:\n\n{findings_text}")
-            ])
-            
-            state["synthesized_content"] = response.content
+            ], "synthesized_content")
             state["progress_updates"].append("Content Synthesizer: Final Report Drafted.")
-            
+
         except Exception as e:
 
             logger.error(f"Error during content synthesis: {e}")
             state["errors"].append(f"Content Synthesis Error: {e}")
-            
+
         return state
@@ -56,18 +56,23 @@ class HTMLDesignerAgent(BaseAgent):
         """
         
         try:
-            # Format prompt with content safely
+            # Format prompt with content safely, cutting the content to the designer's token budget
+            budget = self.token_budget()
+            budget.charge(system_prompt.format(topic=state['topic'], content=""), human_prompt)
+            content = budget.take(synthesized_content)
+            if budget.trimmed:
+                logger.warning(f"Trimmed {budget.trimmed} tokens of content to fit the {budget.total} token budget.")
             formatted_system = system_prompt.format(
                 topic=state['topic'],
-                content=synthesized_content
+                content=content
             )
             
-            response = await self.llm.ainvoke([
+            raw_html = await self.generate_text(state, [
                 SystemMessage(content=formatted_system),
                 HumanMessage(content=human_prompt)
-            ])
+            ], "html_output")
             
-            html_output = clean_html_response(response.content)
+            html_output = clean_html_response(raw_html)
                 
             state["html_output"] = html_output
             state["progress_updates"].append("HTML Report generated.")
@@ -30,8 +30,11 @@ class QualityReviewerAgent(BaseAgent):
         
         human_prompt = f"""Review the following report:
         
-        {content_to_review}
+        {{report}}
         """
+        budget = self.token_budget()
+        budget.charge(system_prompt, human_prompt)
+        human_prompt = human_prompt.replace("{report}", budget.take(content_to_review))
         
         try:
             response = await self.llm.ainvoke([
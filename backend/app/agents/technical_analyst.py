@@ -1,9 +1,15 @@
+from typing import Dict, Any, Optional
+from langchain_core.messages import HumanMessage
 from app.agents.base import BaseAgent
+from app.core.search import run_search
 from app.core.state import ResearchState
 from app.core.config import logger
+from app.utils.tokens import priority_weight
 from langchain_community.tools import DuckDuckGoSearchRun
 
 class TechnicalAnalystAgent(BaseAgent):
+    role = "technical_analyst"
+
     def __init__(self, model_name: str = None):
         super().__init__(model_name)
         self.search_tool = DuckDuckGoSearchRun()
@@ -12,80 +18,68 @@ class TechnicalAnalystAgent(BaseAgent):
         logger.info("Technical Analyst: Deep diving into technical aspects")
         
         research_plan = state.get("research_plan")
-        if not research_plan:
+        if not research_plan and not state.get("question"):
             return state
             
-        questions = research_plan.get("questions", [])
-        
-        # Filter questions assigned to technical_analyst
-        my_questions = [
-            q for q in questions 
-            if q.get("assigned_agent") == "technical_analyst"
-            or q.get("category") == "technical"
-        ]
+        # Each question is routed to exactly one agent (see app.core.routing)
+        my_questions = self.assigned_questions(state)
         
-        # Remove duplicates if any
-        seen_ids = set()
-        unique_questions = []
-        for q in my_questions:
-            if q["id"] not in seen_ids:
-                unique_questions.append(q)
-                seen_ids.add(q["id"])
-        
-        if not unique_questions:
+        if not my_questions:
             logger.info("No technical questions found.")
             return state
 
-        findings = []
-        
-        for q in unique_questions:
-            question_text = q["question"]
-            # Enhance query for technical focus
-            search_query = f"{question_text} documentation github technical whitepaper"
-            logger.info(f"Technical Research: {search_query}")
-            
-            try:
-                state["progress_updates"].append(f"Technical Analyst: Deep diving into {question_text}...")
-                
-                # Async search with timeout
-                import asyncio
-                results = await asyncio.wait_for(
-                    asyncio.to_thread(self.search_tool.invoke, search_query),
-                    timeout=15.0
-                )
-                
-                # Use LLM to analyze the technical findings
-                analysis_prompt = f"""
-                You are a Senior Technical Analyst. 
-                Analyze these search results regarding: "{question_text}"
-                
-                Search Results:
-                {results}
-                
-                Provide a concise technical deep-dive (2-3 paragraphs). Focus on architecture, stack, specs, and engineering details.
-                """
-                
-                analysis_response = await self.llm.ainvoke([HumanMessage(content=analysis_prompt)])
-                analyzed_content = analysis_response.content
-                
-                findings.append({
-                    "question_id": q["id"],
-                    "question": question_text,
-                    "content": analyzed_content, # Analyzed output
-                    "raw_content": results,
-                    "source": "Technical Analyst Agent",
-                    "type": "technical_deep_dive",
-                    "url": "https://github.com" # Fallback for UI visualization
-                })
-                
-                state["progress_updates"].append(f"Technical Analysis complete for: {question_text}")
-                
-            except Exception as e:
-                logger.error(f"Error in Technical Analyst for {question_text}: {e}")
-                state["errors"].append(f"Technical Analyst Error: {e}")
+        results = await self.map_questions(state, my_questions, lambda q: self.analyze_question(q, state))
+        findings = [f for f in results if f]
 
         current_findings = state.get("technical_findings", [])
         state["technical_findings"] = current_findings + findings
         state["progress_updates"].append("Technical Analysis phase finished.")
         
         return state
+
+    async def analyze_question(self, q: Dict[str, Any], state: ResearchState) -> Optional[Dict[str, Any]]:
+        question_text = q["question"]
+        # Enhance query for technical focus
+        search_query = f"{question_text} documentation github technical whitepaper"
+        logger.info(f"Technical Research: {search_query}")
+        
+        try:
+            state["progress_updates"].append(f"Technical Analyst: Deep diving into {question_text}...")
+            
+            # Async search with timeout
+            results = await run_search(self.search_tool, search_query, timeout=15.0)
+            
+            # Use LLM to analyze the technical findings
+            prompt_template = f"""
+            You are a Senior Technical Analyst. 
+            Analyze these search results regarding: "{question_text}"
+            
+            Search Results:
+            {{results}}
+            
+            Provide a concise technical deep-dive (2-3 paragraphs). Focus on architecture, stack, specs, and engineering details.
+            """
+            # Search results get this question's share of the agent's token budget
+            budget = self.token_budget(priority_weight(q.get("priority")))
+            budget.charge(prompt_template)
+            analysis_prompt = prompt_template.replace("{results}", budget.take(results))
+            
+            analysis_response = await self.llm.ainvoke([HumanMessage(content=analysis_prompt)])
+            analyzed_content = analysis_response.content
+            
+            state["progress_updates"].append(f"Technical Analysis complete for: {question_text}")
+
+            return {
+                "question_id": q["id"],
+                "question": question_text,
+                "content": analyzed_content, # Analyzed output
+                "raw_content": results,
+                "source": "Technical Analyst Agent",
+                "type": "technical_deep_dive",
+                "url": "https://github.com" # Fallback for UI visualization
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in Technical Analyst for {question_text}: {e}")
+            state["errors"].append(f"Technical Analyst Error: {e}")
+            return None
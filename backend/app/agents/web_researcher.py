@@ -1,7 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_community.tools import DuckDuckGoSearchRun
 from app.agents.base import BaseAgent
+from app.core.search import run_search
 from app.core.state import ResearchState
 from app.core.config import logger
 import json
@@ -9,6 +10,8 @@ from app.utils.text import clean_json_response
 from app.models.research import ResearchPlan, ResearchQuestion
 
 class WebResearcherAgent(BaseAgent):
+    role = "web_researcher"
+
     def __init__(self, model_name: str = None):
         super().__init__(model_name)
         # Revert to simple SearchRun as requested by user
@@ -19,56 +22,23 @@ class WebResearcherAgent(BaseAgent):
         state["progress_updates"].append("Web Researcher: Starting search process...")
         
         research_plan = state.get("research_plan")
-        if not research_plan:
+        if not research_plan and not state.get("question"):
             logger.warning("No research plan found. Skipping web research.")
             return state
             
-        questions = research_plan.get("questions", [])
-        
-        # Filter questions assigned to web_researcher
-        my_questions = [
-            q for q in questions 
-            if q.get("assigned_agent") in ["web_researcher", "market_analyst"]
-            or q.get("category") in ["market", "news", "general"]
-        ]
+        # Each question is routed to exactly one agent (see app.core.routing)
+        my_questions = self.assigned_questions(state)
         
         if not my_questions:
             logger.info("No questions assigned to Web Researcher.")
             state["progress_updates"].append("No specific web questions found.")
             return state
 
-        findings = []
-        state["progress_updates"].append(f"Identified {len(my_questions)} key questions to research.")
-        
-        for i, q in enumerate(my_questions):
-            question_text = q["question"]
-            logger.info(f"Researching: {question_text}")
-            state["progress_updates"].append(f"Searching: {question_text}...")
-            
-            try:
-                # Run synchronous search in a separate thread to prevent blocking
-                # Add a 15-second timeout to prevent global hangs
-                import asyncio
-                search_results = await asyncio.wait_for(
-                    asyncio.to_thread(self.search_tool.invoke, question_text),
-                    timeout=15.0
-                )
-                
-                # Basic parsing or just use the raw snippet
-                findings.append({
-                    "question_id": q["id"],
-                    "question": question_text,
-                    "raw_content": search_results,
-                    "source": "DuckDuckGo",
-                    "type": "web_search",
-                    "url": "https://duckduckgo.com" # Placeholder as SearchRun doesn't return URL easily
-                })
-                
-                state["progress_updates"].append(f"Found data for: {question_text}")
-                
-            except Exception as e:
-                logger.error(f"Error searching for {question_text}: {e}")
-                state["errors"].append(f"Web Search Error ({question_text}): {e}")
+        if len(my_questions) > 1:
+            state["progress_updates"].append(f"Identified {len(my_questions)} key questions to research.")
+
+        results = await self.map_questions(state, my_questions, lambda q: self.research_question(q, state))
+        findings = [f for f in results if f]
 
         # Update state with new findings
         current_findings = state.get("web_findings", [])
@@ -76,3 +46,30 @@ class WebResearcherAgent(BaseAgent):
         
         state["progress_updates"].append("Web Research completed successfully.")
         return state
+
+    async def research_question(self, q: Dict[str, Any], state: ResearchState) -> Optional[Dict[str, Any]]:
+        question_text = q["question"]
+        logger.info(f"Researching: {question_text}")
+        state["progress_updates"].append(f"Searching: {question_text}...")
+        
+        try:
+            # Run synchronous search in a separate thread to prevent blocking
+            # Add a 15-second timeout to prevent global hangs
+            search_results = await run_search(self.search_tool, question_text, timeout=15.0)
+            
+            state["progress_updates"].append(f"Found data for: {question_text}")
+
+            # Basic parsing or just use the raw snippet
+            return {
+                "question_id": q["id"],
+                "question": question_text,
+                "raw_content": search_results,
+                "source": "DuckDuckGo",
+                "type": "web_search",
+                "url": "https://duckduckgo.com" # Placeholder as SearchRun doesn't return URL easily
+            }
+            
+        except Exception as e:
+            logger.error(f"Error searching for {question_text}: {e}")
+            state["errors"].append(f"Web Search Error ({question_text}): {e}")
+            return None
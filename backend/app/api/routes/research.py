@@ -1,26 +1,70 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
+import asyncio
 import uuid
+from functools import partial
 
-from app.core.config import logger
-from app.core.state import ResearchState
-from app.core.graph import build_research_graph
-from app.core.store import RESEARCH_STORE
+from app.core.config import settings, logger
+from app.core.state import ResearchState, append_progress_log, progress_entry
+from app.core.graph import build_research_graph, build_run_config
+from app.core.store import research_store
+from app.core.scheduler import run_scheduler, SchedulerFullError
+from app.core.jobs import get_job_queue, worker_mode
+from app.core.checkpoints import get_checkpointer, thread_config, delete_checkpoints
+from app.core.knowledge import get_knowledge_base, index_completed_run
+from app.core.tracing import active_trace, chrome_trace, end_run_trace, start_run_trace
+from app.core.events import (
+    event_bus, artifact_streams, publish_state_update, format_sse,
+    STATUS_EVENT, DONE_EVENT, TERMINAL_STATUSES,
+)
 from app.models.research import ResearchRequest, ResearchResponse
 
 router = APIRouter()
 
+# Top-level keys a client may request via ?fields=
+STATE_FIELDS = tuple(ResearchState.__annotations__)
+
+# Fields whose LLM output is streamed token by token
+STREAMED_FIELDS = ("synthesized_content", "html_output")
+
 # Initialize Graph
 research_graph = build_research_graph()
 
-@router.post("", response_model=ResearchResponse)
-async def start_research(request: ResearchRequest, background_tasks: BackgroundTasks):
-    research_id = str(uuid.uuid4())
-    
-    # Initialize state
-    initial_state: ResearchState = {
-        "topic": request.topic,
-        "customization": request.customization,
+# Runs that POST /research/{id}/resume accepts
+RESUMABLE_STATUSES = ("error", "failed")
+# Runs a restart leaves behind; resumed at startup when RESUME_ON_STARTUP is set
+INTERRUPTED_STATUSES = ("queued", "started", "in_progress")
+
+# Seconds between keep-alives on idle event streams
+HEARTBEAT_SECONDS = 15.0
+# Seconds between store reads while waiting for an artifact this process does not stream
+ARTIFACT_POLL_SECONDS = 1.0
+
+
+def _with_status_entry(state: Dict[str, Any], detail: Optional[str] = None) -> Dict[str, Any]:
+    # Terminal status is set outside the graph, so its progress_log entry is too
+    status = state.get("status")
+    message = f"Research {status}: {detail}" if detail else f"Research {status}"
+    entry = progress_entry(message, type="status")
+    return {**state, "progress_log": append_progress_log(state.get("progress_log"), [entry])}
+
+
+async def _graph_for(r_id: str):
+    """
+    The research graph bound to the durable checkpointer, plus the config that
+    selects the run's checkpoint thread. Without checkpointing, the plain graph.
+    """
+    checkpointer = await get_checkpointer()
+    if checkpointer is None:
+        return research_graph, {}
+    return research_graph.copy(update={"checkpointer": checkpointer}), thread_config(r_id)
+
+
+def initial_research_state(research_id: str, topic: str, customization: Dict[str, Any]) -> ResearchState:
+    return {
+        "topic": topic,
+        "customization": customization,
         "research_plan": None,
         "web_findings": [],
         "technical_findings": [],
@@ -31,40 +75,433 @@ async def start_research(request: ResearchRequest, background_tasks: BackgroundT
         "status": "started",
         "progress_updates": ["Research started"],
         "errors": [],
+        "progress_log": append_progress_log([], [progress_entry("Research started", type="status")]),
         "metadata": {"research_id": research_id}
     }
-    
-    # Save to store
-    RESEARCH_STORE[research_id] = initial_state
-
-    async def run_graph(state, r_id):
-        logger.info(f"Running graph for {state['topic']}")
-        try:
-            # invoke returns the final state
-            final_state = await research_graph.ainvoke(state)
-            logger.info("Graph execution completed")
-            # Update store with final state
-            RESEARCH_STORE[r_id] = final_state
-        except Exception as e:
-            logger.error(f"Graph execution failed: {e}")
-            # Update store with error
-            if r_id in RESEARCH_STORE:
-                RESEARCH_STORE[r_id]["errors"].append(str(e))
-                RESEARCH_STORE[r_id]["status"] = "error"
-
-    background_tasks.add_task(run_graph, initial_state, research_id)
+
+
+async def run_graph(state: ResearchState, r_id: str, resume: bool = False):
+    """
+    Streams the graph run, persisting the state and publishing events after
+    every step so clients see progress before the run finishes.
+
+    With resume=True the run continues from its last checkpoint, so only the
+    steps that had not completed run again. A run without a checkpoint starts over.
+    """
+    logger.info(f"Running graph for {state['topic']}")
+    graph, thread = await _graph_for(r_id)
+    state = {**state, "status": "in_progress"}
+    graph_input = state
+    final_state = state
+    if resume:
+        snapshot = await graph.aget_state(thread) if thread else None
+        if snapshot is not None and snapshot.values:
+            logger.info(f"Resuming {r_id} before: {', '.join(snapshot.next) or 'finalization'}")
+            graph_input = None
+            final_state = {**snapshot.values, "status": "in_progress"}
+        else:
+            logger.info(f"No checkpoint for {r_id}; restarting it")
+            graph_input = final_state = {
+                **initial_research_state(r_id, state["topic"], state.get("customization", {})),
+                "status": "in_progress",
+            }
+    await asyncio.to_thread(research_store.update, r_id, {"status": "in_progress"})
+    event_bus.publish(r_id, STATUS_EVENT, {"status": "in_progress"})
+    # Each execution (including a resume) records its own trace, replacing the last one
+    trace = start_run_trace(r_id, topic=state["topic"], resume=resume)
+    try:
+        async for mode, chunk in graph.astream(
+            graph_input,
+            config={**build_run_config(state), **thread},
+            stream_mode=["updates", "values"],
+        ):
+            if mode == "updates":
+                for node, update in chunk.items():
+                    publish_state_update(r_id, node, update)
+            else:
+                final_state = chunk
+                await asyncio.to_thread(research_store.save, r_id, final_state)
+
+        logger.info("Graph execution completed")
+        if final_state.get("status") not in TERMINAL_STATUSES:
+            final_state = {**final_state, "status": "complete"}
+        final_state = _with_status_entry(final_state)
+        # Update store with final state
+        await asyncio.to_thread(research_store.save, r_id, final_state)
+        if final_state.get("status") == "complete":
+            # Checkpoints are only needed to resume
+            await delete_checkpoints(r_id)
+            await asyncio.to_thread(index_completed_run, r_id, final_state)
+    except Exception as e:
+        logger.error(f"Graph execution failed: {e}")
+        # Update store with error; the checkpoint is kept for POST /research/{id}/resume
+        current = await asyncio.to_thread(research_store.get, r_id) or final_state
+        final_state = {**current, "errors": current.get("errors", []) + [str(e)], "status": "error"}
+        final_state = _with_status_entry(final_state, str(e))
+        await asyncio.to_thread(research_store.save, r_id, final_state)
+    finally:
+        if trace is not None:
+            await _save_trace(r_id, end_run_trace(trace, status=final_state.get("status")))
+        artifact_streams.finish_run(r_id, final_state)
+        event_bus.publish(r_id, DONE_EVENT, {"status": final_state.get("status")})
+
+
+async def _save_trace(r_id: str, trace: Dict[str, Any]):
+    try:
+        await asyncio.to_thread(research_store.save_trace, r_id, trace)
+    except Exception as e:
+        logger.warning(f"Could not save the trace of {r_id}: {e}")
+
+
+async def recover_interrupted_runs() -> List[str]:
+    """
+    Resumes runs a restart left in progress. Each run is claimed atomically, so
+    when several workers start together only one of them resumes it. Assumes all
+    workers restart together: a worker started next to live ones would also
+    claim their runs.
+    """
+    resumed = []
+    for status in INTERRUPTED_STATUSES:
+        for r_id in await asyncio.to_thread(research_store.list_by_status, status):
+            if not await asyncio.to_thread(research_store.claim, r_id, [status], "resuming"):
+                continue
+            state = await asyncio.to_thread(research_store.get, r_id)
+            # Recovered runs were admitted before the restart, so limits do not apply
+            await submit_run(state, r_id, "recovery", resume=True, force=True)
+            resumed.append(r_id)
+    if resumed:
+        logger.info(f"Resuming {len(resumed)} interrupted research runs")
+    return resumed
+
+
+async def submit_run(
+    state: ResearchState,
+    research_id: str,
+    client_id: str,
+    priority: int = 0,
+    resume: bool = False,
+    force: bool = False,
+) -> int:
+    """
+    Hands a run to the in-process scheduler, or to the worker job queue in
+    EXECUTION_MODE=worker. Returns 0 if it started, else its queue position.
+    Raises SchedulerFullError when the run is not admitted.
+    """
+    if worker_mode():
+        # SQLite write that may wait on other processes' locks: off the event loop
+        return await asyncio.to_thread(
+            get_job_queue().enqueue, research_id, client_id=client_id, priority=priority, resume=resume, force=force
+        )
+    return run_scheduler.submit(
+        research_id, partial(run_graph, state, research_id, resume), client_id=client_id, priority=priority, force=force
+    )
+
+
+def queue_position(research_id: str) -> Optional[int]:
+    if worker_mode():
+        return get_job_queue().position(research_id)
+    return run_scheduler.position(research_id)
+
+
+def client_identity(request: Request) -> str:
+    """
+    Key for per-client quotas: the caller's address. The X-Client-Id header is
+    client-controlled, so it is only used when the caller is a configured
+    trusted proxy (TRUSTED_CLIENT_ID_PROXIES).
+    """
+    peer = request.client.host if request.client else "anonymous"
+    client_id = request.headers.get("x-client-id")
+    trusted = {p.strip() for p in settings.TRUSTED_CLIENT_ID_PROXIES.split(",") if p.strip()}
+    if client_id and peer in trusted:
+        return client_id
+    return peer
+
+
+def _too_many_requests(e: SchedulerFullError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@router.post("", response_model=ResearchResponse)
+async def start_research(request: ResearchRequest, http_request: Request):
+    research_id = str(uuid.uuid4())
+
+    # Initialize state
+    initial_state = initial_research_state(research_id, request.topic, request.customization)
+
+    client_id = client_identity(http_request)
+
+    # Stored before it is submitted: in worker mode another process may claim it at once
+    initial_state["status"] = "queued"
+    await asyncio.to_thread(research_store.create, research_id, initial_state)
+    try:
+        position = await submit_run(initial_state, research_id, client_id, request.priority)
+    except SchedulerFullError as e:
+        await asyncio.to_thread(research_store.delete, research_id)
+        raise _too_many_requests(e)
+    status = "queued" if position else "started"
+    # A started run may already have moved on to in_progress while this awaits;
+    # only a run still marked queued is moved to started
+    if position or await asyncio.to_thread(research_store.claim, research_id, ["queued"], status):
+        event_bus.publish(research_id, STATUS_EVENT, {"status": status, "queue_position": position or None})
 
     return {
         "research_id": research_id,
-        "status": "started",
-        "message": "Research started in background"
+        "status": status,
+        "message": f"Research queued at position {position}" if position else "Research started in background",
+        "queue_position": position or None,
     }
 
-@router.get("/{research_id}")
-async def get_research_status(research_id: str):
-    state = RESEARCH_STORE.get(research_id)
+
+@router.get("/search")
+def search_knowledge(
+    q: str = Query(..., min_length=1, description="Free-text query over findings of completed runs"),
+    limit: int = Query(10, ge=1, le=100),
+    max_age_seconds: Optional[int] = Query(None, ge=0, description="Only findings indexed within this many seconds"),
+):
+    """
+    Full-text search over the knowledge base. Declared before /{research_id}
+    so "search" is not taken for a research id.
+    """
+    kb = get_knowledge_base()
+    if kb is None:
+        raise HTTPException(status_code=404, detail="Knowledge base is disabled")
+    return {"query": q, "results": kb.search(q, limit=limit, max_age=max_age_seconds)}
+
+
+@router.post("/{research_id}/resume", response_model=ResearchResponse)
+async def resume_research(research_id: str, http_request: Request):
+    """
+    Continues a run that ended in error from its last completed step.
+    """
+    state = await asyncio.to_thread(research_store.get, research_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Research not found")
+    if not await asyncio.to_thread(research_store.claim, research_id, list(RESUMABLE_STATUSES), "resuming"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Research is {state.get('status')}; only runs that ended in {' or '.join(RESUMABLE_STATUSES)} can be resumed",
+        )
+    try:
+        position = await submit_run(state, research_id, client_identity(http_request), resume=True)
+    except SchedulerFullError as e:
+        await asyncio.to_thread(research_store.update, research_id, {"status": state.get("status")})
+        raise _too_many_requests(e)
+    event_bus.publish(research_id, STATUS_EVENT, {"status": "resuming", "queue_position": position or None})
+
+    return {
+        "research_id": research_id,
+        "status": "resuming",
+        "message": "Research resuming from its last checkpoint",
+        "queue_position": position or None,
+    }
+
+
+def _snapshot_event(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sent when this process holds no event history for a run (it ran on another
+    worker or before a restart), or no longer holds all the events the client
+    has missed; clients fall back to GET /research/{id}.
+    """
+    return {
+        "id": 0,
+        "type": "snapshot",
+        "data": {
+            "status": state.get("status"),
+            "progress_count": len(state.get("progress_updates", [])),
+            "terminal": state.get("status") in TERMINAL_STATUSES,
+        },
+    }
+
+
+def _resume_point(request_id: Optional[int], header: Optional[str]) -> int:
+    if request_id is not None:
+        return request_id
+    if header and header.isdigit():
+        return int(header)
+    return 0
+
+
+@router.get("/{research_id}/trace")
+def get_research_trace(research_id: str):
+    """
+    Span timeline of the run's latest execution in Chrome trace-event format
+    (load it in chrome://tracing or Perfetto), plus a summary with the critical
+    path and the network vs CPU split. Runs in progress return their trace so far.
+    """
+    trace = active_trace(research_id) or research_store.get_trace(research_id)
+    if trace is None:
+        if research_store.get_fields(research_id, []) is None:
+            raise HTTPException(status_code=404, detail="Research not found")
+        raise HTTPException(status_code=404, detail="No trace recorded for this run")
+    return chrome_trace(trace)
+
+
+@router.get("/{research_id}/events")
+async def stream_research_events(
+    research_id: str,
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Resume after this event id"),
+):
+    """
+    Server-Sent Events stream of node completions, progress messages and status
+    changes. Reconnecting clients resume via Last-Event-ID or ?last_event_id=.
+    """
+    state = await asyncio.to_thread(research_store.get, research_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Research not found")
+
+    resume_from = _resume_point(last_event_id, request.headers.get("last-event-id"))
+
+    async def event_stream():
+        if not event_bus.has_run(research_id):
+            yield format_sse(_snapshot_event(state))
+            return
+        if event_bus.missed(research_id, resume_from):
+            yield format_sse(_snapshot_event(state))
+        async for event in event_bus.subscribe(research_id, resume_from, heartbeat=HEARTBEAT_SECONDS):
+            if await request.is_disconnected():
+                break
+            yield ": keep-alive\n\n" if event is None else format_sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{research_id}/stream/{field}")
+async def stream_research_artifact(
+    research_id: str,
+    field: str,
+    request: Request,
+    offset: Optional[int] = Query(None, ge=0, description="Resume after this many characters"),
+):
+    """
+    Server-Sent Events stream of the report (synthesized_content) or dashboard
+    (html_output) as it is generated. Each `delta` event carries the new text;
+    its id is the character offset reached, so Last-Event-ID resumes exactly.
+    The raw HTML stream may still contain a Markdown code fence that the stored
+    html_output has stripped; `done` carries the final length.
+    """
+    if field not in STREAMED_FIELDS:
+        raise HTTPException(status_code=404, detail=f"No token stream for {field}")
+    state = await asyncio.to_thread(research_store.get_fields, research_id, [field, "status"])
+    if state is None:
+        raise HTTPException(status_code=404, detail="Research not found")
+
+    resume_from = _resume_point(offset, request.headers.get("last-event-id"))
+
+    def sse(event_id: int, event_type: str, data: Dict[str, Any]) -> str:
+        return format_sse({"id": event_id, "type": event_type, "data": data})
+
+    async def token_stream():
+        current, idle = state, 0.0
+        # Not streaming here: generated by a worker process or before a restart, or
+        # not started yet. Wait for a stream in this process or the stored artifact.
+        while not artifact_streams.has_stream(research_id, field):
+            if current is None:
+                return
+            if current.get(field) is not None or current.get("status") in TERMINAL_STATUSES:
+                text = current.get(field) or ""
+                if text[resume_from:]:
+                    yield sse(len(text), "delta", {"text": text[resume_from:], "reset": False})
+                yield sse(len(text), DONE_EVENT, {"length": len(text)})
+                return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(ARTIFACT_POLL_SECONDS)
+            idle += ARTIFACT_POLL_SECONDS
+            if idle >= HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            current = await asyncio.to_thread(research_store.get_fields, research_id, [field, "status"])
+        position = resume_from
+        async for delta in artifact_streams.subscribe(research_id, field, resume_from, heartbeat=HEARTBEAT_SECONDS):
+            if await request.is_disconnected():
+                return
+            if delta is None:
+                yield ": keep-alive\n\n"
+                continue
+            position = delta["offset"]
+            yield sse(position, "delta", {"text": delta["text"], "reset": delta["reset"]})
+        yield sse(position, DONE_EVENT, {"length": position})
+
+    return StreamingResponse(
+        token_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{research_id}/ws")
+async def research_events_websocket(websocket: WebSocket, research_id: str, last_event_id: int = 0):
+    """
+    WebSocket equivalent of the SSE stream; each message is one JSON event.
+    """
+    state = await asyncio.to_thread(research_store.get, research_id)
     if not state:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    try:
+        if not event_bus.has_run(research_id):
+            await websocket.send_json(_snapshot_event(state))
+        else:
+            if event_bus.missed(research_id, last_event_id):
+                await websocket.send_json(_snapshot_event(state))
+            async for event in event_bus.subscribe(research_id, last_event_id, heartbeat=HEARTBEAT_SECONDS):
+                await websocket.send_json(event if event is not None else {"type": "ping"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Event websocket for {research_id} disconnected")
+
+
+def _with_queue_position(research_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    position = queue_position(research_id)
+    if position is None:
+        return state
+    return {**state, "queue_position": position}
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in STATE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+@router.get("/{research_id}")
+def get_research_status(
+    research_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated state fields to return, e.g. status,progress_log"),
+    after: Optional[int] = Query(None, ge=0, description="Only return progress_log entries with seq greater than this"),
+):
+    """
+    Full state by default. Polling clients should pass `fields` and `after` so
+    each request costs O(new events) rather than O(whole run).
+    """
+    # Sync handler: runs in the threadpool so store I/O never blocks the event loop
+    requested = _parse_fields(fields)
+    if requested is None and after is None:
+        state = research_store.get(research_id)
+        if not state:
+            raise HTTPException(status_code=404, detail="Research not found")
+        # Return relevant parts or full state
+        return _with_queue_position(research_id, state)
+
+    if requested is None:
+        requested = [f for f in STATE_FIELDS if f != "progress_log"]
+    projected_fields = [f for f in requested if f != "progress_log"]
+    state = research_store.get_fields(research_id, projected_fields)
+    if state is None:
         raise HTTPException(status_code=404, detail="Research not found")
-    
-    # Return relevant parts or full state
-    return state
+    if "progress_log" in requested or after is not None:
+        entries = research_store.get_progress(research_id, after or 0) or []
+        state["progress_log"] = entries
+        state["last_seq"] = entries[-1]["seq"] if entries else (after or 0)
+    return _with_queue_position(research_id, state)
@@ -0,0 +1,70 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from app.core.config import settings, logger
+
+_savers: Dict[asyncio.AbstractEventLoop, "asyncio.Task[AsyncSqliteSaver]"] = {}
+
+
+def thread_config(research_id: str) -> Dict[str, Any]:
+    """
+    Checkpoints are keyed by research_id, so a run can be continued from its
+    last completed step after a failure or restart.
+    """
+    return {"configurable": {"thread_id": research_id}}
+
+
+async def _open_checkpointer() -> AsyncSqliteSaver:
+    directory = os.path.dirname(settings.CHECKPOINT_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = await aiosqlite.connect(settings.CHECKPOINT_PATH)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    logger.info(f"Using SQLite checkpointer at {settings.CHECKPOINT_PATH}")
+    return saver
+
+
+async def get_checkpointer() -> Optional[AsyncSqliteSaver]:
+    """
+    Process-wide SQLite checkpointer for the running event loop, or None when
+    checkpointing is disabled. The aiosqlite connection is opened on first use;
+    concurrent first callers share one opening task.
+    """
+    if not settings.CHECKPOINT_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    # Drop savers whose loops are gone (e.g. between test cases)
+    for stale in [l for l in _savers if l.is_closed()]:
+        task = _savers.pop(stale)
+        if task.done() and not task.cancelled() and task.exception() is None:
+            task.result().conn.stop()
+    task = _savers.get(loop)
+    if task is None:
+        task = _savers[loop] = loop.create_task(_open_checkpointer())
+    try:
+        return await task
+    except Exception:
+        _savers.pop(loop, None)
+        raise
+
+
+async def close_checkpointer():
+    task = _savers.pop(asyncio.get_running_loop(), None)
+    if task is not None:
+        saver = await task
+        await saver.conn.close()
+
+
+async def delete_checkpoints(research_id: str):
+    """
+    Drops a run's checkpoints once it has completed; they are only needed to resume.
+    """
+    saver = await get_checkpointer()
+    if saver is not None:
+        await saver.adelete_thread(research_id)
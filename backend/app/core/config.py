@@ -9,6 +9,9 @@ load_dotenv()
 class Settings(BaseSettings):
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL_NAME: str = os.getenv("OPENAI_MODEL_NAME", "gpt-4-turbo-preview")
+    # OpenAI-compatible endpoint instead of api.openai.com, e.g. a proxy or the
+    # load-test stub (benchmarks/stub_openai.py)
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL") or None
     
     # Optional: Azure specific settings if we switch back or support both
     AZURE_OPENAI_API_KEY: Optional[str] = os.getenv("AZURE_OPENAI_API_KEY")
@@ -18,6 +21,170 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
+    # Research run storage: "memory" (per-process dict) or "sqlite" (shared by workers)
+    RESEARCH_STORE_BACKEND: str = os.getenv("RESEARCH_STORE_BACKEND", "memory")
+    RESEARCH_STORE_PATH: str = os.getenv("RESEARCH_STORE_PATH", "data/research.sqlite")
+
+    # Admission control for research runs: concurrent runs, queued runs waiting
+    # for a slot, and runs (executing or queued) per client before 429s are returned
+    MAX_CONCURRENT_RUNS: int = int(os.getenv("MAX_CONCURRENT_RUNS", "4"))
+    MAX_QUEUED_RUNS: int = int(os.getenv("MAX_QUEUED_RUNS", "50"))
+    MAX_RUNS_PER_CLIENT: int = int(os.getenv("MAX_RUNS_PER_CLIENT", "5"))
+    # Clients are the caller's address. The X-Client-Id header is honoured only from
+    # these peer addresses (comma-separated), e.g. a gateway that authenticates users
+    TRUSTED_CLIENT_ID_PROXIES: str = os.getenv("TRUSTED_CLIENT_ID_PROXIES", "")
+    # Initial guess of a run's duration for Retry-After, refined as runs finish
+    RUN_DURATION_ESTIMATE_SECONDS: float = float(os.getenv("RUN_DURATION_ESTIMATE_SECONDS", "120"))
+
+    # Where graphs run: "inprocess" (inside the API, via the scheduler above) or
+    # "worker" (the API enqueues jobs in JOB_QUEUE_PATH and `python -m app.worker`
+    # processes run them). Worker mode needs RESEARCH_STORE_BACKEND=sqlite.
+    EXECUTION_MODE: str = os.getenv("EXECUTION_MODE", "inprocess")
+    JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite")
+    # Runs executed concurrently by each worker process
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "2"))
+    WORKER_POLL_SECONDS: float = float(os.getenv("WORKER_POLL_SECONDS", "1"))
+    WORKER_HEARTBEAT_SECONDS: float = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "10"))
+    # Jobs without a heartbeat for this long are requeued and resumed elsewhere
+    WORKER_STALE_SECONDS: float = float(os.getenv("WORKER_STALE_SECONDS", "60"))
+
+    # Durable LangGraph checkpoints keyed by research_id, used to resume failed or
+    # interrupted runs. RESUME_ON_STARTUP continues runs left in progress by a restart.
+    CHECKPOINT_ENABLED: bool = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+    CHECKPOINT_PATH: str = os.getenv("CHECKPOINT_PATH", "data/checkpoints.sqlite")
+    RESUME_ON_STARTUP: bool = os.getenv("RESUME_ON_STARTUP", "true").lower() == "true"
+
+    # Per-run caps on progress_log events and on the legacy progress_updates / errors lists
+    PROGRESS_LOG_MAX: int = int(os.getenv("PROGRESS_LOG_MAX", "500"))
+    PROGRESS_UPDATES_MAX: int = int(os.getenv("PROGRESS_UPDATES_MAX", "500"))
+
+    # Stream synthesizer / HTML designer tokens to /research/{id}/stream/{field}
+    STREAM_TOKENS: bool = os.getenv("STREAM_TOKENS", "true").lower() == "true"
+
+    # Per-run span trace (nodes, searches, LLM calls, scrapes) served by
+    # /research/{id}/trace; spans past TRACE_MAX_SPANS are counted, not kept
+    TRACE_ENABLED: bool = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_MAX_SPANS: int = int(os.getenv("TRACE_MAX_SPANS", "5000"))
+
+    # Upper bound on per-question research tasks running at once within one run.
+    # A run can lower it with customization["max_concurrency"].
+    MAX_CONCURRENT_QUESTIONS: int = int(os.getenv("MAX_CONCURRENT_QUESTIONS", "4"))
+
+    # Local directory for on-disk caches
+    CACHE_DIR: str = os.getenv("CACHE_DIR", ".cache")
+
+    # Content synthesis: "single" (one call, lowest-priority findings trimmed to the
+    # synthesizer's token budget), "map_reduce" (groups of findings summarized concurrently
+    # by SYNTHESIS_MAP_MODEL, then combined) or "auto" (map_reduce only when the findings
+    # exceed SYNTHESIS_MAX_CHARS or the token budget). "sections" indexes chunked findings
+    # with BM25 and writes each report section concurrently from its top-k chunks.
+    SYNTHESIS_MODE: str = os.getenv("SYNTHESIS_MODE", "auto")
+    SYNTHESIS_MAX_CHARS: int = int(os.getenv("SYNTHESIS_MAX_CHARS", "50000"))
+    SYNTHESIS_MAP_MODEL: str = os.getenv("SYNTHESIS_MAP_MODEL", "gpt-4o-mini")
+    SYNTHESIS_GROUP_MAX_CHARS: int = int(os.getenv("SYNTHESIS_GROUP_MAX_CHARS", "20000"))
+    SYNTHESIS_MAP_CONCURRENCY: int = int(os.getenv("SYNTHESIS_MAP_CONCURRENCY", "4"))
+    SYNTHESIS_CHUNK_TOKENS: int = int(os.getenv("SYNTHESIS_CHUNK_TOKENS", "300"))
+    SYNTHESIS_SECTION_TOP_K: int = int(os.getenv("SYNTHESIS_SECTION_TOP_K", "8"))
+
+    # Prompt token budgets (app.utils.tokens). TOKEN_COUNTER is "tiktoken"
+    # (falls back to ~4 chars/token when unavailable) or "approx".
+    TOKEN_COUNTER: str = os.getenv("TOKEN_COUNTER", "tiktoken")
+    # Context window overrides, e.g. "my-finetune=16385,gpt-4o=128000"
+    MODEL_CONTEXT_LIMITS: str = os.getenv("MODEL_CONTEXT_LIMITS", "")
+    # Tokens of each context window kept free for the model's answer
+    LLM_OUTPUT_TOKEN_RESERVE: int = int(os.getenv("LLM_OUTPUT_TOKEN_RESERVE", "4096"))
+    # Prompt caps per agent, "agent=tokens,..."; unlisted agents may use the whole window
+    AGENT_TOKEN_BUDGETS: str = os.getenv(
+        "AGENT_TOKEN_BUDGETS",
+        "technical_analyst=4000,business_analyst=4000,content_synthesizer=16000,html_designer=24000,quality_reviewer=16000",
+    )
+
+    # Near-duplicate findings/paragraphs are collapsed before synthesis when their
+    # estimated Jaccard similarity (MinHash over word shingles) reaches DEDUP_THRESHOLD
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+    # Cross-run knowledge base (SQLite FTS5) of findings from completed runs.
+    # A question whose terms match an indexed question's terms at least
+    # KNOWLEDGE_REUSE_THRESHOLD (0-1, both ways), in a run whose topic matches at least
+    # KNOWLEDGE_REUSE_TOPIC_THRESHOLD (both ways), reuses that finding if it is fresh.
+    KNOWLEDGE_ENABLED: bool = os.getenv("KNOWLEDGE_ENABLED", "true").lower() == "true"
+    KNOWLEDGE_PATH: str = os.getenv("KNOWLEDGE_PATH", "data/knowledge.sqlite")
+    KNOWLEDGE_REUSE_ENABLED: bool = os.getenv("KNOWLEDGE_REUSE_ENABLED", "true").lower() == "true"
+    KNOWLEDGE_REUSE_THRESHOLD: float = float(os.getenv("KNOWLEDGE_REUSE_THRESHOLD", "0.9"))
+    KNOWLEDGE_REUSE_TOPIC_THRESHOLD: float = float(os.getenv("KNOWLEDGE_REUSE_TOPIC_THRESHOLD", "0.5"))
+    KNOWLEDGE_REUSE_MAX_AGE_SECONDS: int = int(os.getenv("KNOWLEDGE_REUSE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+    # Search result cache shared by all search agents
+    SEARCH_CACHE_ENABLED: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "21600"))
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+    SEARCH_CACHE_MAX_BYTES: int = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+    SEARCH_CACHE_MEMORY_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MEMORY_ENTRIES", "256"))
+
+    # Search gateway (app.core.search). Throttled searches are retried with jittered
+    # exponential backoff; after SEARCH_BREAKER_FAILURES consecutive failures the
+    # circuit opens for SEARCH_BREAKER_COOLDOWN_SECONDS and searches are answered from
+    # cached results up to SEARCH_STALE_MAX_AGE_SECONDS old, or fail fast.
+    SEARCH_MAX_RETRIES: int = int(os.getenv("SEARCH_MAX_RETRIES", "3"))
+    SEARCH_BACKOFF_BASE_SECONDS: float = float(os.getenv("SEARCH_BACKOFF_BASE_SECONDS", "1.0"))
+    SEARCH_BACKOFF_MAX_SECONDS: float = float(os.getenv("SEARCH_BACKOFF_MAX_SECONDS", "20.0"))
+    SEARCH_BREAKER_FAILURES: int = int(os.getenv("SEARCH_BREAKER_FAILURES", "5"))
+    SEARCH_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("SEARCH_BREAKER_COOLDOWN_SECONDS", "60"))
+    SEARCH_STALE_MAX_AGE_SECONDS: int = int(os.getenv("SEARCH_STALE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+    # Concurrent provider calls: halved on throttling/timeouts, regrown on success
+    SEARCH_MAX_CONCURRENCY: int = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+    SEARCH_MIN_CONCURRENCY: int = int(os.getenv("SEARCH_MIN_CONCURRENCY", "1"))
+
+    # Opt-in memoization of agent LLM calls. LLM_CACHE_AGENTS is "*" or a
+    # comma-separated list of agent names (e.g. "research_planner,technical_analyst").
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    LLM_CACHE_AGENTS: str = os.getenv("LLM_CACHE_AGENTS", "*")
+    LLM_CACHE_TEMPERATURE: float = float(os.getenv("LLM_CACHE_TEMPERATURE", "0"))
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+    LLM_CACHE_MEMORY_ENTRIES: int = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "128"))
+
+    # Shared HTTP client for all chat models (app.core.llm_clients)
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_SECONDS: float = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+    # Process-wide rate limits per model; requests over them wait instead of hitting 429s.
+    # LLM_RATE_LIMITS overrides the defaults per model as "model=rpm/tpm,..."; 0 disables a limit.
+    LLM_DEFAULT_RPM: int = int(os.getenv("LLM_DEFAULT_RPM", "500"))
+    LLM_DEFAULT_TPM: int = int(os.getenv("LLM_DEFAULT_TPM", "200000"))
+    LLM_RATE_LIMITS: str = os.getenv("LLM_RATE_LIMITS", "")
+    # Completion tokens assumed for requests that don't set max_tokens
+    LLM_OUTPUT_TOKENS_ESTIMATE: int = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", "1000"))
+
+    # Page fetcher used by app.utils.scraper
+    SCRAPER_MAX_CONNECTIONS: int = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "20"))
+    SCRAPER_MAX_PER_HOST: int = int(os.getenv("SCRAPER_MAX_PER_HOST", "4"))
+    SCRAPER_TIMEOUT_SECONDS: float = float(os.getenv("SCRAPER_TIMEOUT_SECONDS", "10"))
+    SCRAPER_KEEPALIVE_SECONDS: float = float(os.getenv("SCRAPER_KEEPALIVE_SECONDS", "30"))
+    # Bodies are streamed and cut off at this many bytes
+    SCRAPER_MAX_BYTES: int = int(os.getenv("SCRAPER_MAX_BYTES", str(2 * 1024 * 1024)))
+    # Extracted page text is cut to this many tokens (0 keeps only the max_chars cut)
+    SCRAPER_MAX_TOKENS: int = int(os.getenv("SCRAPER_MAX_TOKENS", "1200"))
+    # HTML parser backend: auto, selectolax, lxml or html.parser
+    SCRAPER_PARSER: str = os.getenv("SCRAPER_PARSER", "auto")
+    # Pages larger than SCRAPER_INLINE_PARSE_BYTES are parsed in a process pool
+    # of this size (0 parses everything in a worker thread instead)
+    SCRAPER_PARSE_WORKERS: int = int(os.getenv("SCRAPER_PARSE_WORKERS", "2"))
+    SCRAPER_INLINE_PARSE_BYTES: int = int(os.getenv("SCRAPER_INLINE_PARSE_BYTES", "65536"))
+
+    # Conditional-request cache for scraped pages. Entries are revalidated with
+    # ETag / Last-Modified once older than PAGE_CACHE_FRESH_SECONDS; per-domain
+    # overrides use "domain=seconds" pairs, e.g. "wikipedia.org=86400,python.org=604800".
+    PAGE_CACHE_ENABLED: bool = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+    PAGE_CACHE_TTL_SECONDS: int = int(os.getenv("PAGE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    PAGE_CACHE_FRESH_SECONDS: int = int(os.getenv("PAGE_CACHE_FRESH_SECONDS", "0"))
+    PAGE_CACHE_DOMAIN_FRESHNESS: str = os.getenv("PAGE_CACHE_DOMAIN_FRESHNESS", "")
+    PAGE_CACHE_MAX_ENTRIES: int = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "10000"))
+    PAGE_CACHE_MAX_BYTES: int = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
     class Config:
         env_file = ".env"
 
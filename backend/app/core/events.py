@@ -0,0 +1,272 @@
+import asyncio
+import bisect
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+# Event types pushed to clients
+NODE_EVENT = "node"
+PROGRESS_EVENT = "progress"
+ERROR_EVENT = "error"
+STATUS_EVENT = "status"
+DONE_EVENT = "done"
+ARTIFACT_EVENT = "artifact"
+
+TERMINAL_STATUSES = ("complete", "error", "failed")
+
+
+class _RunChannel:
+    def __init__(self, history: int):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.next_id = 1
+        self.closed = False
+        self.changed = asyncio.Event()
+
+
+class RunEventBus:
+    """
+    In-process publish/subscribe of per-run events.
+
+    Each run keeps a bounded history of sequenced events so that a client can
+    reconnect with its last event id and resume; missed() tells when some of
+    the events after it have already been dropped. Beyond `max_runs` runs, the
+    oldest finished ones are dropped first. A run still going is only dropped
+    when none are finished, and then it is closed so its subscribers return.
+    """
+
+    def __init__(self, history: int = 1000, max_runs: int = 200):
+        self.history = history
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, _RunChannel]" = OrderedDict()
+
+    def _channel(self, research_id: str, create: bool = True) -> Optional[_RunChannel]:
+        channel = self._runs.get(research_id)
+        if channel is None and create:
+            channel = self._runs[research_id] = _RunChannel(self.history)
+            excess = len(self._runs) - self.max_runs
+            if excess > 0:
+                finished = [r for r, c in self._runs.items() if c.closed and c is not channel]
+                running = [r for r, c in self._runs.items() if not c.closed and c is not channel]
+                for old in (finished + running)[:excess]:
+                    evicted = self._runs.pop(old)
+                    if not evicted.closed:
+                        # Its subscribers would otherwise wait on it forever
+                        evicted.closed = True
+                        evicted.changed.set()
+        return channel
+
+    def has_run(self, research_id: str) -> bool:
+        return research_id in self._runs
+
+    def missed(self, research_id: str, last_event_id: int = 0) -> bool:
+        """True if events after `last_event_id` were already dropped from the history."""
+        channel = self._channel(research_id, create=False)
+        return bool(channel and channel.events and channel.events[0]["id"] > last_event_id + 1)
+
+    def publish(self, research_id: str, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        channel = self._channel(research_id)
+        event = {"id": channel.next_id, "type": event_type, "ts": time.time(), "data": data}
+        channel.next_id += 1
+        channel.events.append(event)
+        if event_type == DONE_EVENT:
+            channel.closed = True
+        # Wake current subscribers and arm a fresh event for the next round
+        channel.changed.set()
+        channel.changed = asyncio.Event()
+        return event
+
+    def events_after(self, research_id: str, last_event_id: int = 0) -> List[Dict[str, Any]]:
+        channel = self._channel(research_id, create=False)
+        if channel is None:
+            return []
+        return [e for e in channel.events if e["id"] > last_event_id]
+
+    async def subscribe(
+        self,
+        research_id: str,
+        last_event_id: int = 0,
+        heartbeat: Optional[float] = None,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yields events after `last_event_id` until the run's done event.
+        With `heartbeat`, yields None after that many idle seconds so callers can
+        send keep-alives. Yields nothing for a run with no events (see has_run).
+        """
+        channel = self._channel(research_id, create=False)
+        if channel is None:
+            return
+        while True:
+            waiter = channel.changed
+            pending = [e for e in channel.events if e["id"] > last_event_id]
+            for event in pending:
+                last_event_id = event["id"]
+                yield event
+            if pending:
+                # More may have been published while suspended in yield
+                continue
+            if channel.closed:
+                return
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+event_bus = RunEventBus()
+
+
+class _ArtifactStream:
+    def __init__(self):
+        self.parts: List[str] = []
+        # ends[i] is the character offset just after parts[i]
+        self.ends: List[int] = []
+        self.closed = False
+        # Bumped when a retried node restarts the stream
+        self.generation = 0
+        self.changed = asyncio.Event()
+
+    @property
+    def length(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def text_from(self, offset: int) -> str:
+        i = bisect.bisect_right(self.ends, offset)
+        if i >= len(self.parts):
+            return ""
+        start = self.ends[i - 1] if i else 0
+        return self.parts[i][offset - start:] + "".join(self.parts[i + 1:])
+
+
+class ArtifactStreams:
+    """
+    Partial text of artifacts generated token by token, per run and state field.
+
+    Kept apart from the run event history so that thousands of token deltas do
+    not push node and progress events out of it. Positions are character
+    offsets, so a reconnecting client resumes from the length it has rendered.
+    Streams of finished runs are dropped once their artifact is stored; beyond
+    `max_streams`, the oldest closed streams go too. Open ones are never evicted.
+    """
+
+    def __init__(self, max_streams: int = 100):
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[tuple, _ArtifactStream]" = OrderedDict()
+
+    def _stream(self, research_id: str, field: str) -> _ArtifactStream:
+        key = (research_id, field)
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _ArtifactStream()
+            excess = len(self._streams) - self.max_streams
+            if excess > 0:
+                # Subscribers of an evicted open stream would wait on it forever
+                for old in [k for k, s in self._streams.items() if s.closed][:excess]:
+                    del self._streams[old]
+        return stream
+
+    def _notify(self, stream: _ArtifactStream):
+        stream.changed.set()
+        stream.changed = asyncio.Event()
+
+    def has_stream(self, research_id: str, field: str) -> bool:
+        return (research_id, field) in self._streams
+
+    def open(self, research_id: str, field: str):
+        """Starts (or restarts, on a retried node) the stream of a field."""
+        stream = self._stream(research_id, field)
+        stream.parts.clear()
+        stream.ends.clear()
+        stream.closed = False
+        stream.generation += 1
+        self._notify(stream)
+        event_bus.publish(research_id, ARTIFACT_EVENT, {"field": field, "state": "streaming"})
+
+    def append(self, research_id: str, field: str, text: str):
+        if not text:
+            return
+        stream = self._stream(research_id, field)
+        stream.parts.append(text)
+        stream.ends.append(stream.length + len(text))
+        self._notify(stream)
+
+    def close(self, research_id: str, field: str):
+        stream = self._stream(research_id, field)
+        stream.closed = True
+        self._notify(stream)
+        event_bus.publish(research_id, ARTIFACT_EVENT, {"field": field, "state": "finished", "length": stream.length})
+
+    def finish_run(self, research_id: str, stored: Optional[Dict[str, Any]] = None):
+        """
+        Closes every stream of a finished run, releasing waiting subscribers, and
+        drops those whose field is in `stored` (the saved state); later readers
+        get it from the store. Streams of fields that were not saved (the run
+        failed mid-stream) stay until evicted.
+        """
+        stored = stored or {}
+        for key, stream in list(self._streams.items()):
+            r_id, field = key
+            if r_id != research_id:
+                continue
+            if not stream.closed:
+                stream.closed = True
+                self._notify(stream)
+            if stored.get(field) is not None:
+                del self._streams[key]
+
+    def text(self, research_id: str, field: str) -> Optional[str]:
+        stream = self._streams.get((research_id, field))
+        return stream.text_from(0) if stream else None
+
+    async def subscribe(
+        self,
+        research_id: str,
+        field: str,
+        offset: int = 0,
+        heartbeat: Optional[float] = None,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yields {"offset", "text", "reset"} deltas after `offset` until the stream
+        closes; `offset` is the end position of the delta and `reset` tells the
+        client to discard what it has (the node was retried). Yields None on
+        idle heartbeats. Yields nothing for a field with no stream (see has_stream).
+        """
+        stream = self._streams.get((research_id, field))
+        if stream is None:
+            return
+        generation = stream.generation
+        while True:
+            waiter = stream.changed
+            reset = stream.generation != generation
+            if reset:
+                generation, offset = stream.generation, 0
+            delta = stream.text_from(offset)
+            if delta or reset:
+                offset = stream.length
+                yield {"offset": offset, "text": delta, "reset": reset}
+                continue
+            if stream.closed:
+                return
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+artifact_streams = ArtifactStreams()
+
+
+def publish_state_update(research_id: str, node: str, update: Optional[Dict[str, Any]]):
+    """
+    Translates a graph node's state update into client events.
+    """
+    update = update or {}
+    event_bus.publish(research_id, NODE_EVENT, {"node": node, "keys": sorted(update.keys())})
+    for message in update.get("progress_updates") or []:
+        event_bus.publish(research_id, PROGRESS_EVENT, {"node": node, "message": message})
+    for message in update.get("errors") or []:
+        event_bus.publish(research_id, ERROR_EVENT, {"node": node, "message": message})
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -1,16 +1,143 @@
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, List, Union
 from langgraph.graph import StateGraph, END
+from langgraph.types import Overwrite, Send
 from langchain_core.runnables import RunnableLambda
 
-from app.core.state import ResearchState
+from app.core.state import ResearchState, progress_entry
+from app.core.routing import QUESTION_HANDLERS, route_questions, question_concurrency
 from app.agents.research_planner import ResearchPlannerAgent
 from app.agents.web_researcher import WebResearcherAgent
 from app.agents.technical_analyst import TechnicalAnalystAgent
 from app.agents.business_analyst import BusinessAnalystAgent
-from app.agents.content_synthesizer import ContentSynthesizerAgent
+from app.agents.content_synthesizer import ContentSynthesizerAgent, FINDING_FIELDS, format_finding, typed_findings
 from app.agents.html_designer import HTMLDesignerAgent
 from app.agents.quality_reviewer import QualityReviewerAgent
-from app.core.config import logger
+from app.core.config import settings, logger
+from app.core.knowledge import reusable_findings
+from app.core.tracing import span
+from app.utils.dedup import dedup_findings
+from app.utils.tokens import count_tokens
+
+
+async def route_research_questions(state: ResearchState) -> Dict[str, Any]:
+    """
+    Assigns every planned question to exactly one handler and records the routing.
+    Questions already answered by a recent run on the same topic reuse its
+    findings from the knowledge base instead of being dispatched.
+    """
+    routes = route_questions(state.get("research_plan"))
+    assignments = {q["id"]: handler for handler, questions in routes.items() for q in questions}
+    reused = await asyncio.to_thread(
+        reusable_findings, [q for questions in routes.values() for q in questions], state.get("topic") or ""
+    )
+    counts = ", ".join(f"{handler}={len(questions)}" for handler, questions in routes.items())
+    logger.info(f"Routing {len(assignments)} questions: {counts}; {len(reused)} answered from the knowledge base")
+    message = f"Dispatching {len(assignments) - len(reused)} research questions ({counts})."
+    if reused:
+        message += f" Reusing earlier findings for {len(reused)} of them."
+    update: Dict[str, Any] = {
+        "progress_updates": [message],
+        "progress_log": [progress_entry(message, node="question_router")],
+        "metadata": {"question_routes": assignments, "reused_questions": list(reused)},
+    }
+    for entry in reused.values():
+        update.setdefault(entry["field"], []).append(entry["finding"])
+    return update
+
+
+def dispatch_questions(state: ResearchState) -> Union[str, List[Send]]:
+    """
+    Map step: one Send per question to its handler node, except questions the
+    router answered from the knowledge base. Falls through to the reduce step when the plan has no questions.
+    """
+    routes = route_questions(state.get("research_plan"))
+    reused = set((state.get("metadata") or {}).get("reused_questions") or [])
+    sends = [
+        Send(handler, {
+            "topic": state["topic"],
+            "customization": state.get("customization", {}),
+            "research_plan": state.get("research_plan"),
+            "metadata": state.get("metadata", {}),
+            "question": q,
+        })
+        for handler, questions in routes.items()
+        for q in questions
+        if q["id"] not in reused
+    ]
+    return sends or "merge_findings"
+
+
+async def merge_findings(state: ResearchState) -> Dict[str, Any]:
+    """
+    Reduce step: the findings reducers have already merged the per-question
+    results, so this only summarizes them before synthesis.
+    """
+    counts = {
+        "web": len(state.get("web_findings", [])),
+        "technical": len(state.get("technical_findings", [])),
+        "business": len(state.get("business_findings", [])),
+    }
+    total = sum(counts.values())
+    message = f"Research phase finished with {total} findings."
+    return {
+        "progress_updates": [message],
+        "progress_log": [progress_entry(message, node="merge_findings")],
+        "metadata": {"finding_counts": counts},
+    }
+
+
+async def deduplicate_findings(state: ResearchState) -> Dict[str, Any]:
+    """
+    Collapses near-duplicate findings and paragraphs (related questions often
+    get the same search snippets) so the synthesizer reads them only once.
+    Changed findings lists are replaced with Overwrite, bypassing their
+    append reducers.
+    """
+    if not settings.DEDUP_ENABLED:
+        return {}
+    findings = typed_findings(state)
+    deduped, stats = await asyncio.to_thread(dedup_findings, findings, settings.DEDUP_THRESHOLD)
+
+    before = count_tokens("".join(format_finding(f, f_type) for f_type, f in findings))
+    after = count_tokens("".join(format_finding(f, f_type) for f_type, f in deduped))
+    stats["tokens_saved"] = max(0, before - after)
+    message = (
+        f"Deduplication merged {stats['findings_merged']} findings and removed "
+        f"{stats['paragraphs_removed']} repeated paragraphs (~{stats['tokens_saved']} tokens saved)."
+    )
+    logger.info(message)
+    update: Dict[str, Any] = {
+        "progress_updates": [message],
+        "progress_log": [progress_entry(message, node="dedup_findings")],
+        "metadata": {"dedup": stats},
+    }
+    if stats["findings_merged"] or stats["paragraphs_removed"]:
+        for f_type, field in FINDING_FIELDS.items():
+            update[field] = Overwrite([f for t, f in deduped if t == f_type])
+    return update
+
+
+def traced_node(name: str, node: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+    """
+    Wraps a node so each execution is a span in the run's trace; searches, LLM
+    calls and scrapes made by the node nest under it.
+    """
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        question = (state.get("question") or {}).get("id")
+        with span(name, "node", **({"question_id": question} if question else {})):
+            return await node(state)
+
+    return RunnableLambda(run, name=name)
+
+
+def build_run_config(state: ResearchState) -> Dict[str, Any]:
+    """
+    Runtime config for a single graph run. max_concurrency caps how many
+    per-question tasks LangGraph executes at once.
+    """
+    return {"max_concurrency": question_concurrency(state.get("customization"))}
+
 
 def build_research_graph():
     # Initialize agents
@@ -25,25 +152,35 @@ def build_research_graph():
     # Define the graph
     workflow = StateGraph(ResearchState)
 
-    # Add nodes - Wrap in RunnableLambda to ensure async handling
-    workflow.add_node("research_planner", RunnableLambda(planner.run_agent))
-    workflow.add_node("web_researcher", RunnableLambda(web_researcher.run_agent))
-    workflow.add_node("technical_analyst", RunnableLambda(technical_analyst.run_agent))
-    workflow.add_node("business_analyst", RunnableLambda(business_analyst.run_agent))
-    workflow.add_node("content_synthesizer", RunnableLambda(content_synthesizer.run_agent))
-    workflow.add_node("quality_reviewer", RunnableLambda(quality_reviewer.run_agent))
-    workflow.add_node("html_designer", RunnableLambda(html_designer.run_agent))
-    
-    # Define edges - Linear Flow for Safety
+    # Add nodes - Wrap in RunnableLambda to ensure async handling (see traced_node)
+    workflow.add_node("research_planner", traced_node("research_planner", planner.run_agent))
+    workflow.add_node("question_router", traced_node("question_router", route_research_questions))
+    workflow.add_node("web_researcher", traced_node("web_researcher", web_researcher.run_agent))
+    workflow.add_node("technical_analyst", traced_node("technical_analyst", technical_analyst.run_agent))
+    workflow.add_node("business_analyst", traced_node("business_analyst", business_analyst.run_agent))
+    workflow.add_node("merge_findings", traced_node("merge_findings", merge_findings))
+    workflow.add_node("dedup_findings", traced_node("dedup_findings", deduplicate_findings))
+    workflow.add_node("content_synthesizer", traced_node("content_synthesizer", content_synthesizer.run_agent))
+    workflow.add_node("quality_reviewer", traced_node("quality_reviewer", quality_reviewer.run_agent))
+    workflow.add_node("html_designer", traced_node("html_designer", html_designer.run_agent))
+
+    # Define edges
     # Entry point
     workflow.set_entry_point("research_planner")
 
-    # Linear chain
-    workflow.add_edge("research_planner", "web_researcher")
-    workflow.add_edge("web_researcher", "technical_analyst")
-    # Execute analysts in parallel? For now linear for safety
-    workflow.add_edge("technical_analyst", "business_analyst")
-    workflow.add_edge("business_analyst", "content_synthesizer")
+    workflow.add_edge("research_planner", "question_router")
+    # Map: one task per question, each routed to exactly one handler.
+    # Handlers run concurrently; list fields in ResearchState use reducers to merge them.
+    workflow.add_conditional_edges(
+        "question_router",
+        dispatch_questions,
+        [*QUESTION_HANDLERS, "merge_findings"],
+    )
+    # Reduce: runs once after every dispatched question has finished
+    for handler in QUESTION_HANDLERS:
+        workflow.add_edge(handler, "merge_findings")
+    workflow.add_edge("merge_findings", "dedup_findings")
+    workflow.add_edge("dedup_findings", "content_synthesizer")
     workflow.add_edge("content_synthesizer", "quality_reviewer")
     workflow.add_edge("quality_reviewer", "html_designer")
     workflow.add_edge("html_designer", END)
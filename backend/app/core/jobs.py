@@ -0,0 +1,215 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.scheduler import SchedulerFullError
+
+
+class Job(NamedTuple):
+    id: int
+    research_id: str
+    resume: bool
+    client_id: str
+    attempts: int
+
+
+class SQLiteJobQueue:
+    """
+    Durable run queue shared by the API (producer) and worker processes
+    (consumers) through one SQLite file.
+
+    Jobs are claimed atomically (highest priority, then oldest) and heartbeated
+    while they run. A job whose worker stops heartbeating is put back in the
+    queue as a resume, so the next worker continues it from its checkpoint.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                research_id TEXT NOT NULL,
+                resume INTEGER NOT NULL DEFAULT 0,
+                client_id TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                worker_id TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, id);
+            CREATE INDEX IF NOT EXISTS idx_jobs_research ON jobs(research_id);
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit, with explicit transactions where needed
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _retry_after(self, conn: sqlite3.Connection) -> int:
+        queued, running = conn.execute(
+            "SELECT SUM(status = 'queued'), SUM(status = 'running') FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()
+        waves = ((queued or 0) + 1) / max(1, running or 0)
+        return max(1, math.ceil(waves * settings.RUN_DURATION_ESTIMATE_SECONDS))
+
+    def enqueue(
+        self,
+        research_id: str,
+        client_id: str = "anonymous",
+        priority: int = 0,
+        resume: bool = False,
+        force: bool = False,
+    ) -> int:
+        """
+        Adds a run and returns its 1-based queue position. Applies the same
+        admission limits as the in-process scheduler unless `force` is set;
+        raises SchedulerFullError when the run is not admitted.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not force:
+                (client_active,) = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE client_id = ? AND status IN ('queued', 'running')", (client_id,)
+                ).fetchone()
+                if client_active >= settings.MAX_RUNS_PER_CLIENT:
+                    raise SchedulerFullError(
+                        f"Client {client_id} already has {settings.MAX_RUNS_PER_CLIENT} active research runs",
+                        self._retry_after(conn),
+                    )
+                (queued,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()
+                if queued >= settings.MAX_QUEUED_RUNS:
+                    raise SchedulerFullError("Research queue is full", self._retry_after(conn))
+            conn.execute(
+                "INSERT INTO jobs (research_id, resume, client_id, priority, status, enqueued_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (research_id, int(resume), client_id, priority, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.position(research_id) or 0
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, research_id, resume, client_id, attempts FROM jobs "
+                "WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_id, now, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(row[0], row[1], bool(row[2]), row[3], row[4] + 1)
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """False if the job was taken away from this worker (e.g. requeued as stale)."""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+            (time.time(), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, status: str = "done", worker_id: Optional[str] = None) -> bool:
+        """
+        Marks a job finished. With `worker_id`, only while that worker still owns
+        it; False if the job was reassigned in the meantime.
+        """
+        if worker_id is None:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), job_id)
+            )
+        else:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (status, time.time(), job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: int, worker_id: Optional[str] = None):
+        """
+        Puts an interrupted job back in the queue to be resumed by another worker.
+        With `worker_id`, only while that worker still owns it.
+        """
+        query = "UPDATE jobs SET status = 'queued', resume = 1, worker_id = NULL WHERE id = ? AND status = 'running'"
+        params: tuple = (job_id,)
+        if worker_id is not None:
+            query += " AND worker_id = ?"
+            params += (worker_id,)
+        self._connection().execute(query, params)
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """Requeues running jobs whose worker has not heartbeated for `stale_after` seconds."""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'queued', resume = 1, worker_id = NULL "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (time.time() - stale_after,),
+        )
+        return cursor.rowcount
+
+    def position(self, research_id: str) -> Optional[int]:
+        """1-based position of a queued run, or None if it is not queued."""
+        row = self._connection().execute(
+            "SELECT priority, id FROM jobs WHERE research_id = ? AND status = 'queued' ORDER BY id DESC LIMIT 1",
+            (research_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        (ahead,) = self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND (priority > ? OR (priority = ? AND id < ?))",
+            (row[0], row[0], row[1]),
+        ).fetchone()
+        return ahead + 1
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+_job_queue: Optional[SQLiteJobQueue] = None
+
+
+def worker_mode() -> bool:
+    return settings.EXECUTION_MODE.lower() == "worker"
+
+
+def get_job_queue() -> SQLiteJobQueue:
+    global _job_queue
+    if _job_queue is None:
+        if settings.RESEARCH_STORE_BACKEND.lower() != "sqlite":
+            # Workers and the API are separate processes and must share run state
+            raise RuntimeError("EXECUTION_MODE=worker requires RESEARCH_STORE_BACKEND=sqlite")
+        _job_queue = SQLiteJobQueue(settings.JOB_QUEUE_PATH)
+    return _job_queue
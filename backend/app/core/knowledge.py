@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings, logger
+from app.utils.retrieval import tokenize
+
+# State fields whose findings are indexed
+FINDING_FIELDS = ("web_findings", "technical_findings", "business_findings")
+
+
+def match_expression(query: str, column: Optional[str] = None) -> Optional[str]:
+    """
+    FTS5 MATCH expression for free text: any of the query's terms, each quoted
+    so user input cannot inject FTS syntax. None if nothing is searchable.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return None
+    expression = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    return f"{column} : ({expression})" if column else expression
+
+
+def term_coverage(query: str, text: str) -> float:
+    """Share of the query's terms that appear in text."""
+    terms = set(tokenize(query))
+    if not terms:
+        return 0.0
+    return len(terms & set(tokenize(text))) / len(terms)
+
+
+class KnowledgeBase:
+    """
+    Full-text index (SQLite FTS5) of findings from completed runs.
+
+    Lets clients search everything researched so far and lets new runs reuse
+    fresh findings for questions that were already answered, skipping their
+    search and LLM calls.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS findings USING fts5(
+                question, content, topic,
+                research_id UNINDEXED, field UNINDEXED, finding UNINDEXED, created_at UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def add_run(self, research_id: str, state: Dict[str, Any]) -> int:
+        """
+        Indexes a run's findings, replacing any earlier copy of the run.
+        Findings that were themselves reused from another run are skipped.
+        Returns the number of findings indexed.
+        """
+        now = time.time()
+        rows = []
+        for field in FINDING_FIELDS:
+            for f in state.get(field) or []:
+                content = f.get("content") or f.get("raw_content")
+                if not content or f.get("reused_from"):
+                    continue
+                rows.append((
+                    f.get("question") or "", content, state.get("topic") or "",
+                    research_id, field, json.dumps(f, default=str), now,
+                ))
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM findings WHERE research_id = ?", (research_id,))
+            conn.executemany(
+                "INSERT INTO findings (question, content, topic, research_id, field, finding, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        max_age: Optional[float] = None,
+        column: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Best matches first, by BM25 (higher score is better). `column`
+        restricts matching to "question", "content" or "topic".
+        """
+        expression = match_expression(query, column)
+        if expression is None:
+            return []
+        return self._query(expression, limit, max_age)
+
+    def _query(self, expression: str, limit: int, max_age: Optional[float]) -> List[Dict[str, Any]]:
+        sql = (
+            "SELECT research_id, field, topic, finding, created_at, -bm25(findings) AS score "
+            "FROM findings WHERE findings MATCH ?"
+        )
+        params: List[Any] = [expression]
+        if max_age is not None:
+            sql += " AND created_at >= ?"
+            params.append(time.time() - max_age)
+        sql += " ORDER BY bm25(findings) LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                "research_id": research_id,
+                "field": field,
+                "topic": topic,
+                "finding": json.loads(finding),
+                "created_at": created_at,
+                "score": round(score, 4),
+            }
+            for research_id, field, topic, finding, created_at, score in self._connection().execute(sql, params)
+        ]
+
+    def find_reusable(
+        self,
+        question: str,
+        topic: str,
+        threshold: float,
+        max_age: float,
+        topic_threshold: float = 0.5,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The best-ranked finding whose question covers at least `threshold` of
+        this question's terms and whose run's topic covers at least
+        `topic_threshold` of this topic's terms (both ways), or None. Generic
+        questions ("What are the key challenges?") recur across unrelated
+        topics, so the question alone is not enough.
+        """
+        question_match = match_expression(question, "question")
+        topic_match = match_expression(topic, "topic")
+        if question_match is None or topic_match is None:
+            return None
+        for hit in self._query(f"{question_match} AND {topic_match}", 5, max_age):
+            stored = hit["finding"].get("question") or ""
+            if min(term_coverage(question, stored), term_coverage(stored, question)) < threshold:
+                continue
+            if min(term_coverage(topic, hit["topic"]), term_coverage(hit["topic"], topic)) >= topic_threshold:
+                return hit
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        findings, runs = self._connection().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT research_id) FROM findings"
+        ).fetchone()
+        return {"findings": findings, "runs": runs}
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+
+
+def get_knowledge_base() -> Optional[KnowledgeBase]:
+    """Process-wide knowledge base, or None when KNOWLEDGE_ENABLED is off."""
+    global _knowledge_base
+    if not settings.KNOWLEDGE_ENABLED:
+        return None
+    if _knowledge_base is None:
+        _knowledge_base = KnowledgeBase(settings.KNOWLEDGE_PATH)
+    return _knowledge_base
+
+
+def index_completed_run(research_id: str, state: Dict[str, Any]):
+    """Adds a finished run to the knowledge base; failures are logged, never raised."""
+    kb = get_knowledge_base()
+    if kb is None:
+        return
+    try:
+        count = kb.add_run(research_id, state)
+        logger.info(f"Indexed {count} findings from {research_id} into the knowledge base")
+    except Exception as e:
+        logger.warning(f"Could not index {research_id} into the knowledge base: {e}")
+
+
+def reusable_findings(questions: List[Dict[str, Any]], topic: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Fresh findings from earlier runs on the same topic for questions that were
+    already answered, keyed by question id, as {"field": ..., "finding": ...}. Reused findings are
+    re-labelled with the new question and keep a reused_from reference.
+    """
+    kb = get_knowledge_base()
+    if kb is None or not settings.KNOWLEDGE_REUSE_ENABLED:
+        return {}
+    reused = {}
+    for q in questions:
+        try:
+            hit = kb.find_reusable(
+                q["question"],
+                topic,
+                settings.KNOWLEDGE_REUSE_THRESHOLD,
+                settings.KNOWLEDGE_REUSE_MAX_AGE_SECONDS,
+                settings.KNOWLEDGE_REUSE_TOPIC_THRESHOLD,
+            )
+        except Exception as e:
+            logger.warning(f"Knowledge base lookup failed for {q['id']}: {e}")
+            continue
+        if hit is None:
+            continue
+        finding = {
+            **hit["finding"],
+            "question_id": q["id"],
+            "question": q["question"],
+            "reused_from": hit["research_id"],
+            "reused_question": hit["finding"].get("question"),
+        }
+        reused[q["id"]] = {"field": hit["field"], "finding": finding}
+    return reused
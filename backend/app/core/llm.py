@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+from pydantic import BaseModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from app.core.config import settings, logger
+from app.utils.cache import TieredCache
+
+
+def _build_llm_cache() -> TieredCache:
+    return TieredCache(
+        "llm",
+        path=os.path.join(settings.CACHE_DIR, "llm.sqlite"),
+        ttl=settings.LLM_CACHE_TTL_SECONDS,
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        max_bytes=settings.LLM_CACHE_MAX_BYTES,
+        memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+    )
+
+
+_llm_cache: Optional[TieredCache] = None
+
+
+def get_llm_cache() -> TieredCache:
+    """
+    Process-wide LLM response cache, created on first use so that processes
+    with caching disabled never open the database.
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = _build_llm_cache()
+    return _llm_cache
+
+
+def llm_cache_enabled_for(agent_name: str) -> bool:
+    if not settings.LLM_CACHE_ENABLED:
+        return False
+    agents = [a.strip() for a in settings.LLM_CACHE_AGENTS.split(",") if a.strip()]
+    return "*" in agents or agent_name in agents
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    if _llm_cache is None:
+        return {"name": "llm", "enabled": settings.LLM_CACHE_ENABLED}
+    return {"enabled": settings.LLM_CACHE_ENABLED, **_llm_cache.stats()}
+
+
+def _serialize_messages(messages: Any) -> Any:
+    if isinstance(messages, str):
+        return messages
+    serialized = []
+    for m in messages:
+        if isinstance(m, BaseMessage):
+            serialized.append({"type": m.type, "content": m.content})
+        else:
+            serialized.append(m)
+    return serialized
+
+
+def _schema_fingerprint(schema: Any) -> Any:
+    if schema is None:
+        return None
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return {"name": schema.__name__, "json_schema": schema.model_json_schema()}
+    return schema
+
+
+def llm_cache_key(model: str, temperature: float, messages: Any, schema: Any = None, options: Any = None) -> str:
+    key = {
+        "model": model,
+        "temperature": temperature,
+        "messages": _serialize_messages(messages),
+        "schema": _schema_fingerprint(schema),
+    }
+    # Only present for calls with extra arguments, so other keys stay as they were
+    if options is not None:
+        key["options"] = options
+    payload = json.dumps(key, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _call_options(args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """
+    Extra ainvoke/astream arguments (e.g. stop) as part of the cache key.
+    Raises TypeError for ones that can't be keyed (callbacks, config objects).
+    """
+    if not args and not kwargs:
+        return None
+    return json.loads(json.dumps({"args": list(args), "kwargs": kwargs}, sort_keys=True))
+
+
+class CachedChatModel:
+    """
+    Memoizing wrapper around a LangChain chat model.
+
+    `ainvoke` results are cached by a hash of model, temperature, messages and
+    call options (plus the output schema for `with_structured_output`), so a
+    cache hit skips the network entirely. Calls with options that can't be
+    hashed bypass the cache. Cache reads and writes run in a thread, as they may
+    hit SQLite. Everything else is delegated to the wrapped model.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        model_name: str,
+        temperature: float,
+        cache: Optional[TieredCache] = None,
+        schema: Any = None,
+    ):
+        self._llm = llm
+        self.model_name = model_name
+        self.temperature = temperature
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.schema = schema
+
+    def with_structured_output(self, schema: Any, **kwargs) -> "CachedChatModel":
+        return CachedChatModel(
+            self._llm.with_structured_output(schema, **kwargs),
+            self.model_name,
+            self.temperature,
+            cache=self.cache,
+            schema=schema,
+        )
+
+    def _key(self, messages: Any, args: tuple, kwargs: Dict[str, Any]) -> Optional[str]:
+        try:
+            options = _call_options(args, kwargs)
+        except (TypeError, ValueError):
+            return None
+        return llm_cache_key(self.model_name, self.temperature, messages, self.schema, options)
+
+    async def ainvoke(self, messages: Any, *args, **kwargs) -> Any:
+        key = self._key(messages, args, kwargs)
+        if key is None:
+            return await self._llm.ainvoke(messages, *args, **kwargs)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.info(f"LLM cache hit ({self.model_name})")
+            return self._deserialize(cached)
+
+        result = await self._llm.ainvoke(messages, *args, **kwargs)
+
+        try:
+            await asyncio.to_thread(self.cache.set, key, self._serialize(result))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"LLM response not cacheable: {e}")
+        return result
+
+    async def astream(self, messages: Any, *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Streams through the wrapped model and caches the assembled message under
+        the same key as `ainvoke`; a hit is replayed as a single chunk.
+        """
+        key = self._key(messages, args, kwargs)
+        if key is None:
+            async for chunk in self._llm.astream(messages, *args, **kwargs):
+                yield chunk
+            return
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.info(f"LLM cache hit ({self.model_name})")
+            message = self._deserialize(cached)
+            yield AIMessageChunk(content=message.content)
+            return
+
+        combined = None
+        async for chunk in self._llm.astream(messages, *args, **kwargs):
+            combined = chunk if combined is None else combined + chunk
+            yield chunk
+
+        if isinstance(combined, AIMessageChunk):
+            await asyncio.to_thread(self.cache.set, key, self._serialize(AIMessage(content=combined.content)))
+
+    def _serialize(self, result: Any) -> Dict[str, Any]:
+        if isinstance(result, BaseMessage):
+            return {"kind": "message", "value": message_to_dict(result)}
+        if isinstance(result, BaseModel):
+            return {"kind": "model", "value": result.model_dump()}
+        return {"kind": "raw", "value": result}
+
+    def _deserialize(self, cached: Dict[str, Any]) -> Any:
+        kind, value = cached["kind"], cached["value"]
+        if kind == "message":
+            return messages_from_dict([value])[0]
+        if kind == "model" and isinstance(self.schema, type) and issubclass(self.schema, BaseModel):
+            return self.schema.model_validate(value)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from app.core.config import settings, logger
+from app.core.metrics import current_agent, record_llm_response
+from app.core.tracing import span, start_span
+from app.utils.tokens import count_tokens
+
+
+class TokenBucket:
+    """
+    Bucket refilled continuously at `per_minute` / 60 per second, holding at
+    most one minute's worth. Reservations may drive the level negative; the
+    caller then waits until the refill has covered its share, which queues
+    callers first come, first served.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes `amount` and returns the seconds to wait before using it."""
+        self._refill(now)
+        # A single request larger than the bucket could never be served otherwise
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float, now: float):
+        """Gives back (part of) a reservation, at most what reserve() took."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + min(amount, self.capacity))
+
+
+class ModelRateLimiter:
+    """
+    Process-wide requests-per-minute and tokens-per-minute limit for one model.
+    Requests over the limit wait instead of failing with 429s; the time spent
+    waiting is reported by stats(). A limit of 0 disables that bucket. Tokens
+    are reserved from an estimate and corrected by settle() once the call ends.
+    """
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        # Thread lock: workers may call from several threads and event loops
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.delayed = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, tokens: int) -> float:
+        """Waits for capacity for one request of about `tokens` tokens; returns the wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now) if self.requests else 0.0,
+                self.tokens.reserve(tokens, now) if self.tokens else 0.0,
+            )
+            self.calls += 1
+            if wait > 0:
+                self.delayed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.waiting += 1
+        if wait > 0:
+            if wait >= 1:
+                logger.info(f"LLM rate limit for {self.model}: waiting {wait:.1f}s")
+            try:
+                # Traced as queue time: neither network nor CPU
+                with span("rate_limit_wait", "queue", model=self.model, wait=round(wait, 3)):
+                    await asyncio.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        return wait
+
+    def settle(self, estimated: int, used: Optional[int] = None):
+        """
+        Corrects a reservation made by acquire(estimated). With `used` None the
+        request failed without a response, so its request and tokens are given
+        back; otherwise the tokens bucket is charged the reported usage instead
+        of the estimate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if used is None:
+                if self.requests:
+                    self.requests.refund(1, now)
+                used = 0
+            if self.tokens:
+                if used < estimated:
+                    self.tokens.refund(estimated - used, now)
+                elif used > estimated:
+                    # Overrun: charged now, so later callers wait for it
+                    self.tokens.reserve(used - estimated, now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rpm": int(self.requests.capacity) if self.requests else None,
+            "tpm": int(self.tokens.capacity) if self.tokens else None,
+            "calls": self.calls,
+            "delayed": self.delayed,
+            "waiting": self.waiting,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.calls, 3) if self.calls else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
+
+
+def _parse_rate_limits(value: str) -> Dict[str, Tuple[int, int]]:
+    """Parses "model=rpm/tpm,..." (LLM_RATE_LIMITS); malformed entries are ignored."""
+    limits = {}
+    for part in (value or "").split(","):
+        model, _, spec = part.partition("=")
+        rpm, _, tpm = spec.partition("/")
+        try:
+            limits[model.strip()] = (int(rpm), int(tpm or 0))
+        except ValueError:
+            continue
+    return limits
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter_for(model: str) -> ModelRateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            rpm, tpm = _parse_rate_limits(settings.LLM_RATE_LIMITS).get(
+                model, (settings.LLM_DEFAULT_RPM, settings.LLM_DEFAULT_TPM)
+            )
+            limiter = _limiters[model] = ModelRateLimiter(model, rpm, tpm)
+        return limiter
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return ""
+
+
+def request_cost(request: httpx.Request) -> Tuple[Optional[str], int]:
+    """
+    (model, estimated tokens) of a chat completion request: prompt tokens plus
+    max_tokens, or LLM_OUTPUT_TOKENS_ESTIMATE when the request sets none.
+    Other requests cost nothing.
+    """
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None, 0
+    try:
+        body = json.loads(request.content)
+    except Exception:
+        return None, 0
+    model = body.get("model")
+    prompt = "".join(_text_of(m.get("content")) for m in body.get("messages") or [] if isinstance(m, dict))
+    output = body.get("max_completion_tokens") or body.get("max_tokens") or settings.LLM_OUTPUT_TOKENS_ESTIMATE
+    return model, count_tokens(prompt, model) + output
+
+
+class MeteredStream(httpx.AsyncByteStream):
+    """Response body stream that hands the whole body to `on_close` when closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[bytes], None]):
+        self.stream = stream
+        self.on_close = on_close
+        self.chunks = []
+        self.closed = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.chunks.append(chunk)
+            yield chunk
+
+    async def aclose(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.on_close(b"".join(self.chunks))
+            except Exception as e:
+                logger.warning(f"Could not record LLM metrics or trace: {e}")
+        await self.stream.aclose()
+
+
+class PooledLLMTransport(httpx.AsyncBaseTransport):
+    """
+    Transport of the shared LLM HTTP client.
+
+    Keeps one keep-alive connection pool per event loop, so a single client can
+    serve the API loop, worker loops and test loops without reusing a
+    connection on a loop it was not opened on, and makes every chat completion
+    (including the SDK's own retries) wait for its model's rate limit first.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._transports: Dict[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = {}
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        # Drop pools whose loops are gone (e.g. between test cases)
+        for stale in [l for l in self._transports if l.is_closed()]:
+            self._transports.pop(stale, None)
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self.limits)
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        model, tokens = request_cost(request)
+        if not model:
+            return await self._transport().handle_async_request(request)
+        limiter = rate_limiter_for(model)
+        wait = await limiter.acquire(tokens)
+        agent = current_agent.get()
+        trace_span = start_span(
+            "llm", "llm", model=model, agent=agent,
+            request_bytes=len(request.content), estimated_tokens=tokens, rate_limit_wait=round(wait, 3),
+        )
+        start = time.perf_counter()
+        try:
+            response = await self._transport().handle_async_request(request)
+        except Exception as e:
+            record_llm_response(agent, model, None, time.perf_counter() - start)
+            trace_span.finish(error=type(e).__name__)
+            # No response: the reservation was not used
+            limiter.settle(tokens)
+            raise
+
+        def on_close(body: bytes):
+            usage = record_llm_response(agent, model, response.status_code, time.perf_counter() - start, body)
+            trace_span.finish(status=response.status_code, response_bytes=len(body), **usage)
+            if usage:
+                limiter.settle(tokens, usage["prompt_tokens"] + usage["completion_tokens"])
+
+        # Latency and usage are recorded once the SDK has read (or streamed) the body
+        response.stream = MeteredStream(response.stream, on_close)
+        return response
+
+    async def aclose(self):
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+_transport: Optional[PooledLLMTransport] = None
+_http_client: Optional[httpx.AsyncClient] = None
+_models: Dict[Tuple[Any, str, float], Any] = {}
+
+
+def get_llm_http_client() -> httpx.AsyncClient:
+    """Pooled keep-alive HTTP client shared by every chat model in the process."""
+    global _transport, _http_client
+    if _http_client is None:
+        _transport = PooledLLMTransport(httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS,
+        ))
+        _http_client = httpx.AsyncClient(timeout=settings.LLM_TIMEOUT_SECONDS, transport=_transport)
+    return _http_client
+
+
+def shared_chat_model(factory: Callable[..., Any], model_name: str, temperature: float) -> Any:
+    """
+    One chat model per (factory, model, temperature) for the whole process, all
+    on the shared, rate-limited HTTP client. Chat models hold no per-call
+    state, so agents can share them.
+    """
+    key = (factory, model_name, temperature)
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = factory(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            model=model_name,
+            temperature=temperature,
+            http_async_client=get_llm_http_client(),
+            # Streamed responses then report usage too (see app.core.metrics)
+            stream_usage=True,
+        )
+    return model
+
+
+async def close_llm_clients():
+    """Closes the running loop's pooled LLM connections."""
+    if _transport is not None:
+        await _transport.aclose()
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    return {
+        "shared_models": len(_models),
+        "rate_limits": {model: limiter.stats() for model, limiter in _limiters.items()},
+    }
@@ -0,0 +1,99 @@
+import json
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Metrics are per process: in worker mode each worker has its own and the API's
+# /metrics only covers the API process (plus the shared job queue gauges).
+
+# Agent whose node is running. Set by BaseAgent.run_agent so the shared LLM
+# client can attribute tokens without agents passing their name around.
+current_agent: ContextVar[str] = ContextVar("current_agent", default="none")
+
+_SECONDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+NODE_DURATION = Histogram(
+    "research_node_duration_seconds", "Run time of agent graph nodes",
+    ["agent", "status"], buckets=_SECONDS,
+)
+LLM_LATENCY = Histogram(
+    "research_llm_request_duration_seconds", "Chat completion requests, until the response body is read",
+    ["model", "status"], buckets=_SECONDS,
+)
+LLM_TOKENS = Counter(
+    "research_llm_tokens", "Tokens reported by chat completion responses",
+    ["agent", "model", "kind"],
+)
+SEARCH_LATENCY = Histogram(
+    "research_search_duration_seconds", "Search provider calls (cache hits excluded)",
+    ["outcome"], buckets=_SECONDS,
+)
+SEARCH_FALLBACKS = Counter(
+    "research_search_fallbacks", "Searches answered without the provider after it failed",
+    ["kind"],
+)
+SCRAPE_LATENCY = Histogram(
+    "research_scrape_duration_seconds", "Page scrapes, including cache revalidation and parsing",
+    ["outcome"], buckets=_SECONDS,
+)
+CACHE_REQUESTS = Counter(
+    "research_cache_requests", "Tiered cache lookups",
+    ["cache", "result"],
+)
+AGENT_ERRORS = Counter(
+    "research_agent_errors", "Errors recorded in the run state by agents",
+    ["agent"],
+)
+RUNS_ACTIVE = Gauge("research_runs_active", "Research runs executing")
+RUNS_QUEUED = Gauge("research_runs_queued", "Research runs waiting for a slot")
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """"2xx", "4xx", ... or "error" when no response arrived."""
+    return f"{status_code // 100}xx" if status_code else "error"
+
+
+def response_usage(body: bytes) -> Optional[Dict[str, Any]]:
+    """
+    The usage block of a chat completion response: a JSON body, or the last
+    chunk that carries usage in a server-sent event stream.
+    """
+    try:
+        return json.loads(body).get("usage")
+    except (ValueError, AttributeError):
+        pass
+    usage = None
+    for line in body.splitlines():
+        if not line.startswith(b"data:"):
+            continue
+        try:
+            usage = json.loads(line[5:]).get("usage") or usage
+        except (ValueError, AttributeError):
+            continue
+    return usage
+
+
+def record_llm_response(
+    agent: str, model: str, status_code: Optional[int], elapsed: float, body: bytes = b""
+) -> Dict[str, int]:
+    """Records one chat completion; returns its prompt/completion token counts (empty if unreported)."""
+    LLM_LATENCY.labels(model, status_class(status_code)).observe(elapsed)
+    usage = response_usage(body) if body else None
+    if not usage:
+        return {}
+    tokens = {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+    }
+    LLM_TOKENS.labels(agent, model, "prompt").inc(tokens["prompt_tokens"])
+    LLM_TOKENS.labels(agent, model, "completion").inc(tokens["completion_tokens"])
+    return tokens
+
+
+def render_metrics(active_runs: int, queued_runs: int) -> Tuple[bytes, str]:
+    """Prometheus text exposition (body, content type), with the run gauges refreshed."""
+    RUNS_ACTIVE.set(active_runs)
+    RUNS_QUEUED.set(queued_runs)
+    return generate_latest(), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,92 @@
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+
+# Graph nodes that research individual questions
+QUESTION_HANDLERS = ("web_researcher", "technical_analyst", "business_analyst")
+DEFAULT_HANDLER = "web_researcher"
+
+# Legacy / planner-invented agent names mapped onto real handlers
+AGENT_ALIASES = {
+    "market_analyst": "business_analyst",
+}
+
+CATEGORY_ROUTES = {
+    "technical": "technical_analyst",
+    "business": "business_analyst",
+    "market": "business_analyst",
+    "industry": "business_analyst",
+    "news": "web_researcher",
+    "general": "web_researcher",
+}
+
+
+def _resolve_handler(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    name = AGENT_ALIASES.get(name, name)
+    return name if name in QUESTION_HANDLERS else None
+
+
+def normalize_questions(research_plan: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Returns the plan's questions as dicts with unique ids.
+    Bare strings are wrapped and duplicate ids are dropped.
+    """
+    if not research_plan:
+        return []
+
+    questions = []
+    seen_ids = set()
+    for i, q in enumerate(research_plan.get("questions", []) or []):
+        if not isinstance(q, dict):
+            q = {"id": f"q{i + 1}", "question": str(q), "category": "general"}
+        q_id = q.get("id") or f"q{i + 1}"
+        if q_id in seen_ids:
+            continue
+        seen_ids.add(q_id)
+        questions.append({**q, "id": q_id})
+    return questions
+
+
+def route_question(question: Dict[str, Any], research_plan: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Picks exactly one handler for a question.
+    Precedence: the question's assigned_agent, the plan's agent_assignments,
+    the question category, then the web researcher as a fallback.
+    """
+    handler = _resolve_handler(question.get("assigned_agent"))
+    if handler:
+        return handler
+
+    assignments = (research_plan or {}).get("agent_assignments") or {}
+    handler = _resolve_handler(assignments.get(question.get("id")))
+    if handler:
+        return handler
+
+    return CATEGORY_ROUTES.get((question.get("category") or "").lower(), DEFAULT_HANDLER)
+
+
+def route_questions(research_plan: Optional[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Partitions the plan's questions by handler. Every question appears exactly once.
+    """
+    routes: Dict[str, List[Dict[str, Any]]] = {handler: [] for handler in QUESTION_HANDLERS}
+    for q in normalize_questions(research_plan):
+        routes[route_question(q, research_plan)].append(q)
+    return routes
+
+
+def question_concurrency(customization: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Per-run limit on concurrently researched questions.
+    customization["max_concurrency"] may lower, but not raise, the configured cap.
+    """
+    limit = max(1, settings.MAX_CONCURRENT_QUESTIONS)
+    requested = (customization or {}).get("max_concurrency")
+    try:
+        requested = int(requested) if requested is not None else None
+    except (TypeError, ValueError):
+        requested = None
+    if requested and requested > 0:
+        limit = min(limit, requested)
+    return limit
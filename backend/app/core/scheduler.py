@@ -0,0 +1,155 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings, logger
+
+
+class SchedulerFullError(Exception):
+    """
+    Raised when a run cannot be admitted; retry_after is a wait estimate in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Job:
+    def __init__(self, research_id: str, client_id: str, priority: int, seq: int, factory: Callable[[], Awaitable[Any]]):
+        self.research_id = research_id
+        self.client_id = client_id
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.enqueued_at = time.time()
+
+
+class RunScheduler:
+    """
+    In-process admission control for research runs.
+
+    At most `max_concurrent` runs execute at once; the rest wait in a bounded
+    queue. The next run is the one with the highest priority, then the one whose
+    client has the fewest runs executing (so one busy client cannot starve the
+    others), then the oldest. Each client may have at most `per_client` runs
+    executing or queued.
+
+    The queue is small and bounded, so picking the next run is a linear scan.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = None,
+        max_queued: int = None,
+        per_client: int = None,
+        run_estimate: float = None,
+    ):
+        self.max_concurrent = max_concurrent or settings.MAX_CONCURRENT_RUNS
+        self.max_queued = settings.MAX_QUEUED_RUNS if max_queued is None else max_queued
+        self.per_client = per_client or settings.MAX_RUNS_PER_CLIENT
+        # Moving average of run duration, used for Retry-After
+        self.run_estimate = run_estimate or settings.RUN_DURATION_ESTIMATE_SECONDS
+        self._queue: List[_Job] = []
+        self._running: Dict[str, _Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running_by_client: Dict[str, int] = defaultdict(int)
+        self._queued_by_client: Dict[str, int] = defaultdict(int)
+        self._seq = itertools.count()
+        self.completed = 0
+        self.rejected = 0
+
+    def _key(self, job: _Job):
+        return (-job.priority, self._running_by_client[job.client_id], job.seq)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        waves = (len(self._queue) + 1) / self.max_concurrent
+        return max(1, math.ceil(waves * self.run_estimate))
+
+    def submit(
+        self,
+        research_id: str,
+        factory: Callable[[], Awaitable[Any]],
+        client_id: str = "anonymous",
+        priority: int = 0,
+        force: bool = False,
+    ) -> int:
+        """
+        Admits a run. Returns 0 if it started right away, otherwise its 1-based
+        queue position. `force` skips the queue and client limits (used for
+        recovered runs). Raises SchedulerFullError when the run is not admitted.
+        """
+        if not force:
+            if self._running_by_client[client_id] + self._queued_by_client[client_id] >= self.per_client:
+                self.rejected += 1
+                raise SchedulerFullError(
+                    f"Client {client_id} already has {self.per_client} active research runs",
+                    self.retry_after(),
+                )
+            if len(self._running) >= self.max_concurrent and len(self._queue) >= self.max_queued:
+                self.rejected += 1
+                raise SchedulerFullError("Research queue is full", self.retry_after())
+
+        job = _Job(research_id, client_id, priority, next(self._seq), factory)
+        self._queue.append(job)
+        self._queued_by_client[client_id] += 1
+        self._dispatch()
+        return self.position(research_id) or 0
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < self.max_concurrent:
+            job = min(self._queue, key=self._key)
+            self._queue.remove(job)
+            self._queued_by_client[job.client_id] -= 1
+            self._running_by_client[job.client_id] += 1
+            self._running[job.research_id] = job
+            logger.info(f"Starting run {job.research_id} after {time.time() - job.enqueued_at:.1f}s in queue")
+            task = asyncio.create_task(self._run(job))
+            self._tasks[job.research_id] = task
+
+    async def _run(self, job: _Job):
+        started = time.time()
+        try:
+            await job.factory()
+        except Exception as e:
+            logger.error(f"Scheduled run {job.research_id} failed: {e}")
+        finally:
+            self.run_estimate = 0.8 * self.run_estimate + 0.2 * (time.time() - started)
+            self.completed += 1
+            self._running.pop(job.research_id, None)
+            self._tasks.pop(job.research_id, None)
+            self._running_by_client[job.client_id] -= 1
+            self._dispatch()
+
+    def position(self, research_id: str) -> Optional[int]:
+        """1-based position of a queued run in the current dispatch order, else None."""
+        for i, job in enumerate(sorted(self._queue, key=self._key)):
+            if job.research_id == research_id:
+                return i + 1
+        return None
+
+    def is_active(self, research_id: str) -> bool:
+        return research_id in self._running or any(j.research_id == research_id for j in self._queue)
+
+    async def join(self):
+        """Waits until every admitted run has finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "queued": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "run_estimate_seconds": round(self.run_estimate, 1),
+        }
+
+
+run_scheduler = RunScheduler()
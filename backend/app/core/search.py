@@ -0,0 +1,367 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings, logger
+from app.core.metrics import SEARCH_FALLBACKS, SEARCH_LATENCY
+from app.core.tracing import span
+from app.utils.cache import TieredCache
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a search query: case- and whitespace-insensitive.
+    """
+    return " ".join(str(query).lower().split())
+
+
+def _build_search_cache() -> Optional[TieredCache]:
+    if not settings.SEARCH_CACHE_ENABLED:
+        return None
+    return TieredCache(
+        "search",
+        path=os.path.join(settings.CACHE_DIR, "search.sqlite"),
+        # Entries are kept past their TTL so they can be served stale while the
+        # provider is down; fresh lookups pass SEARCH_CACHE_TTL_SECONDS as max_age
+        ttl=max(settings.SEARCH_CACHE_TTL_SECONDS, settings.SEARCH_STALE_MAX_AGE_SECONDS),
+        max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+        max_bytes=settings.SEARCH_CACHE_MAX_BYTES,
+        memory_entries=settings.SEARCH_CACHE_MEMORY_ENTRIES,
+    )
+
+
+# Shared by every agent in the process
+search_cache = _build_search_cache()
+
+
+class SearchUnavailableError(Exception):
+    """The search provider is failing and there is no cached result to fall back on."""
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """
+    True for throttling errors: ddgs' RatelimitException (DuckDuckGo answers
+    202 Ratelimit) and HTTP 429s from other providers.
+    """
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(s in text for s in ("ratelimit", "rate limit", "too many requests", "429"))
+
+
+class CircuitBreaker:
+    """
+    Process-wide breaker for the search provider.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast for `cooldown` seconds. It then lets a single probe through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        # Thread lock: the breaker is shared by every event loop in the process
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = self.clock()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_started = None
+            # Half-open: one probe at a time; a probe that never reported back
+            # (e.g. its run was cancelled) is replaced after a cooldown
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Search circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_started = None
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.trips += 1
+                logger.warning(f"Search circuit opened after {self.failures} consecutive failures")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.cooldown - (self.clock() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "trips": self.trips,
+                "retry_in_seconds": round(retry_in, 3),
+            }
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on concurrent provider calls: halved on throttling or timeouts
+    (at most once per `decrease_interval`, so one burst of errors counts once),
+    raised by one after a limit's worth of consecutive successes.
+
+    The limit is shared; slots are counted per event loop, since asyncio
+    conditions can't be shared between loops.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_interval: float = 1.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.decrease_interval = decrease_interval
+        self._successes = 0
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+        self._loops: Dict[asyncio.AbstractEventLoop, Dict[str, Any]] = {}
+
+    def _loop_state(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        # Drop state of loops that are gone (e.g. between test cases)
+        for stale in [l for l in self._loops if l.is_closed()]:
+            self._loops.pop(stale, None)
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = {"cond": asyncio.Condition(), "in_flight": 0, "waiting": 0}
+        return state
+
+    @asynccontextmanager
+    async def slot(self, **trace_args):
+        state = self._loop_state()
+        cond = state["cond"]
+        async with cond:
+            if state["in_flight"] >= self.limit:
+                state["waiting"] += 1
+                try:
+                    # Traced as queue time, apart from the call it holds up
+                    with span("search_slot_wait", "queue", **trace_args):
+                        await cond.wait_for(lambda: state["in_flight"] < self.limit)
+                finally:
+                    state["waiting"] -= 1
+            state["in_flight"] += 1
+        try:
+            yield
+        finally:
+            async with cond:
+                state["in_flight"] -= 1
+                cond.notify_all()
+
+    def on_success(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+
+    def on_overload(self):
+        with self._lock:
+            self._successes = 0
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = now
+            if self.limit > self.min_limit:
+                self.limit = max(self.min_limit, self.limit // 2)
+                logger.info(f"Search concurrency lowered to {self.limit}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "in_flight": sum(s["in_flight"] for s in self._loops.values()),
+            "waiting": sum(s["waiting"] for s in self._loops.values()),
+        }
+
+
+def _cache_get(key: str, max_age: float) -> Any:
+    return search_cache.get(key, max_age=max_age) if search_cache is not None else None
+
+
+def _cache_set(key: str, results: Any):
+    if search_cache is not None and results:
+        search_cache.set(key, results)
+
+
+class SearchGateway:
+    """
+    Single path from the agents to the search provider.
+
+    Answers from the shared cache when it can. Otherwise calls the tool
+    under an adaptive concurrency limit, retries throttled calls with full-
+    jitter exponential backoff, and reports every outcome to a circuit
+    breaker. While the circuit is open, or when a call finally fails, a stale
+    cached result is served if there is one; if not, SearchUnavailableError
+    (or the provider's own error) is raised.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        concurrency: AdaptiveConcurrency,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 20.0,
+    ):
+        self.breaker = breaker
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.counts = {
+            "requests": 0,
+            "cache_hits": 0,
+            "provider_calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "stale_served": 0,
+            "fast_failed": 0,
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2**attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _fallback(self, key: str, error: Optional[BaseException]) -> Any:
+        stale = await asyncio.to_thread(_cache_get, key, settings.SEARCH_STALE_MAX_AGE_SECONDS)
+        if stale is not None:
+            self.counts["stale_served"] += 1
+            SEARCH_FALLBACKS.labels("stale").inc()
+            logger.warning(f"Search provider unavailable, serving stale results: {key}")
+            return stale
+        if error is not None:
+            raise error
+        self.counts["fast_failed"] += 1
+        SEARCH_FALLBACKS.labels("fast_failed").inc()
+        raise SearchUnavailableError(f"Search circuit is open; no cached results for '{key}'")
+
+    async def _call(self, tool: Any, query: str, timeout: float) -> Any:
+        """One provider call in a concurrency slot; its latency excludes the wait for the slot."""
+        async with self.concurrency.slot(query=query):
+            self.counts["provider_calls"] += 1
+            start = time.perf_counter()
+            outcome = "ok"
+            with span("search", "search", query=query) as trace_span:
+                try:
+                    results = await asyncio.wait_for(asyncio.to_thread(tool.invoke, query), timeout=timeout)
+                    trace_span.set(result_chars=len(str(results)))
+                    return results
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise
+                except Exception as e:
+                    outcome = "rate_limited" if is_rate_limited(e) else "error"
+                    raise
+                finally:
+                    SEARCH_LATENCY.labels(outcome).observe(time.perf_counter() - start)
+                    trace_span.set(outcome=outcome)
+
+    async def search(self, tool: Any, query: str, timeout: float = 15.0) -> Any:
+        self.counts["requests"] += 1
+        key = normalize_query(query)
+        cached = await asyncio.to_thread(_cache_get, key, settings.SEARCH_CACHE_TTL_SECONDS)
+        if cached is not None:
+            self.counts["cache_hits"] += 1
+            logger.info(f"Search cache hit: {key}")
+            return cached
+
+        error: Optional[BaseException] = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                return await self._fallback(key, error)
+            if attempt:
+                self.counts["retries"] += 1
+            try:
+                results = await self._call(tool, query, timeout)
+            except Exception as e:
+                error = e
+                self.breaker.record_failure()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.counts["timeouts"] += 1
+                    self.concurrency.on_overload()
+                elif is_rate_limited(e):
+                    self.counts["rate_limited"] += 1
+                    self.concurrency.on_overload()
+                    if attempt < self.max_retries:
+                        delay = self.backoff(attempt)
+                        logger.info(f"Search throttled, retrying in {delay:.1f}s: {key}")
+                        await asyncio.sleep(delay)
+                        continue
+                # Only throttling is retried; anything else is unlikely to pass on a retry
+                break
+            else:
+                self.breaker.record_success()
+                self.concurrency.on_success()
+                await asyncio.to_thread(_cache_set, key, results)
+                return results
+
+        self.counts["failures"] += 1
+        return await self._fallback(key, error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.snapshot(),
+            "concurrency": self.concurrency.stats(),
+            **self.counts,
+        }
+
+
+search_gateway = SearchGateway(
+    CircuitBreaker(settings.SEARCH_BREAKER_FAILURES, settings.SEARCH_BREAKER_COOLDOWN_SECONDS),
+    AdaptiveConcurrency(settings.SEARCH_MAX_CONCURRENCY, settings.SEARCH_MIN_CONCURRENCY),
+    max_retries=settings.SEARCH_MAX_RETRIES,
+    backoff_base=settings.SEARCH_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.SEARCH_BACKOFF_MAX_SECONDS,
+)
+
+
+async def run_search(tool: Any, query: str, timeout: float = 15.0) -> Any:
+    """
+    Runs a (synchronous) LangChain search tool in a worker thread through the
+    shared search gateway: cached, throttled, retried and circuit-broken.
+    `timeout` applies to each provider call.
+    """
+    return await search_gateway.search(tool, query, timeout=timeout)
+
+
+def search_cache_stats() -> Dict[str, Any]:
+    if search_cache is None:
+        return {"name": "search", "enabled": False}
+    return {"enabled": True, **search_cache.stats()}
+
+
+def search_health() -> Dict[str, Any]:
+    """Breaker state, concurrency limit and outcome counters of the search gateway."""
+    return search_gateway.stats()
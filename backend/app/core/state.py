@@ -1,17 +1,83 @@
-from typing import TypedDict, List, Dict, Any, Optional
+import operator
+import time
+from typing import TypedDict, List, Dict, Any, Optional, Annotated
 from pydantic import BaseModel
+from app.core.config import settings
+
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reducer for dict fields written by parallel branches.
+    Keys from the newer update win.
+    """
+    return {**(left or {}), **(right or {})}
+
+
+def last_value(left: Any, right: Any) -> Any:
+    """
+    Reducer for scalar fields that parallel branches may both write.
+    """
+    return right
+
+
+def append_bounded(left: Optional[List[Any]], right: Optional[List[Any]]) -> List[Any]:
+    """
+    Reducer for message lists: appends, then keeps the newest PROGRESS_UPDATES_MAX items.
+    """
+    merged = (left or []) + (right or [])
+    return merged[-settings.PROGRESS_UPDATES_MAX:]
+
+
+def append_progress_log(left: Optional[List[Dict[str, Any]]], right: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Reducer for progress_log: numbers new entries after the last sequence number
+    and keeps a ring buffer of the newest PROGRESS_LOG_MAX entries.
+    Sequence numbers keep increasing after old entries are dropped.
+    """
+    merged = list(left or [])
+    seq = merged[-1]["seq"] if merged else 0
+    for entry in right or []:
+        seq += 1
+        merged.append({**entry, "seq": seq})
+    return merged[-settings.PROGRESS_LOG_MAX:]
+
+
+def progress_entry(message: str, type: str = "progress", node: Optional[str] = None) -> Dict[str, Any]:
+    """
+    A typed progress_log event; `seq` is assigned by the reducer.
+    Types: progress, error, status.
+    """
+    return {"type": type, "node": node, "message": message, "ts": time.time()}
+
+
+def progress_log_for(update: Dict[str, Any], node: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    progress_log entries mirroring the progress_updates and errors in a node update.
+    """
+    entries = [progress_entry(m, "progress", node) for m in update.get("progress_updates") or []]
+    entries += [progress_entry(m, "error", node) for m in update.get("errors") or []]
+    return entries
+
 
 class ResearchState(TypedDict):
     topic: str
     customization: Dict[str, Any]
     research_plan: Optional[Dict[str, Any]]
-    web_findings: List[Dict[str, Any]]
-    technical_findings: List[Dict[str, Any]]
-    business_findings: List[Dict[str, Any]]
+    # List fields are appended to by concurrent branches, so they use reducers
+    # and nodes must return only the items they added.
+    web_findings: Annotated[List[Dict[str, Any]], operator.add]
+    technical_findings: Annotated[List[Dict[str, Any]], operator.add]
+    business_findings: Annotated[List[Dict[str, Any]], operator.add]
     synthesized_content: Optional[Dict[str, Any]]
     html_output: Optional[str]
     quality_report: Optional[Dict[str, Any]]
-    status: str
-    progress_updates: List[str]
-    errors: List[str]
-    metadata: Dict[str, Any]
+    status: Annotated[str, last_value]
+    progress_updates: Annotated[List[str], append_bounded]
+    errors: Annotated[List[str], append_bounded]
+    # Sequenced, typed events ({seq, type, node, message, ts}) for incremental polling
+    progress_log: Annotated[List[Dict[str, Any]], append_progress_log]
+    metadata: Annotated[Dict[str, Any], merge_dicts]
+
+
+# Fields merged by appending; used to turn an agent's mutated state into a delta.
+APPEND_FIELDS = ("web_findings", "technical_findings", "business_findings", "progress_updates", "errors")
@@ -1,3 +1,294 @@
-# In-memory store for MVP
-# Ideally, this should be a database (Postgres/Redis)
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from app.core.config import settings, logger
+
+# In-memory store for MVP; backing dict of the default "memory" backend
 RESEARCH_STORE = {}
+
+
+class ResearchStore(ABC):
+    """
+    Persistence for research runs, keyed by research_id.
+    """
+
+    @abstractmethod
+    def create(self, research_id: str, state: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def save(self, research_id: str, state: Dict[str, Any]) -> None:
+        """Replaces the stored state of a run."""
+        pass
+
+    @abstractmethod
+    def update(self, research_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merges top-level keys into the stored state; returns the result or None if missing."""
+        pass
+
+    @abstractmethod
+    def get(self, research_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def delete(self, research_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def claim(self, research_id: str, expected: List[str], status: str) -> bool:
+        """
+        Atomically moves a run to `status` if its current status is one of
+        `expected`; only one of several competing workers succeeds.
+        """
+        pass
+
+    @abstractmethod
+    def list_by_status(self, status: str, limit: int = 100) -> List[str]:
+        """research_ids with the given status, oldest first."""
+        pass
+
+    @abstractmethod
+    def get_fields(self, research_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """Only the requested top-level fields of a run, or None if missing."""
+        pass
+
+    @abstractmethod
+    def get_progress(self, research_id: str, after: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """progress_log entries with seq greater than `after`, or None if missing."""
+        pass
+
+    @abstractmethod
+    def save_trace(self, research_id: str, trace: Dict[str, Any]) -> None:
+        """Replaces the run's trace (app.core.tracing); kept apart from the state."""
+        pass
+
+    @abstractmethod
+    def get_trace(self, research_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+
+class MemoryResearchStore(ResearchStore):
+    """
+    Process-local dict. Fast, but lost on restart and not shared between workers.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.data = RESEARCH_STORE if data is None else data
+        self._created: Dict[str, float] = {}
+        self._traces: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, research_id: str, state: Dict[str, Any]) -> None:
+        self.data[research_id] = state
+        self._created[research_id] = time.time()
+
+    def save(self, research_id: str, state: Dict[str, Any]) -> None:
+        self.data[research_id] = state
+
+    def update(self, research_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        state = self.data.get(research_id)
+        if state is None:
+            return None
+        state.update(changes)
+        return state
+
+    def get(self, research_id: str) -> Optional[Dict[str, Any]]:
+        return self.data.get(research_id)
+
+    def delete(self, research_id: str) -> None:
+        self.data.pop(research_id, None)
+        self._created.pop(research_id, None)
+        self._traces.pop(research_id, None)
+
+    def claim(self, research_id: str, expected: List[str], status: str) -> bool:
+        state = self.data.get(research_id)
+        if state is None or state.get("status") not in expected:
+            return False
+        state["status"] = status
+        return True
+
+    def list_by_status(self, status: str, limit: int = 100) -> List[str]:
+        ids = [r_id for r_id, state in self.data.items() if state.get("status") == status]
+        ids.sort(key=lambda r_id: self._created.get(r_id, 0))
+        return ids[:limit]
+
+    def get_fields(self, research_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        state = self.data.get(research_id)
+        if state is None:
+            return None
+        return {f: state.get(f) for f in fields}
+
+    def get_progress(self, research_id: str, after: int = 0) -> Optional[List[Dict[str, Any]]]:
+        state = self.data.get(research_id)
+        if state is None:
+            return None
+        return [e for e in state.get("progress_log") or [] if e["seq"] > after]
+
+    def save_trace(self, research_id: str, trace: Dict[str, Any]) -> None:
+        self._traces[research_id] = trace
+
+    def get_trace(self, research_id: str) -> Optional[Dict[str, Any]]:
+        return self._traces.get(research_id)
+
+
+class SQLiteResearchStore(ResearchStore):
+    """
+    SQLite (WAL) backend. Several uvicorn workers can share one database file:
+    readers never block the writer and writes are serialized by SQLite.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS research_runs (
+                research_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                topic TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                state TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_research_runs_status ON research_runs(status, created_at);
+            CREATE TABLE IF NOT EXISTS research_traces (
+                research_id TEXT PRIMARY KEY,
+                trace TEXT NOT NULL
+            );
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; route handlers run in a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, research_id: str, state: Dict[str, Any]) -> None:
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO research_runs (research_id, status, topic, created_at, updated_at, state) VALUES (?, ?, ?, ?, ?, ?)",
+            (research_id, state.get("status", ""), state.get("topic"), now, now, json.dumps(state)),
+        )
+
+    def save(self, research_id: str, state: Dict[str, Any]) -> None:
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO research_runs (research_id, status, topic, created_at, updated_at, state) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(research_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, state = excluded.state",
+            (research_id, state.get("status", ""), state.get("topic"), now, now, json.dumps(state)),
+        )
+
+    def update(self, research_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so concurrent read-modify-writes
+        # from other workers cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT state FROM research_runs WHERE research_id = ?", (research_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            state = json.loads(row[0])
+            state.update(changes)
+            conn.execute(
+                "UPDATE research_runs SET status = ?, updated_at = ?, state = ? WHERE research_id = ?",
+                (state.get("status", ""), time.time(), json.dumps(state), research_id),
+            )
+            conn.execute("COMMIT")
+            return state
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, research_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT state FROM research_runs WHERE research_id = ?", (research_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, research_id: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM research_runs WHERE research_id = ?", (research_id,))
+        conn.execute("DELETE FROM research_traces WHERE research_id = ?", (research_id,))
+
+    def claim(self, research_id: str, expected: List[str], status: str) -> bool:
+        placeholders = ", ".join("?" for _ in expected)
+        cursor = self._connection().execute(
+            f"UPDATE research_runs SET status = ?, updated_at = ?, state = json_set(state, '$.status', ?) "
+            f"WHERE research_id = ? AND status IN ({placeholders})",
+            (status, time.time(), status, research_id, *expected),
+        )
+        return cursor.rowcount == 1
+
+    def list_by_status(self, status: str, limit: int = 100) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT research_id FROM research_runs WHERE status = ? ORDER BY created_at LIMIT ?", (status, limit)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def get_fields(self, research_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        # Extract inside SQLite so large fields (html_output, findings) are never
+        # decoded or sent back to Python
+        if not fields:
+            exists = self._connection().execute(
+                "SELECT 1 FROM research_runs WHERE research_id = ?", (research_id,)
+            ).fetchone()
+            return {} if exists else None
+        paths = ", ".join("json_extract(state, ?)" for _ in fields)
+        row = self._connection().execute(
+            f"SELECT json_array({paths}) FROM research_runs WHERE research_id = ?",
+            [f'$."{f}"' for f in fields] + [research_id],
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(fields, json.loads(row[0])))
+
+    def get_progress(self, research_id: str, after: int = 0) -> Optional[List[Dict[str, Any]]]:
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM research_runs WHERE research_id = ?", (research_id,)).fetchone() is None:
+            return None
+        rows = conn.execute(
+            "SELECT entry.value FROM research_runs, json_each(research_runs.state, '$.progress_log') AS entry "
+            "WHERE research_runs.research_id = ? AND json_extract(entry.value, '$.seq') > ? ORDER BY entry.key",
+            (research_id, after),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def save_trace(self, research_id: str, trace: Dict[str, Any]) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO research_traces (research_id, trace) VALUES (?, ?)",
+            (research_id, json.dumps(trace)),
+        )
+
+    def get_trace(self, research_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT trace FROM research_traces WHERE research_id = ?", (research_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def build_research_store(backend: str = None, path: str = None) -> ResearchStore:
+    backend = (backend or settings.RESEARCH_STORE_BACKEND).lower()
+    if backend == "sqlite":
+        path = path or settings.RESEARCH_STORE_PATH
+        logger.info(f"Using SQLite research store at {path}")
+        return SQLiteResearchStore(path)
+    if backend != "memory":
+        raise ValueError(f"Unknown RESEARCH_STORE_BACKEND: {backend}")
+    return MemoryResearchStore()
+
+
+research_store = build_research_store()
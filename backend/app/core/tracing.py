@@ -0,0 +1,319 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Span categories that wait on a remote service; everything else is local work
+NETWORK_CATEGORIES = ("llm", "search", "fetch")
+# Spans that wait for local capacity (LLM rate limits, search concurrency slots);
+# neither network nor CPU time
+QUEUE_CATEGORIES = ("queue",)
+
+# Span times are rounded to microseconds, so compare with some slack
+_EPSILON = 1e-6
+
+
+class RunTrace:
+    """
+    Span tree of one research run: the run, its graph nodes and, under them,
+    every search, LLM call and scrape. Times are seconds since the run started,
+    measured with time.perf_counter.
+    """
+
+    def __init__(self, research_id: str, max_spans: int = 5000):
+        self.research_id = research_id
+        self.started_at = time.time()
+        self.max_spans = max_spans
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        # Spans are finished from worker threads too (e.g. HTTP stream close)
+        self._lock = threading.Lock()
+        self._tokens: List[Tuple[ContextVar, Any]] = []
+
+    def now(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def start(self, name: str, cat: str, parent: Optional[int], args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped += 1
+                return None
+            span = {
+                "id": next(self._ids), "parent": parent, "name": name, "cat": cat,
+                "start": self.now(), "end": None, "args": args,
+            }
+            self.spans.append(span)
+            return span
+
+    def finish(self, span: Dict[str, Any], args: Dict[str, Any]):
+        with self._lock:
+            span["args"].update(args)
+            if span["end"] is None:
+                span["end"] = self.now()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready copy; spans still open end now and are marked unfinished."""
+        with self._lock:
+            now = self.now()
+            spans = []
+            for s in self.spans:
+                args = dict(s["args"])
+                if s["end"] is None:
+                    args["unfinished"] = True
+                spans.append({
+                    **s,
+                    "start": round(s["start"], 6),
+                    "end": round(s["end"] if s["end"] is not None else now, 6),
+                    "args": args,
+                })
+            return {
+                "research_id": self.research_id,
+                "started_at": self.started_at,
+                "spans": spans,
+                "dropped": self.dropped,
+            }
+
+
+class Span:
+    """Handle on an open span. Outside a traced run every method is a no-op."""
+
+    def __init__(self, trace: Optional[RunTrace] = None, data: Optional[Dict[str, Any]] = None):
+        self.trace = trace if data is not None else None
+        self.data = data
+
+    @property
+    def id(self) -> Optional[int]:
+        return self.data["id"] if self.data is not None else None
+
+    def set(self, **args):
+        if self.trace is not None:
+            with self.trace._lock:
+                self.data["args"].update(args)
+
+    def finish(self, **args):
+        if self.trace is not None:
+            self.trace.finish(self.data, args)
+
+
+_trace: ContextVar[Optional[RunTrace]] = ContextVar("run_trace", default=None)
+_parent: ContextVar[Optional[int]] = ContextVar("trace_parent", default=None)
+
+# Runs being traced in this process, so in-progress traces can be served
+_active: Dict[str, RunTrace] = {}
+
+
+def start_run_trace(research_id: str, **args) -> Optional[RunTrace]:
+    """
+    Starts tracing the current task's run: spans opened from here on (and in
+    tasks and threads started from here) land in this trace under the root
+    "run" span. None when TRACE_ENABLED is off.
+    """
+    if not settings.TRACE_ENABLED:
+        return None
+    trace = RunTrace(research_id, settings.TRACE_MAX_SPANS)
+    root = trace.start("run", "run", None, args)
+    trace._tokens = [(_trace, _trace.set(trace)), (_parent, _parent.set(root["id"]))]
+    _active[research_id] = trace
+    return trace
+
+
+def end_run_trace(trace: RunTrace, **args) -> Dict[str, Any]:
+    """Finishes the root span, detaches the trace from the task and returns it as a dict."""
+    trace.finish(trace.spans[0], args)
+    if _active.get(trace.research_id) is trace:
+        del _active[trace.research_id]
+    for var, token in reversed(trace._tokens):
+        try:
+            var.reset(token)
+        except ValueError:
+            # Ended from another context; nothing of ours to restore there
+            pass
+    trace._tokens = []
+    return trace.to_dict()
+
+
+def active_trace(research_id: str) -> Optional[Dict[str, Any]]:
+    trace = _active.get(research_id)
+    return trace.to_dict() if trace is not None else None
+
+
+def start_span(name: str, cat: str, **args) -> Span:
+    """
+    Opens a span under the current one without making it current; for work
+    that ends somewhere else (see PooledLLMTransport). Call finish() on it.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return Span()
+    return Span(trace, trace.start(name, cat, _parent.get(), args))
+
+
+@contextmanager
+def span(name: str, cat: str, **args) -> Iterator[Span]:
+    """Span around a block; spans opened inside the block become its children."""
+    current = start_span(name, cat, **args)
+    token = _parent.set(current.id) if current.trace is not None else None
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.finish()
+        if token is not None:
+            _parent.reset(token)
+
+
+def _union_seconds(intervals: List[Tuple[float, float]]) -> float:
+    """Time covered by at least one interval."""
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def _label(s: Dict[str, Any]) -> str:
+    args = s["args"]
+    detail = str(args.get("question_id") or args.get("model") or args.get("query") or args.get("url") or "")
+    if len(detail) > 60:
+        detail = detail[:57] + "..."
+    return f"{s['name']} ({detail})" if detail and detail != s["name"] else s["name"]
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The chain of spans that determined when the run finished. Within each span,
+    walks back from its end through the children that finished last without
+    overlapping each other, then descends into each of them.
+    """
+    if not spans:
+        return []
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for s in spans:
+        children.setdefault(s["parent"], []).append(s)
+
+    def walk(s: Dict[str, Any]) -> List[Dict[str, Any]]:
+        chain, cursor = [], s["end"]
+        for child in sorted(children.get(s["id"], []), key=lambda c: c["end"], reverse=True):
+            if child["end"] <= cursor + _EPSILON:
+                chain.append(child)
+                cursor = child["start"]
+        path = [s]
+        for child in reversed(chain):
+            path.extend(walk(child))
+        return path
+
+    return walk(spans[0])
+
+
+def trace_summary(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Wall time, the share spent with at least one network call (LLM, search,
+    page fetch) in flight, the share spent only queued for a rate limit or
+    concurrency slot, the rest (CPU-bound work: parsing, dedup, state
+    handling), time per category and the critical path.
+    """
+    spans = trace["spans"]
+    if not spans:
+        return {}
+    wall = spans[0]["end"] - spans[0]["start"]
+    network = _union_seconds([(s["start"], s["end"]) for s in spans if s["cat"] in NETWORK_CATEGORIES])
+    # Queue time that overlaps a network call in flight already counts as network
+    waiting = _union_seconds([
+        (s["start"], s["end"]) for s in spans if s["cat"] in NETWORK_CATEGORIES + QUEUE_CATEGORIES
+    ])
+    queue = max(0.0, waiting - network)
+    categories = sorted({s["cat"] for s in spans} - {"run"})
+    path = critical_path(spans)
+    path_leaves = [s for s in path if not any(p["parent"] == s["id"] for p in path)]
+    return {
+        "wall_seconds": round(wall, 3),
+        "network_seconds": round(network, 3),
+        "queue_seconds": round(queue, 3),
+        "cpu_seconds": round(max(0.0, wall - waiting), 3),
+        "network_share": round(network / wall, 3) if wall else 0.0,
+        "queue_share": round(queue / wall, 3) if wall else 0.0,
+        "cpu_share": round(max(0.0, 1 - waiting / wall), 3) if wall else 0.0,
+        "by_category": {
+            cat: round(_union_seconds([(s["start"], s["end"]) for s in spans if s["cat"] == cat]), 3)
+            for cat in categories
+        },
+        "critical_path": [
+            {"id": s["id"], "name": _label(s), "cat": s["cat"], "start": s["start"], "seconds": round(s["end"] - s["start"], 3)}
+            for s in path
+        ],
+        "critical_path_network_seconds": round(
+            sum(s["end"] - s["start"] for s in path_leaves if s["cat"] in NETWORK_CATEGORIES), 3
+        ),
+        "spans": len(spans),
+        "dropped_spans": trace.get("dropped", 0),
+    }
+
+
+def _lanes(spans: List[Dict[str, Any]]) -> Dict[int, int]:
+    """
+    Row (tid) per span such that spans on a row nest properly, which Chrome's
+    viewer requires of complete events. Children prefer their parent's row.
+    """
+    rows: List[List[float]] = []  # stack of open span ends per row
+    lane_of: Dict[int, int] = {}
+    for s in sorted(spans, key=lambda s: (s["start"], -s["end"])):
+        preferred = lane_of.get(s["parent"])
+        candidates = ([preferred] if preferred is not None else []) + list(range(len(rows)))
+        for lane in candidates:
+            stack = rows[lane]
+            while stack and stack[-1] <= s["start"] + _EPSILON:
+                stack.pop()
+            if not stack or stack[-1] + _EPSILON >= s["end"]:
+                break
+        else:
+            rows.append([])
+            lane = len(rows) - 1
+        rows[lane].append(s["end"])
+        lane_of[s["id"]] = lane
+    return lane_of
+
+
+def chrome_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Trace Event Format ("X" complete events, microseconds) that loads in
+    chrome://tracing and Perfetto. The summary rides along as an extra key.
+    """
+    lanes = _lanes(trace["spans"])
+    events: List[Dict[str, Any]] = [
+        {"ph": "M", "name": "process_name", "pid": 1, "args": {"name": f"research {trace['research_id']}"}},
+    ]
+    for s in trace["spans"]:
+        events.append({
+            "name": s["name"],
+            "cat": s["cat"],
+            "ph": "X",
+            "ts": round(s["start"] * 1e6),
+            "dur": round((s["end"] - s["start"]) * 1e6),
+            "pid": 1,
+            "tid": lanes[s["id"]] + 1,
+            "args": {**s["args"], "span_id": s["id"], "parent_id": s["parent"]},
+        })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "research_id": trace["research_id"],
+            "started_at": trace["started_at"],
+            "dropped_spans": trace.get("dropped", 0),
+        },
+        "summary": trace_summary(trace),
+    }
@@ -1,11 +1,39 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import research
+from app.core.search import search_cache_stats, search_health
+from app.core.llm import llm_cache_stats
+from app.core.llm_clients import close_llm_clients, llm_client_stats
+from app.core.metrics import render_metrics
+from app.utils.scraper import close_fetcher, shutdown_parse_pool
+from app.utils.page_cache import page_cache_stats
+from app.core.config import settings
+from app.core.checkpoints import close_checkpointer
+from app.core.scheduler import run_scheduler
+from app.core.jobs import get_job_queue, worker_mode
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.RESUME_ON_STARTUP and not worker_mode():
+        # Continue runs interrupted by the last shutdown from their checkpoints.
+        # In worker mode the workers requeue runs whose worker stopped instead.
+        await research.recover_interrupted_runs()
+    yield
+    # Release pooled connections held by the shared page fetcher
+    await close_fetcher()
+    await close_llm_clients()
+    shutdown_parse_pool()
+    await close_checkpointer()
+
 
 app = FastAPI(
     title="Agentic Research Studio API",
     description="API for Agentic Research Studio",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -24,3 +52,34 @@ app.include_router(research.router, prefix="/research", tags=["research"])
 async def health_check():
     return {"status": "ok", "version": "0.1.0"}
 
+@app.get("/health/search")
+async def search_health_check():
+    """Search provider circuit breaker, adaptive concurrency and call outcomes."""
+    return search_health()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"search": search_cache_stats(), "llm": llm_cache_stats(), "pages": page_cache_stats()}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    if worker_mode():
+        return {"mode": "worker", "jobs": await asyncio.to_thread(get_job_queue().stats)}
+    return {"mode": "inprocess", **run_scheduler.stats()}
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Shared LLM clients and per-model rate limiter queueing (waits in seconds)."""
+    return llm_client_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of this process; run gauges come from the scheduler or job queue."""
+    if worker_mode():
+        jobs = await asyncio.to_thread(get_job_queue().stats)
+        active, queued = jobs.get("running", 0), jobs.get("queued", 0)
+    else:
+        stats = run_scheduler.stats()
+        active, queued = stats["running"], stats["queued"]
+    body, content_type = render_metrics(active, queued)
+    return Response(body, media_type=content_type)
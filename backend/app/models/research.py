@@ -1,15 +1,21 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
+# Highest priority a client may request for its run
+MAX_REQUEST_PRIORITY = 10
+
 # --- Request/Response Models ---
 class ResearchRequest(BaseModel):
     topic: str
     customization: Dict[str, Any] = {}
+    # Higher runs first when runs are queued
+    priority: int = Field(0, ge=0, le=MAX_REQUEST_PRIORITY)
 
 class ResearchResponse(BaseModel):
     research_id: str
     status: str
     message: str
+    queue_position: Optional[int] = None
 
 # --- Domain Models ---
 class ResearchQuestion(BaseModel):
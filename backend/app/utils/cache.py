@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import logger
+from app.core.metrics import CACHE_REQUESTS
+
+
+class TieredCache:
+    """
+    Two-tier key/value cache: an in-memory LRU in front of an on-disk SQLite table.
+
+    Values must be JSON serializable. Entries expire after `ttl` seconds and the
+    disk tier is trimmed (least recently used first) to `max_entries` and `max_bytes`.
+    Thread-safe, so it can be used from `asyncio.to_thread` workers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: Optional[str] = None,
+        ttl: float = 3600,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        memory_entries: int = 512,
+    ):
+        self.name = name
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self._open_disk(path)
+
+    def _open_disk(self, path: str):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"{self.name} cache: disk tier disabled ({e})")
+            self._conn = None
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Returns the cached value or None. `max_age` overrides the TTL for this lookup,
+        e.g. to accept stale entries as a fallback.
+        """
+        entry = self.get_entry(key, max_age=max_age)
+        return entry[1] if entry else None
+
+    def get_entry(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[float, Any]]:
+        """
+        Like `get`, but returns `(created_at, value)` so callers can judge freshness.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] <= max_age:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                CACHE_REQUESTS.labels(self.name, "memory_hit").inc()
+                return entry
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] <= max_age:
+                        self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        entry = (row[1], json.loads(row[0]))
+                        self._remember(key, entry)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        CACHE_REQUESTS.labels(self.name, "disk_hit").inc()
+                        return entry
+                except sqlite3.Error as e:
+                    logger.warning(f"{self.name} cache read failed: {e}")
+
+            self.misses += 1
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(key, (now, value))
+            if self._conn is None:
+                return
+            if len(payload) > self.max_bytes:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now),
+                )
+                self._evict(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"{self.name} cache write failed: {e}")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache")
+                self._conn.commit()
+
+    def _remember(self, key: str, entry: Tuple[float, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        # Expired entries first, then least recently used until under both limits
+        cur = self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl,))
+        evicted = max(cur.rowcount, 0)
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                count -= 1
+                total -= size
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+            evicted += len(doomed)
+        self.evictions += evicted
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
@@ -0,0 +1,157 @@
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Universal hashing modulo a Mersenne prime: with 32-bit shingle hashes and
+# coefficients below 2**31, a * h + b fits in uint64 without overflow
+_PRIME = np.uint64((1 << 61) - 1)
+
+_WORD = re.compile(r"\w+")
+
+
+def finding_text_key(f: Dict[str, Any]) -> Optional[str]:
+    """The field the synthesizer reads for a finding (see format_finding)."""
+    if f.get("content"):
+        return "content"
+    if f.get("raw_content"):
+        return "raw_content"
+    return None
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles. The fraction of equal signature
+    positions estimates the Jaccard similarity of two texts' shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        k = min(self.shingle_size, len(words)) or 1
+        grams = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        # (num_perm, shingles) permuted hashes, minimum per permutation
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, len(self.a)), dtype=np.uint64)
+        return np.vstack([self.signature(t) for t in texts])
+
+
+def near_duplicates(signatures: np.ndarray, threshold: float) -> List[Optional[int]]:
+    """
+    For each row, the index of the first earlier row it nearly duplicates
+    (estimated Jaccard >= threshold), or None. Earlier rows always win, so
+    the first occurrence of a text is the one kept.
+    """
+    owners: List[Optional[int]] = [None] * len(signatures)
+    kept: List[int] = []
+    for i in range(len(signatures)):
+        if kept:
+            similarity = (signatures[kept] == signatures[i]).mean(axis=1)
+            best = int(similarity.argmax())
+            if similarity[best] >= threshold:
+                owners[i] = kept[best]
+                continue
+        kept.append(i)
+    return owners
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p for p in re.split(r"\n\s*\n|\n(?=\s*[-*\d]+[.)]?\s)", text) if p.strip()]
+
+
+def source_ref(f: Dict[str, Any], f_type: str) -> Dict[str, Any]:
+    return {
+        "type": f_type,
+        "question_id": f.get("question_id"),
+        "question": f.get("question"),
+        "source": f.get("source"),
+        "url": f.get("url"),
+    }
+
+
+def dedup_findings(
+    findings: List[Tuple[str, Dict[str, Any]]],
+    threshold: float = 0.8,
+    min_paragraph_words: int = 8,
+    hasher: Optional[MinHasher] = None,
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, int]]:
+    """
+    Collapses near-duplicate findings and paragraphs.
+
+    A finding whose text nearly duplicates an earlier one is dropped and its
+    source reference is added to the earlier finding's "duplicates" list.
+    In the remaining findings, paragraphs repeated from an earlier paragraph are
+    removed; a finding left with no text is collapsed the same way. Findings
+    that change are copied; untouched ones are returned as they are.
+    """
+    hasher = hasher or MinHasher()
+    stats = {"findings_merged": 0, "paragraphs_removed": 0}
+    result: List[Optional[Tuple[str, Dict[str, Any]]]] = list(findings)
+
+    def merge_into(owner: int, f_type: str, f: Dict[str, Any]):
+        owner_type, owner_f = result[owner]
+        refs = list(owner_f.get("duplicates", [])) + [source_ref(f, f_type)] + list(f.get("duplicates", []))
+        result[owner] = (owner_type, {**owner_f, "duplicates": refs})
+        stats["findings_merged"] += 1
+
+    # 1. Whole findings
+    indexed = [(i, f) for i, (_, f) in enumerate(findings) if finding_text_key(f)]
+    signatures = hasher.signatures([f[finding_text_key(f)] for _, f in indexed])
+    for pos, owner_pos in enumerate(near_duplicates(signatures, threshold)):
+        if owner_pos is not None:
+            i, f = indexed[pos]
+            merge_into(indexed[owner_pos][0], findings[i][0], f)
+            result[i] = None
+
+    # 2. Paragraphs across the remaining findings
+    paragraphs: List[Tuple[int, int]] = []
+    texts: List[str] = []
+    split: Dict[int, List[str]] = {}
+    for i, item in enumerate(result):
+        if item is None or not finding_text_key(item[1]):
+            continue
+        split[i] = split_paragraphs(item[1][finding_text_key(item[1])])
+        for j, p in enumerate(split[i]):
+            # Short lines (headings, one-liners) are too small to compare reliably
+            if len(_WORD.findall(p)) >= min_paragraph_words:
+                paragraphs.append((i, j))
+                texts.append(p)
+
+    removed: Dict[int, Dict[int, int]] = {}
+    for pos, owner_pos in enumerate(near_duplicates(hasher.signatures(texts), threshold)):
+        if owner_pos is not None:
+            i, j = paragraphs[pos]
+            removed.setdefault(i, {})[j] = paragraphs[owner_pos][0]
+
+    collapsed: Dict[int, int] = {}
+    for i, dropped in sorted(removed.items()):
+        f_type, f = result[i]
+        key = finding_text_key(f)
+        kept = [p for j, p in enumerate(split[i]) if j not in dropped]
+        stats["paragraphs_removed"] += len(dropped)
+        if kept:
+            result[i] = (f_type, {**f, key: "\n\n".join(p.strip("\n") for p in kept)})
+            continue
+        # Nothing of its own left: credit its source to where its first paragraph lives
+        owner = dropped[min(dropped)]
+        while owner in collapsed:
+            owner = collapsed[owner]
+        merge_into(owner, f_type, f)
+        result[i] = None
+        collapsed[i] = owner
+
+    return [item for item in result if item is not None], stats
@@ -0,0 +1,146 @@
+import os
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.utils.cache import TieredCache
+
+
+def parse_domain_freshness(spec: str) -> Dict[str, int]:
+    """
+    Parses "domain=seconds,domain=seconds" into a dict.
+    """
+    overrides = {}
+    for pair in (spec or "").split(","):
+        if "=" not in pair:
+            continue
+        domain, seconds = pair.split("=", 1)
+        try:
+            overrides[domain.strip().lower().lstrip(".")] = int(seconds)
+        except ValueError:
+            continue
+    return overrides
+
+
+def cache_max_age(response_headers: Any) -> Optional[int]:
+    """
+    Freshness lifetime from a Cache-Control header: max-age, 0 for
+    no-cache/no-store, None when the server did not say.
+    """
+    directives = [d.strip().lower() for d in (response_headers.get("cache-control") or "").split(",")]
+    if "no-cache" in directives or "no-store" in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return max(0, int(directive.split("=", 1)[1].strip('"')))
+            except ValueError:
+                return None
+    return None
+
+
+class PageCache:
+    """
+    Disk-backed cache of extracted pages plus their HTTP validators.
+
+    Stored values look like {"extraction": {...}, "etag": ..., "last_modified": ...,
+    "max_age": ...}. An entry is served without any request while fresh: for the
+    configured time of its domain, else for the server's Cache-Control max-age,
+    else for the default. After that it is revalidated with If-None-Match /
+    If-Modified-Since.
+    """
+
+    def __init__(self, cache: TieredCache, default_freshness: int = 0, domain_freshness: Dict[str, int] = None):
+        self.cache = cache
+        self.default_freshness = default_freshness
+        self.domain_freshness = domain_freshness or {}
+        self.revalidated = 0
+
+    @staticmethod
+    def key(url: str, max_chars: int) -> str:
+        return f"{max_chars}:{url}"
+
+    def freshness_for(self, url: str, max_age: Optional[int] = None) -> int:
+        host = urlsplit(url).hostname or ""
+        # Most specific matching domain wins: docs.python.org before python.org
+        parts = host.lower().split(".")
+        for i in range(len(parts)):
+            domain = ".".join(parts[i:])
+            if domain in self.domain_freshness:
+                return self.domain_freshness[domain]
+        return self.default_freshness if max_age is None else max_age
+
+    def lookup(self, url: str, max_chars: int) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry with an added "fresh" flag, or None.
+        """
+        found = self.cache.get_entry(self.key(url, max_chars))
+        if not found:
+            return None
+        validated_at, value = found
+        return {**value, "fresh": time.time() - validated_at < self.freshness_for(url, value.get("max_age"))}
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, max_chars: int, extraction: Dict[str, str], response_headers: Any):
+        etag = response_headers.get("etag")
+        last_modified = response_headers.get("last-modified")
+        max_age = cache_max_age(response_headers)
+        if not etag and not last_modified and not self.freshness_for(url, max_age):
+            # Nothing to revalidate with and never served fresh
+            return
+        self.cache.set(self.key(url, max_chars), {
+            "extraction": extraction,
+            "etag": etag,
+            "last_modified": last_modified,
+            "max_age": max_age,
+        })
+
+    def mark_revalidated(self, url: str, max_chars: int, entry: Dict[str, Any], response_headers: Any = None):
+        """
+        Records a 304 so the entry's freshness window restarts. Validators and
+        Cache-Control sent with the 304 replace the stored ones.
+        """
+        self.revalidated += 1
+        value = {k: v for k, v in entry.items() if k != "fresh"}
+        if response_headers is not None:
+            value["etag"] = response_headers.get("etag") or value.get("etag")
+            value["last_modified"] = response_headers.get("last-modified") or value.get("last_modified")
+            if response_headers.get("cache-control"):
+                value["max_age"] = cache_max_age(response_headers)
+        self.cache.set(self.key(url, max_chars), value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "revalidated": self.revalidated}
+
+
+def _build_page_cache() -> Optional[PageCache]:
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    return PageCache(
+        TieredCache(
+            "pages",
+            path=os.path.join(settings.CACHE_DIR, "pages.sqlite"),
+            ttl=settings.PAGE_CACHE_TTL_SECONDS,
+            max_entries=settings.PAGE_CACHE_MAX_ENTRIES,
+            max_bytes=settings.PAGE_CACHE_MAX_BYTES,
+        ),
+        default_freshness=settings.PAGE_CACHE_FRESH_SECONDS,
+        domain_freshness=parse_domain_freshness(settings.PAGE_CACHE_DOMAIN_FRESHNESS),
+    )
+
+
+page_cache = _build_page_cache()
+
+
+def page_cache_stats() -> Dict[str, Any]:
+    if page_cache is None:
+        return {"name": "pages", "enabled": False}
+    return {"enabled": True, **page_cache.stats()}
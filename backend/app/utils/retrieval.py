@@ -0,0 +1,94 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.dedup import split_paragraphs
+from app.utils.tokens import CHARS_PER_TOKEN, count_tokens
+
+_WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this "
+    "to was were will with what which who how why when where does do".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if len(w) > 1 and w not in STOPWORDS]
+
+
+def chunk_text(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """
+    Splits text into chunks of about max_tokens, on paragraph boundaries where
+    possible. Paragraphs longer than a chunk are cut at whitespace.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces: List[str] = []
+    for paragraph in split_paragraphs(text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    current, current_tokens = "", 0
+    for piece in pieces:
+        tokens = count_tokens(piece, model)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current = f"{current}\n\n{piece}" if current else piece
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a fixed list of documents.
+
+    Built once per run; queries only touch the postings of their own terms,
+    so a search costs roughly the number of matching documents rather than
+    the size of the corpus.
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        for i, doc in enumerate(documents):
+            terms = Counter(tokenize(doc))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings[term].append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (document index, score) pairs, best first; documents with no query terms are skipped."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[doc] / (self.avg_length or 1)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        # Ties go to the earlier document
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
@@ -1,48 +1,371 @@
-import requests
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Iterable, AsyncIterator, Tuple, Callable, NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
 from bs4 import BeautifulSoup
-from app.core.config import logger
-from typing import Optional, Dict
+from app.core.config import settings, logger
+from app.core.metrics import SCRAPE_LATENCY
+from app.core.tracing import span
+from app.utils.page_cache import PageCache, page_cache
+from app.utils.tokens import truncate_tokens
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.1',
+}
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+STRIPPED_TAGS = ["script", "style", "nav", "footer", "header", "aside"]
+
+
+class NonHTMLContentError(Exception):
+    """Raised when a response is not an HTML document; the body is never downloaded."""
+
 
-def scrape_text_from_url(url: str, max_chars: int = 5000) -> Optional[Dict[str, str]]:
+class FetchedPage(NamedTuple):
+    status: int
+    body: bytes
+    headers: httpx.Headers
+
+
+class PageFetcher:
     """
-    Fetches the content of a URL and extracts the main text.
-    Returns a dict with 'title', 'source', 'content' or None on failure.
+    Shared `httpx.AsyncClient` with keep-alive connection pooling plus a global
+    and a per-host concurrency limit. Bound to the event loop it was created on.
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-    }
-    
+
+    def __init__(
+        self,
+        max_connections: int = None,
+        max_per_host: int = None,
+        timeout: float = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections or settings.SCRAPER_MAX_CONNECTIONS
+        self.max_per_host = max_per_host or settings.SCRAPER_MAX_PER_HOST
+        self.timeout = timeout or settings.SCRAPER_TIMEOUT_SECONDS
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_limit = asyncio.Semaphore(self.max_connections)
+        # Per-host semaphores exist only while a request to the host holds or
+        # waits for one, so scraping arbitrary hosts does not grow the dict
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=settings.SCRAPER_KEEPALIVE_SECONDS,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """
+        Holds one global and one per-host concurrency slot for the duration of a request.
+        """
+        host = urlsplit(url).netloc.lower()
+        host_limit = self._host_limits.get(host)
+        if host_limit is None:
+            host_limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        try:
+            async with self._global_limit, host_limit:
+                yield
+        finally:
+            self._host_users[host] -= 1
+            if not self._host_users[host]:
+                del self._host_users[host]
+                del self._host_limits[host]
+
+    async def fetch(self, url: str) -> httpx.Response:
+        async with self.slot(url):
+            response = await self.client.get(url)
+            response.raise_for_status()
+            return response
+
+    async def fetch_page(self, url: str, max_bytes: int = None, headers: Dict[str, str] = None) -> FetchedPage:
+        """
+        Streams an HTML body, stopping after `max_bytes`. Non-HTML responses are
+        rejected from their headers before any of the body is read. A 304 reply to
+        a conditional request is returned with an empty body.
+        """
+        max_bytes = max_bytes or settings.SCRAPER_MAX_BYTES
+        async with self.slot(url):
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    return FetchedPage(304, b"", response.headers)
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if content_type and content_type not in HTML_CONTENT_TYPES:
+                    raise NonHTMLContentError(f"Unsupported content type: {content_type}")
+
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= max_bytes:
+                        logger.info(f"Truncated download of {url} at {max_bytes} bytes")
+                        break
+                return FetchedPage(response.status_code, bytes(body[:max_bytes]), response.headers)
+
+    async def fetch_html(self, url: str, max_bytes: int = None) -> bytes:
+        return (await self.fetch_page(url, max_bytes)).body
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_fetchers: Dict[asyncio.AbstractEventLoop, PageFetcher] = {}
+
+
+def get_fetcher() -> PageFetcher:
+    """
+    Process-wide fetcher for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    # Drop fetchers whose loops are gone (e.g. between test cases)
+    for stale in [l for l in _fetchers if l.is_closed()]:
+        _fetchers.pop(stale, None)
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        fetcher = _fetchers[loop] = PageFetcher()
+    return fetcher
+
+
+async def close_fetcher():
+    fetcher = _fetchers.pop(asyncio.get_running_loop(), None)
+    if fetcher is not None:
+        await fetcher.aclose()
+
+
+def _clean_text(text: str, max_chars: int) -> str:
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+
+    # Truncate if too long (tokens are precious)
+    if len(text) > max_chars:
+        text = text[:max_chars] + "... (truncated)"
+    return text
+
+
+def _parse_selectolax(html: bytes, url: str) -> Tuple[str, str]:
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+    title_node = tree.css_first("title")
+    title = title_node.text() if title_node else ""
+    tree.strip_tags(STRIPPED_TAGS)
+    root = tree.root
+    text = root.text(separator='\n') if root else ""
+    return title, text
+
+
+def _parse_lxml(html: bytes, url: str) -> Tuple[str, str]:
+    import lxml.html
+
+    doc = lxml.html.document_fromstring(html)
+    title = doc.findtext(".//title") or ""
+    for element in doc.xpath("|".join(f"//{tag}" for tag in STRIPPED_TAGS)):
+        element.drop_tree()
+    text = '\n'.join(doc.itertext())
+    return title, text
+
+
+def _parse_html_parser(html: bytes, url: str) -> Tuple[str, str]:
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.title.string if soup.title and soup.title.string else ""
+
+    # Remove script and style elements
+    for script in soup(STRIPPED_TAGS):
+        script.decompose()
+
+    return title, soup.get_text(separator='\n')
+
+
+PARSERS: Dict[str, Callable[[bytes, str], Tuple[str, str]]] = {
+    "selectolax": _parse_selectolax,
+    "lxml": _parse_lxml,
+    "html.parser": _parse_html_parser,
+}
+
+
+def resolve_parser(name: str = None) -> str:
+    """
+    Picks a parser backend. "auto" prefers the fastest installed one:
+    selectolax, then lxml, then the stdlib-based html.parser.
+    """
+    name = (name or settings.SCRAPER_PARSER or "auto").lower()
+    if name in PARSERS and name != "auto":
+        return name
+    for candidate, module in (("selectolax", "selectolax.parser"), ("lxml", "lxml.html")):
+        try:
+            __import__(module)
+            return candidate
+        except ImportError:
+            continue
+    return "html.parser"
+
+
+def extract_text(html: bytes, url: str, max_chars: int = 5000, parser: str = None) -> Dict[str, str]:
+    """
+    Extracts the title and main text from an HTML document.
+    Top-level and picklable so it can run in the parse process pool.
+    """
+    parser = parser or resolve_parser()
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            script.decompose()
-            
-        # Extract title
-        title = soup.title.string if soup.title else url
-        
-        # Extract text
-        text = soup.get_text(separator='\n')
-        
-        # Clean text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Truncate if too long (tokens are precious)
-        if len(text) > max_chars:
-            text = text[:max_chars] + "... (truncated)"
-            
-        return {
-            "title": title.strip(),
-            "source": url,
-            "content": text
-        }
-        
-    except Exception as e:
-        logger.warning(f"Failed to scrape {url}: {e}")
+        title, text = PARSERS[parser](html, url)
+    except ImportError:
+        title, text = _parse_html_parser(html, url)
+
+    return {
+        "title": (title or url).strip(),
+        "source": url,
+        "content": _clean_text(text, max_chars)
+    }
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    global _parse_pool
+    if settings.SCRAPER_PARSE_WORKERS <= 0:
         return None
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=settings.SCRAPER_PARSE_WORKERS)
+    return _parse_pool
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+async def parse_page(html: bytes, url: str, max_chars: int = 5000) -> Dict[str, str]:
+    """
+    Parses off the event loop: large pages go to a process pool so they do not
+    hold the API process's GIL, small ones to a thread to skip pickling costs.
+    """
+    parser = resolve_parser()
+    pool = _get_parse_pool() if len(html) > settings.SCRAPER_INLINE_PARSE_BYTES else None
+    if pool is None:
+        return await asyncio.to_thread(extract_text, html, url, max_chars, parser)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, extract_text, html, url, max_chars, parser)
+
+
+def _within_tokens(extraction: Dict[str, str], max_tokens: int) -> Dict[str, str]:
+    if not max_tokens:
+        return extraction
+    return {**extraction, "content": truncate_tokens(extraction["content"], max_tokens, marker="... (truncated)")}
+
+
+async def scrape_url(
+    url: str,
+    max_chars: int = 5000,
+    fetcher: Optional[PageFetcher] = None,
+    cache: Optional[PageCache] = None,
+    max_tokens: Optional[int] = None,
+) -> Optional[Dict[str, str]]:
+    """
+    Fetches a URL through the shared pooled client and extracts the main text.
+    Returns a dict with 'title', 'source', 'content' or None on failure.
+    The content is cut at max_chars, then at max_tokens (SCRAPER_MAX_TOKENS).
+
+    Extractions are kept in the page cache: fresh entries are returned without a
+    request, stale ones are revalidated and a 304 skips download and parsing.
+    """
+    fetcher = fetcher or get_fetcher()
+    cache = cache if cache is not None else page_cache
+    max_tokens = settings.SCRAPER_MAX_TOKENS if max_tokens is None else max_tokens
+    start = time.perf_counter()
+    outcome = "error"
+    with span("scrape", "scrape", url=url) as trace_span:
+        try:
+            entry = await asyncio.to_thread(cache.lookup, url, max_chars) if cache else None
+            if entry and entry["fresh"]:
+                outcome = "cached"
+                return _within_tokens(entry["extraction"], max_tokens)
+
+            with span("fetch", "fetch", url=url) as fetch_span:
+                page = await fetcher.fetch_page(url, headers=PageCache.conditional_headers(entry))
+                fetch_span.set(status=page.status, bytes=len(page.body))
+            if page.status == 304 and entry:
+                await asyncio.to_thread(cache.mark_revalidated, url, max_chars, entry, page.headers)
+                outcome = "revalidated"
+                return _within_tokens(entry["extraction"], max_tokens)
+
+            with span("parse", "parse", bytes=len(page.body)):
+                extraction = await parse_page(page.body, url, max_chars)
+            if cache:
+                # Cached before the token cut so entries survive budget changes
+                await asyncio.to_thread(cache.store, url, max_chars, extraction, page.headers)
+            outcome = "fetched"
+            result = _within_tokens(extraction, max_tokens)
+            trace_span.set(chars=len(result["content"]))
+            return result
+        except NonHTMLContentError as e:
+            logger.info(f"Skipped {url}: {e}")
+            outcome = "skipped"
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to scrape {url}: {e}")
+            return None
+        finally:
+            SCRAPE_LATENCY.labels(outcome).observe(time.perf_counter() - start)
+            trace_span.set(outcome=outcome)
+
+
+async def scrape_urls(
+    urls: Iterable[str],
+    max_chars: int = 5000,
+    fetcher: Optional[PageFetcher] = None,
+    max_tokens: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Optional[Dict[str, str]]]]:
+    """
+    Scrapes many URLs concurrently and yields `(url, result)` in completion order,
+    so callers can start using fast pages while slow ones are still loading.
+    """
+    fetcher = fetcher or get_fetcher()
+
+    async def scrape_one(url: str):
+        return url, await scrape_url(url, max_chars, fetcher, max_tokens=max_tokens)
+
+    for next_done in asyncio.as_completed([scrape_one(url) for url in urls]):
+        yield await next_done
+
+
+def scrape_text_from_url(url: str, max_chars: int = 5000, max_tokens: Optional[int] = None) -> Optional[Dict[str, str]]:
+    """
+    Fetches the content of a URL and extracts the main text.
+    Returns a dict with 'title', 'source', 'content' or None on failure.
+
+    Synchronous compatibility wrapper around `scrape_url`; must not be called
+    from a running event loop (await `scrape_url` there instead).
+    """
+    async def run():
+        fetcher = PageFetcher()
+        try:
+            return await scrape_url(url, max_chars, fetcher, max_tokens=max_tokens)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
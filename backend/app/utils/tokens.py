@@ -0,0 +1,186 @@
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from app.core.config import settings, logger
+
+# Rough average for English text with OpenAI tokenizers; used when tiktoken
+# or its encoding files are unavailable (e.g. offline containers)
+CHARS_PER_TOKEN = 4
+
+# Input + output context window per model family. Looked up by exact name,
+# then by longest matching prefix, so dated snapshots resolve to their family.
+MODEL_CONTEXT_LIMITS = {
+    "gpt-4.1": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-0125-preview": 128000,
+    "gpt-4-1106-preview": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+
+# Don't keep slivers of a trimmed item that are too short to be useful
+MIN_FRAGMENT_TOKENS = 50
+
+TRUNCATION_MARKER = "\n...(truncated)..."
+
+
+def parse_token_map(value: str) -> Dict[str, int]:
+    """
+    Parses "name=tokens,name=tokens" settings; malformed entries are ignored.
+    """
+    limits = {}
+    for part in (value or "").split(","):
+        name, _, tokens = part.partition("=")
+        try:
+            limits[name.strip()] = int(tokens)
+        except ValueError:
+            continue
+    return limits
+
+
+def context_limit(model: Optional[str]) -> int:
+    model = (model or "").lower()
+    limits = {**MODEL_CONTEXT_LIMITS, **parse_token_map(settings.MODEL_CONTEXT_LIMITS)}
+    if model in limits:
+        return limits[model]
+    prefixes = [name for name in limits if model.startswith(name)]
+    return limits[max(prefixes, key=len)] if prefixes else DEFAULT_CONTEXT_LIMIT
+
+
+def agent_token_cap(agent_name: str) -> Optional[int]:
+    """Per-agent prompt cap from AGENT_TOKEN_BUDGETS, or None for the model's full window."""
+    return parse_token_map(settings.AGENT_TOKEN_BUDGETS).get(agent_name) or None
+
+
+@lru_cache(maxsize=32)
+def _encoding(model: str) -> Any:
+    if settings.TOKEN_COUNTER.lower() != "tiktoken":
+        return None
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; fall back when that fails
+        logger.warning(f"tiktoken unavailable for {model}, approximating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model or settings.OPENAI_MODEL_NAME)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None, marker: str = TRUNCATION_MARKER) -> str:
+    """
+    Cuts text to at most max_tokens, marker included. Text that already fits
+    is returned unchanged.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    keep = max_tokens - count_tokens(marker, model)
+    if keep <= 0:
+        return ""
+    encoding = _encoding(model or settings.OPENAI_MODEL_NAME)
+    if encoding is None:
+        return text[:keep * CHARS_PER_TOKEN] + marker
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:keep]) + marker
+
+
+def priority_weight(priority: Any) -> float:
+    """
+    Share of an agent's budget given to one question. Planner priorities are
+    1-5 (5 highest); unscored questions count as 3. Priority 1 still gets 40%.
+    """
+    try:
+        p = min(5, max(1, int(priority)))
+    except (TypeError, ValueError):
+        p = 3
+    return 0.4 + 0.15 * (p - 1)
+
+
+class BudgetItem(NamedTuple):
+    text: str
+    priority: float = 0
+
+
+class TokenBudget:
+    """
+    Prompt token budget for one LLM call.
+
+    The budget is the model's context window less the output reserve, capped by
+    `max_tokens` and scaled by `weight`. Fixed prompt parts are charged first;
+    material is then added with `take` (cut to what is left) or `fill` (highest
+    priority first, so the lowest-value material is trimmed or dropped).
+    """
+
+    def __init__(self, model: Optional[str] = None, max_tokens: Optional[int] = None, weight: float = 1.0):
+        self.model = model or settings.OPENAI_MODEL_NAME
+        total = context_limit(self.model) - settings.LLM_OUTPUT_TOKEN_RESERVE
+        if max_tokens:
+            total = min(total, max_tokens)
+        self.total = max(0, int(total * weight))
+        self.used = 0
+        # Tokens of material left out of the prompt
+        self.trimmed = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.used)
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def charge(self, *texts: str) -> int:
+        """Accounts for prompt parts that are always sent (instructions, templates)."""
+        tokens = sum(self.count(t) for t in texts)
+        self.used += tokens
+        return tokens
+
+    def take(self, text: str, marker: str = TRUNCATION_MARKER) -> str:
+        """Returns text cut to the remaining budget and charges for it."""
+        tokens = self.count(text)
+        if tokens > self.remaining:
+            text = truncate_tokens(text, self.remaining, self.model, marker)
+            kept = self.count(text)
+            self.trimmed += tokens - kept
+            tokens = kept
+        self.used += tokens
+        return text
+
+    def fill(self, items: Sequence[BudgetItem]) -> List[str]:
+        """
+        Adds items highest priority first (earlier items first on ties) and
+        returns the kept texts in their original order. The item that crosses
+        the limit is cut; anything after it is dropped.
+        """
+        kept: Dict[int, str] = {}
+        for i in sorted(range(len(items)), key=lambda i: -items[i].priority):
+            text = items[i].text
+            if self.count(text) > self.remaining and self.remaining < MIN_FRAGMENT_TOKENS:
+                self.trimmed += self.count(text)
+                continue
+            text = self.take(text)
+            if text:
+                kept[i] = text
+        return [kept[i] for i in sorted(kept)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {"model": self.model, "budget": self.total, "used": self.used, "trimmed": self.trimmed}
@@ -0,0 +1,154 @@
+"""
+Out-of-process graph workers for EXECUTION_MODE=worker.
+
+    python -m app.worker --workers 4
+
+Each worker process claims jobs from the SQLite job queue, runs the research
+graph and writes results to the shared research store. Scale run throughput
+by adding worker processes (or hosts sharing the data volume) independently
+of the API replicas.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+from typing import Optional, Set
+
+from app.core.config import settings, logger
+from app.core.jobs import Job, SQLiteJobQueue, get_job_queue
+from app.core.checkpoints import close_checkpointer
+from app.core.llm_clients import close_llm_clients
+from app.core.store import research_store
+from app.utils.scraper import close_fetcher, shutdown_parse_pool
+
+
+async def _heartbeat(queue: SQLiteJobQueue, job: Job, worker_id: str, run: asyncio.Task, lost: asyncio.Event):
+    while True:
+        await asyncio.sleep(settings.WORKER_HEARTBEAT_SECONDS)
+        if not await asyncio.to_thread(queue.heartbeat, job.id, worker_id):
+            # Another worker now owns the run (e.g. it was requeued as stale); stop
+            # executing it here so the two do not both run and save it
+            logger.warning(f"Job {job.id} was reassigned away from {worker_id}; cancelling it here")
+            lost.set()
+            run.cancel()
+            return
+
+
+async def run_job(queue: SQLiteJobQueue, job: Job, worker_id: str):
+    # Imported here so the API process never builds a graph just for importing this module
+    from app.api.routes.research import run_graph
+
+    lost = asyncio.Event()
+    heartbeat: Optional[asyncio.Task] = None
+    try:
+        state = await asyncio.to_thread(research_store.get, job.research_id)
+        if state is None:
+            logger.error(f"Job {job.id}: research {job.research_id} not found")
+            await asyncio.to_thread(queue.complete, job.id, "failed", worker_id)
+            return
+        logger.info(f"{worker_id} running {job.research_id} (attempt {job.attempts}, resume={job.resume})")
+        run = asyncio.create_task(run_graph(state, job.research_id, resume=job.resume))
+        heartbeat = asyncio.create_task(_heartbeat(queue, job, worker_id, run, lost))
+        await run
+        if not await asyncio.to_thread(queue.complete, job.id, "done", worker_id):
+            logger.warning(f"Job {job.id} finished on {worker_id} after it was reassigned; not marking it done")
+    except asyncio.CancelledError:
+        if not lost.is_set():
+            # Shutting down: hand the run to another worker, which resumes it from its checkpoint
+            await asyncio.to_thread(queue.release, job.id, worker_id)
+            raise
+        if asyncio.current_task().cancelling():
+            raise
+        # Cancelled by the heartbeat: the job belongs to another worker now
+    finally:
+        if heartbeat is not None:
+            heartbeat.cancel()
+
+
+async def worker_loop(
+    worker_id: str,
+    concurrency: int = None,
+    queue: SQLiteJobQueue = None,
+    stop: Optional[asyncio.Event] = None,
+):
+    """
+    Claims and runs up to `concurrency` jobs at a time until `stop` is set.
+    Runs still executing at shutdown are released back to the queue.
+    """
+    concurrency = concurrency or settings.WORKER_CONCURRENCY
+    queue = queue or get_job_queue()
+    stop = stop or asyncio.Event()
+    running: Set[asyncio.Task] = set()
+    logger.info(f"Worker {worker_id} started (concurrency={concurrency})")
+    try:
+        while not stop.is_set():
+            requeued = await asyncio.to_thread(queue.requeue_stale, settings.WORKER_STALE_SECONDS)
+            if requeued:
+                logger.warning(f"Requeued {requeued} jobs from unresponsive workers")
+            while len(running) < concurrency:
+                job = await asyncio.to_thread(queue.claim, worker_id)
+                if job is None:
+                    break
+                task = asyncio.create_task(run_job(queue, job, worker_id))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.WORKER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for task in list(running):
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        await close_fetcher()
+        await close_llm_clients()
+        await close_checkpointer()
+        logger.info(f"Worker {worker_id} stopped")
+
+
+def _worker_main(index: int, concurrency: int):
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await worker_loop(worker_id, concurrency, stop=stop)
+
+    asyncio.run(main())
+    shutdown_parse_pool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run research graph workers (EXECUTION_MODE=worker).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY, help="Runs per worker process")
+    args = parser.parse_args(argv)
+
+    # Fail fast on a misconfigured store before forking
+    get_job_queue()
+    if args.workers == 1:
+        _worker_main(0, args.concurrency)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=_worker_main, args=(i, args.concurrency), name=f"worker-{i}") for i in range(args.workers)]
+    for p in processes:
+        p.start()
+
+    def forward(signum, frame):
+        for p in processes:
+            if p.is_alive():
+                os.kill(p.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for p in processes:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import asyncio
+import random
+import threading
+import time
+import zlib
+from typing import Any, Iterator, List, Optional, Type
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+from app.core.tracing import start_span
+
+# Question handlers the fake planner assigns questions to, in turn
+HANDLERS = (
+    ("web_researcher", "news"),
+    ("technical_analyst", "technical"),
+    ("business_analyst", "business"),
+)
+
+# Modules that construct their own DuckDuckGoSearchRun
+SEARCH_TOOL_MODULES = (
+    "app.agents.web_researcher",
+    "app.agents.technical_analyst",
+    "app.agents.business_analyst",
+)
+
+_VOCABULARY = (
+    "market adoption latency throughput model training inference vendor pricing "
+    "regulation battery supply chain revenue growth margin platform developer api "
+    "benchmark accuracy dataset hardware cloud edge deployment security privacy "
+    "startup funding partnership roadmap standard protocol architecture cost scale"
+).split()
+
+
+class Latency:
+    """
+    Seconds drawn from a distribution spec:
+    "0.5" / "fixed:0.5", "uniform:0.2:1.5", "normal:1.0:0.3" (clamped at 0),
+    "lognormal:1.0:0.5" (median, sigma) or "exp:0.8" (mean).
+    """
+
+    def __init__(self, spec: str, seed: int = 0):
+        self.spec = str(spec)
+        kind, _, params = self.spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        self.kind = kind.lower()
+        self.params = [float(p) for p in params.split(":") if p]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Bad latency spec: {spec!r}")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        p = self.params
+        with self._lock:
+            if self.kind == "fixed":
+                value = p[0]
+            elif self.kind == "uniform":
+                value = self._rng.uniform(p[0], p[1])
+            elif self.kind == "normal":
+                value = self._rng.gauss(p[0], p[1])
+            elif self.kind == "lognormal":
+                value = p[0] * self._rng.lognormvariate(0, p[1])
+            else:
+                value = self._rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+def filler_text(seed_text: str, words: int) -> str:
+    """Deterministic prose for a prompt or query, so similar inputs don't dedup away."""
+    rng = random.Random(zlib.crc32(seed_text.encode()))
+    sentences, sentence = [], []
+    for _ in range(words):
+        sentence.append(rng.choice(_VOCABULARY))
+        if len(sentence) >= rng.randint(8, 16):
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            sentence = []
+    if sentence:
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    # Paragraphs of about five sentences, like real model output
+    return "\n\n".join(" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+
+
+def fake_plan(schema: Type[BaseModel], topic: str, questions: int) -> BaseModel:
+    items = []
+    for i in range(questions):
+        handler, category = HANDLERS[i % len(HANDLERS)]
+        items.append({
+            "id": f"q{i + 1}",
+            "question": f"{topic}: {category} question {i + 1} ({filler_text(f'{topic}{i}', 6).rstrip('.')})",
+            "category": category,
+            "priority": 5 - i % 5,
+            "depth": "deep-dive" if i % 2 else "overview",
+            "assigned_agent": handler,
+        })
+    return schema.model_validate({"questions": items, "estimated_time": "10 minutes"})
+
+
+def _last_text(messages: List[BaseMessage]) -> str:
+    return str(messages[-1].content) if messages else ""
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for ChatOpenAI: waits a sampled latency, then answers with
+    about `output_tokens` tokens of filler (streamed in `chunk_tokens` pieces).
+    with_structured_output returns a plan of `questions` questions. Calls are
+    recorded as "llm" spans, so run traces look like real ones.
+    """
+
+    model_name: str = "fake"
+    latency: Any = None
+    output_tokens: int = 300
+    chunk_tokens: int = 16
+    questions: int = 6
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def _text(self, messages: List[BaseMessage]) -> str:
+        # Filler words average a bit over one token each
+        return filler_text(_last_text(messages), max(1, self.output_tokens * 3 // 4))
+
+    def _delay(self) -> float:
+        return self.latency.sample() if self.latency is not None else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._text(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        trace_span = start_span("llm", "llm", model=self.model_name, fake=True)
+        await asyncio.sleep(self._delay())
+        text = self._text(messages)
+        trace_span.finish(response_bytes=len(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs):
+        trace_span = start_span("llm", "llm", model=self.model_name, fake=True, streamed=True)
+        try:
+            # The sampled latency is the time to the first token
+            await asyncio.sleep(self._delay())
+            text = self._text(messages)
+            for piece in self._pieces(text):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+                await asyncio.sleep(0)
+        finally:
+            trace_span.finish()
+
+    def _pieces(self, text: str) -> Iterator[str]:
+        size = max(1, self.chunk_tokens) * 4
+        for i in range(0, len(text), size):
+            yield text[i:i + size]
+
+    def with_structured_output(self, schema: Any, **kwargs) -> Any:
+        async def structured(messages: List[BaseMessage]) -> BaseModel:
+            trace_span = start_span("llm", "llm", model=self.model_name, fake=True, structured=True)
+            await asyncio.sleep(self._delay())
+            trace_span.finish()
+            topic = _last_text(messages).rsplit(":", 1)[-1].strip() or "topic"
+            return fake_plan(schema, topic, self.questions)
+
+        return RunnableLambda(structured)
+
+
+class FakeSearchTool:
+    """
+    Offline stand-in for DuckDuckGoSearchRun. invoke() blocks for a sampled
+    latency (the gateway runs it in a worker thread, like the real tool) and
+    returns about `result_chars` characters of snippets for the query.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None, result_chars: int = 2000):
+        self.latency = latency
+        self.result_chars = result_chars
+        self.calls = 0
+
+    def invoke(self, query: str, **kwargs) -> str:
+        self.calls += 1
+        if self.latency is not None:
+            time.sleep(self.latency.sample())
+        text = filler_text(query, max(1, self.result_chars // 6))
+        return text[:self.result_chars]
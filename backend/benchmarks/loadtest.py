@@ -0,0 +1,356 @@
+"""
+HTTP load test of the real API.
+
+Starts the OpenAI-compatible stub (benchmarks.stub_openai) and the API with
+OPENAI_BASE_URL pointed at it and a stub search tool (benchmarks.serve_app),
+then drives a mix of concurrent clients for a fixed duration:
+
+  researcher  POST /research, poll status with fields/after until the run
+              ends, then fetch the full state
+  reader      full state and trace of finished runs (large responses)
+  monitor     /health, /scheduler/stats and /metrics
+
+Reports p50/p95/p99 latency per endpoint and end-to-end run completion times.
+
+    cd backend
+    python -m benchmarks.loadtest --mix researcher=4,reader=4,monitor=1 --duration 60 --output load.json
+    python -m benchmarks.loadtest --app-url http://127.0.0.1:8000   # an app that is already running
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.core.events import TERMINAL_STATUSES
+from benchmarks.stats import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+CLIENT_KINDS = ("researcher", "reader", "monitor")
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """"researcher=4,reader=2" -> {"researcher": 4, "reader": 2}"""
+    mix: Dict[str, int] = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        kind, _, count = part.partition("=")
+        kind = kind.strip()
+        if kind not in CLIENT_KINDS:
+            raise ValueError(f"Unknown client kind '{kind}', expected one of {', '.join(CLIENT_KINDS)}")
+        mix[kind] = int(count or 1)
+    return mix
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="researcher=4,reader=4,monitor=1", help="Concurrent clients per kind")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to start new work for")
+    parser.add_argument("--drain-timeout", type=float, default=300.0, help="Seconds to wait for started runs afterwards")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between status polls")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Seconds between reader/monitor requests")
+    parser.add_argument("--app-url", help="Load-test this running app instead of starting one (and the stub)")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="Extra settings for the started app")
+    parser.add_argument("--questions", type=int, default=6, help="Questions in each stub research plan")
+    parser.add_argument("--llm-latency", default="lognormal:1.0:0.4", help="Stub time to first token (see benchmarks.fakes.Latency)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="Stub generation speed (0: instant)")
+    parser.add_argument("--llm-output-tokens", type=int, default=400)
+    parser.add_argument("--search-latency", default="lognormal:0.8:0.5")
+    parser.add_argument("--search-result-chars", type=int, default=2000)
+    parser.add_argument("--log-dir", help="Where server logs go (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    args.mix = parse_mix(args.mix)
+    return args
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def server(name: str, args: List[str], env: Dict[str, str], log_dir: str) -> Iterator[subprocess.Popen]:
+    with open(os.path.join(log_dir, f"{name}.log"), "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", *args], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        try:
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+async def wait_ready(url: str, process: Optional[subprocess.Popen] = None, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Server for {url} exited with code {process.returncode}")
+            try:
+                if (await client.get(url, timeout=2)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def app_environment(args: argparse.Namespace, stub_url: str, cache_dir: str) -> Dict[str, str]:
+    """Environment for the started app: the caller's, with local-only defaults and the stub."""
+    env = {
+        "OPENAI_API_KEY": "sk-loadtest",
+        "CACHE_DIR": cache_dir,
+        "CHECKPOINT_ENABLED": "false",
+        "KNOWLEDGE_ENABLED": "false",
+        "LLM_CACHE_ENABLED": "false",
+        "SEARCH_CACHE_ENABLED": "false",
+        "TOKEN_COUNTER": "approx",
+        # Every simulated client connects from localhost; let X-Client-Id give each its own quota
+        "TRUSTED_CLIENT_ID_PROXIES": "127.0.0.1",
+        **os.environ,
+        "OPENAI_BASE_URL": stub_url,
+    }
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key.strip()] = value
+    return env
+
+
+class Recorder:
+    """Latency and status codes per endpoint, plus the outcome of every run."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.runs: List[Dict[str, Any]] = []
+        self.rejected = 0
+        # Runs that have ended, for readers to fetch
+        self.finished_ids: List[str] = []
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """
+        Times one request under an endpoint name (the URL template, so runs
+        aggregate). None when it failed below HTTP.
+        """
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            # Include reading the body: large states cost most in serialization
+            await response.aread()
+        except httpx.HTTPError as e:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.statuses[endpoint][type(e).__name__] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][str(response.status_code)] += 1
+        return response
+
+    def endpoint_report(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for endpoint in sorted(self.latencies):
+            ms = [v * 1000 for v in self.latencies[endpoint]]
+            statuses = self.statuses[endpoint]
+            report[endpoint] = {
+                "requests": len(ms),
+                "errors": sum(n for code, n in statuses.items() if not code.startswith("2")),
+                "statuses": dict(statuses),
+                "mean_ms": round(statistics.mean(ms), 2),
+                "p50_ms": round(percentile(ms, 0.5), 2),
+                "p95_ms": round(percentile(ms, 0.95), 2),
+                "p99_ms": round(percentile(ms, 0.99), 2),
+                "max_ms": round(max(ms), 2),
+            }
+        return report
+
+    def run_report(self, seconds: float) -> Dict[str, Any]:
+        outcomes = Counter(r["status"] for r in self.runs)
+        completed = [r["seconds"] for r in self.runs if r["status"] == "complete"]
+        report: Dict[str, Any] = {
+            "started": len(self.runs),
+            "completed": outcomes.get("complete", 0),
+            "failed": sum(n for status, n in outcomes.items() if status not in ("complete", "timeout")),
+            "timed_out": outcomes.get("timeout", 0),
+            "rejected": self.rejected,
+            "completed_per_minute": round(60 * len(completed) / seconds, 2) if seconds else 0.0,
+        }
+        if completed:
+            report["completion_seconds"] = {
+                "mean": round(statistics.mean(completed), 3),
+                "p50": round(percentile(completed, 0.5), 3),
+                "p95": round(percentile(completed, 0.95), 3),
+                "p99": round(percentile(completed, 0.99), 3),
+                "max": round(max(completed), 3),
+            }
+        return report
+
+
+async def researcher(client: httpx.AsyncClient, rec: Recorder, index: int, args: argparse.Namespace, deadline: float, drain_deadline: float):
+    n = 0
+    headers = {"X-Client-Id": f"loadtest-{index}"}
+    while time.monotonic() < deadline:
+        n += 1
+        response = await rec.request(
+            client, "POST /research", "POST", "/research",
+            json={"topic": f"Load test topic {index}-{n}", "customization": {}}, headers=headers,
+        )
+        if response is None or response.status_code >= 500:
+            await asyncio.sleep(1.0)
+            continue
+        if response.status_code == 429:
+            rec.rejected += 1
+            retry_after = float(response.headers.get("Retry-After") or 1)
+            await asyncio.sleep(min(retry_after, max(0.0, deadline - time.monotonic())))
+            continue
+        if response.status_code != 200:
+            await asyncio.sleep(1.0)
+            continue
+
+        research_id = response.json()["research_id"]
+        started = time.perf_counter()
+        after, status = 0, response.json().get("status")
+        while status not in TERMINAL_STATUSES:
+            if time.monotonic() > drain_deadline:
+                status = "timeout"
+                break
+            await asyncio.sleep(args.poll_interval)
+            response = await rec.request(
+                client, "GET /research/{id}?fields=status&after", "GET", f"/research/{research_id}",
+                params={"fields": "status", "after": after},
+            )
+            if response is not None and response.status_code == 200:
+                data = response.json()
+                after = data.get("last_seq", after)
+                status = data.get("status")
+        rec.runs.append({"research_id": research_id, "status": status, "seconds": time.perf_counter() - started})
+        if status != "timeout":
+            await rec.request(client, "GET /research/{id}", "GET", f"/research/{research_id}")
+            rec.finished_ids.append(research_id)
+
+
+async def reader(client: httpx.AsyncClient, rec: Recorder, index: int, args: argparse.Namespace, deadline: float):
+    rng = random.Random(args.seed + index)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(args.think_time)
+        if not rec.finished_ids:
+            continue
+        research_id = rng.choice(rec.finished_ids)
+        await rec.request(client, "GET /research/{id}", "GET", f"/research/{research_id}")
+        await rec.request(client, "GET /research/{id}/trace", "GET", f"/research/{research_id}/trace")
+
+
+async def monitor(client: httpx.AsyncClient, rec: Recorder, index: int, args: argparse.Namespace, deadline: float):
+    while time.monotonic() < deadline:
+        for path in ("/health", "/scheduler/stats", "/metrics"):
+            await rec.request(client, f"GET {path}", "GET", path)
+        await asyncio.sleep(args.think_time)
+
+
+async def drive(app_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    rec = Recorder()
+    total_clients = sum(args.mix.values())
+    limits = httpx.Limits(max_connections=total_clients + 4, max_keepalive_connections=total_clients + 4)
+    start = time.monotonic()
+    deadline = start + args.duration
+    drain_deadline = deadline + args.drain_timeout
+    async with httpx.AsyncClient(base_url=app_url, timeout=60.0, limits=limits) as client:
+        tasks = []
+        for i in range(args.mix.get("researcher", 0)):
+            tasks.append(researcher(client, rec, i, args, deadline, drain_deadline))
+        for i in range(args.mix.get("reader", 0)):
+            tasks.append(reader(client, rec, i, args, deadline))
+        for i in range(args.mix.get("monitor", 0)):
+            tasks.append(monitor(client, rec, i, args, deadline))
+        await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "endpoints": rec.endpoint_report(),
+        "runs": rec.run_report(elapsed),
+    }
+
+
+async def run_loadtest(args: argparse.Namespace) -> Dict[str, Any]:
+    with ExitStack() as stack:
+        app_url = args.app_url
+        stub_url = log_dir = stub_stats = None
+        if app_url is None:
+            log_dir = args.log_dir or tempfile.mkdtemp(prefix="agentic-research-load-")
+            os.makedirs(log_dir, exist_ok=True)
+            stub_port, app_port = free_port(), free_port()
+            stub_url = f"http://127.0.0.1:{stub_port}"
+            stub = stack.enter_context(server("stub_openai", [
+                "benchmarks.stub_openai", "--port", str(stub_port),
+                "--latency", args.llm_latency,
+                "--tokens-per-second", str(args.llm_tokens_per_second),
+                "--output-tokens", str(args.llm_output_tokens),
+                "--questions", str(args.questions),
+                "--seed", str(args.seed),
+            ], {"OPENAI_API_KEY": "sk-loadtest", **os.environ}, log_dir))
+            await wait_ready(f"{stub_url}/health", stub)
+            env = app_environment(args, f"{stub_url}/v1", tempfile.mkdtemp(prefix="agentic-research-load-cache-"))
+            app = stack.enter_context(server("app", [
+                "benchmarks.serve_app", "--port", str(app_port),
+                "--search-latency", args.search_latency,
+                "--search-result-chars", str(args.search_result_chars),
+                "--seed", str(args.seed + 1),
+            ], env, log_dir))
+            app_url = f"http://127.0.0.1:{app_port}"
+            await wait_ready(f"{app_url}/health", app)
+
+        results = await drive(app_url, args)
+        if stub_url is not None:
+            async with httpx.AsyncClient() as client:
+                stub_stats = (await client.get(f"{stub_url}/health")).json()
+
+    return {
+        "benchmark": "loadtest",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "logs": log_dir,
+        **results,
+        "stub": stub_stats,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    report = asyncio.run(run_loadtest(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Offline end-to-end benchmark of the research pipeline.
+
+Runs the real build_research_graph() and run_graph() (state store, events,
+tracing, search gateway, dedup, token budgets) against in-process fake chat
+models and search tools, so results are reproducible without network access.
+
+    cd backend
+    python -m benchmarks.pipeline --concurrency 1,4,16 --llm-latency lognormal:1.5:0.4 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Keep benchmark runs away from real caches, checkpoints and the knowledge base.
+# Must run before app.core.config is imported.
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="agentic-research-bench-"))
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
+os.environ.setdefault("KNOWLEDGE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("TOKEN_COUNTER", "approx")
+os.environ.setdefault("TRACE_ENABLED", "true")
+
+from unittest.mock import patch
+
+from app.api.routes import research
+from app.core import llm_clients, search
+from app.core.config import settings
+from app.core.graph import build_research_graph
+from app.core.store import research_store
+from app.core.tracing import trace_summary
+from benchmarks.fakes import SEARCH_TOOL_MODULES, FakeChatModel, FakeSearchTool, Latency
+from benchmarks.stats import RSSSampler, percentile, process_peak_rss_mb
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrent run counts, one batch each")
+    parser.add_argument("--warmup", type=int, default=1, help="Runs executed (and discarded) before measuring")
+    parser.add_argument("--questions", type=int, default=6, help="Questions in each fake research plan")
+    parser.add_argument("--llm-latency", default="lognormal:1.0:0.4", help="Latency spec per LLM call (see benchmarks.fakes.Latency)")
+    parser.add_argument("--llm-output-tokens", type=int, default=400, help="Approximate tokens per LLM answer")
+    parser.add_argument("--search-latency", default="lognormal:0.8:0.5", help="Latency spec per search call")
+    parser.add_argument("--search-result-chars", type=int, default=2000, help="Characters per search result")
+    parser.add_argument("--search-cache", action="store_true", help="Keep the shared search cache on (off by default)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+@contextmanager
+def fake_pipeline(args: argparse.Namespace) -> Iterator[Any]:
+    """The research graph, built with fake chat models and search tools, installed for run_graph."""
+    llm_latency = Latency(args.llm_latency, seed=args.seed)
+    search_latency = Latency(args.search_latency, seed=args.seed + 1)
+
+    def chat_model(model: str = "fake", **kwargs) -> FakeChatModel:
+        return FakeChatModel(
+            model_name=model,
+            latency=llm_latency,
+            output_tokens=args.llm_output_tokens,
+            questions=args.questions,
+        )
+
+    def search_tool() -> FakeSearchTool:
+        return FakeSearchTool(search_latency, args.search_result_chars)
+
+    patches = [patch("app.agents.base.ChatOpenAI", chat_model)]
+    patches += [patch(f"{module}.DuckDuckGoSearchRun", search_tool) for module in SEARCH_TOOL_MODULES]
+    # Shared chat models are cached per factory; start and finish with a clean slate
+    patches.append(patch.dict(llm_clients._models, clear=True))
+    if not args.search_cache:
+        patches.append(patch.object(search, "search_cache", None))
+    for p in patches:
+        p.start()
+    try:
+        graph = build_research_graph()
+        with patch.object(research, "research_graph", graph):
+            yield graph
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
+def node_breakdown(trace: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per graph node: executions, summed seconds and the slowest execution."""
+    nodes: Dict[str, Dict[str, float]] = {}
+    for s in (trace or {}).get("spans", []):
+        if s["cat"] != "node":
+            continue
+        seconds = s["end"] - s["start"]
+        node = nodes.setdefault(s["name"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+        node["count"] += 1
+        node["seconds"] += seconds
+        node["max_seconds"] = max(node["max_seconds"], seconds)
+    return nodes
+
+
+async def run_once(index: int) -> Dict[str, Any]:
+    r_id = f"bench-{index}-{uuid.uuid4().hex[:8]}"
+    state = research.initial_research_state(r_id, f"Benchmark topic {index}", {})
+    research_store.create(r_id, state)
+    start = time.perf_counter()
+    try:
+        await research.run_graph(state, r_id)
+        wall = time.perf_counter() - start
+        final = research_store.get(r_id) or {}
+        trace = research_store.get_trace(r_id)
+    finally:
+        research_store.delete(r_id)
+    return {
+        "wall_seconds": wall,
+        "status": final.get("status"),
+        "errors": len(final.get("errors") or []),
+        "nodes": node_breakdown(trace),
+        "trace": trace,
+    }
+
+
+def summarize_runs(runs: List[Dict[str, Any]], batch_seconds: float, peak_rss: Optional[float] = None) -> Dict[str, Any]:
+    walls = [r["wall_seconds"] for r in runs]
+    nodes: Dict[str, Dict[str, float]] = {}
+    for r in runs:
+        for name, stats in r["nodes"].items():
+            total = nodes.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            total["count"] += stats["count"]
+            total["seconds"] += stats["seconds"]
+            total["max_seconds"] = max(total["max_seconds"], stats["max_seconds"])
+    sample_trace = next((r["trace"] for r in runs if r["trace"]), None)
+    summary = None
+    if sample_trace:
+        summary = trace_summary(sample_trace)
+    return {
+        "runs": len(runs),
+        "failed_runs": sum(1 for r in runs if r["status"] != "complete"),
+        "run_errors": sum(r["errors"] for r in runs),
+        "batch_seconds": round(batch_seconds, 3),
+        "throughput_runs_per_minute": round(60 * len(runs) / batch_seconds, 2) if batch_seconds else 0.0,
+        "wall_seconds": {
+            "mean": round(statistics.mean(walls), 3),
+            "p50": round(percentile(walls, 0.5), 3),
+            "p95": round(percentile(walls, 0.95), 3),
+            "max": round(max(walls), 3),
+        },
+        # Mean seconds per run spent in each node (summed over its executions)
+        "nodes": {
+            name: {
+                "executions_per_run": round(n["count"] / len(runs), 2),
+                "seconds_per_run": round(n["seconds"] / len(runs), 3),
+                "max_seconds": round(n["max_seconds"], 3),
+            }
+            for name, n in sorted(nodes.items(), key=lambda item: -item[1]["seconds"])
+        },
+        "critical_path": [p["name"] for p in summary["critical_path"]] if summary else [],
+        "network_share": summary["network_share"] if summary else None,
+        "queue_share": summary["queue_share"] if summary else None,
+        # Sampled during this batch only; the process-wide peak includes earlier batches
+        "peak_rss_mb": peak_rss,
+        "process_peak_rss_mb": process_peak_rss_mb(),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    levels = [int(n) for n in str(args.concurrency).split(",") if n.strip()]
+    results = []
+    with fake_pipeline(args):
+        for i in range(args.warmup):
+            await run_once(-1 - i)
+        for n in levels:
+            start = time.perf_counter()
+            async with RSSSampler() as rss:
+                runs = await asyncio.gather(*(run_once(i) for i in range(n)))
+            results.append({"concurrency": n, **summarize_runs(runs, time.perf_counter() - start, rss.peak_mb)})
+    return {
+        "benchmark": "pipeline",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            **{k: v for k, v in vars(args).items() if k != "output"},
+            "synthesis_mode": settings.SYNTHESIS_MODE,
+            "max_concurrent_questions": settings.MAX_CONCURRENT_QUESTIONS,
+            "search_max_concurrency": settings.SEARCH_MAX_CONCURRENCY,
+            "dedup_enabled": settings.DEDUP_ENABLED,
+        },
+        "levels": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
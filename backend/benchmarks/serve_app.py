@@ -0,0 +1,40 @@
+"""
+Runs the API with the offline stub search tool in place of DuckDuckGo, for
+load tests. Everything else is the real app; point OPENAI_BASE_URL at
+benchmarks.stub_openai to keep LLM calls local too.
+
+    cd backend
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 python -m benchmarks.serve_app --port 8100
+"""
+import argparse
+import importlib
+from typing import List, Optional
+
+import uvicorn
+
+from benchmarks.fakes import SEARCH_TOOL_MODULES, FakeSearchTool, Latency
+
+
+def install_stub_search(latency: Latency, result_chars: int):
+    """Must run before app.main is imported: the research graph is built at import."""
+    for name in SEARCH_TOOL_MODULES:
+        module = importlib.import_module(name)
+        module.DuckDuckGoSearchRun = lambda: FakeSearchTool(latency, result_chars)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--search-latency", default="lognormal:0.8:0.5", help="Latency spec per search call")
+    parser.add_argument("--search-result-chars", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    install_stub_search(Latency(args.search_latency, seed=args.seed), args.search_result_chars)
+    from app.main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Helpers shared by the benchmarks. Kept free of app imports so that the load
+test can use them without building the graph in its own process.
+"""
+import asyncio
+import sys
+from typing import List, Optional
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process right now (Linux only), else None."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def process_peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process since it started, or None where
+    unsupported. Never goes down, so it says nothing about a later batch alone.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class RSSSampler:
+    """
+    Polls current_rss_mb() from a background task while the block runs:
+
+        async with RSSSampler() as rss:
+            ...
+        rss.peak_mb  # highest sample, None where RSS can't be read
+
+    Allocations that come and go between two polls are missed.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+
+    async def __aenter__(self) -> "RSSSampler":
+        self.sample()
+        self._task = asyncio.create_task(self._poll())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.sample()
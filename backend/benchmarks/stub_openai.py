@@ -0,0 +1,199 @@
+"""
+OpenAI-compatible stub server for load tests.
+
+Serves POST /v1/chat/completions with filler text after a sampled latency,
+streamed (server-sent events, with a usage chunk when asked) or not, and
+answers structured-output requests (json_schema response formats and forced
+tool calls) with a schema-shaped object; research plans get real questions.
+
+    cd backend
+    python -m benchmarks.stub_openai --port 9100 --latency lognormal:1.0:0.4 --tokens-per-second 80
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 ...
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.models.research import ResearchPlan
+from app.utils.tokens import CHARS_PER_TOKEN
+from benchmarks.fakes import Latency, fake_plan, filler_text
+
+
+def example_instance(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Smallest value that satisfies a (pydantic-generated) JSON schema."""
+    defs = schema.get("$defs", {}) if defs is None else defs
+    if "$ref" in schema:
+        return example_instance(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return example_instance(options[0], defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: example_instance(s, defs) for name, s in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [example_instance(schema.get("items", {}), defs)]
+    return {"string": "stub", "integer": 1, "number": 1.0, "boolean": True, "null": None}.get(kind, "stub")
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def structured_request(body: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """(name, JSON schema, tool name or None) when the request asks for structured output."""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        spec = response_format.get("json_schema") or {}
+        return spec.get("name", ""), spec.get("schema") or {}, None
+    tools = body.get("tools") or []
+    choice = body.get("tool_choice")
+    if tools and choice not in (None, "none", "auto"):
+        function = tools[0].get("function") or {}
+        if isinstance(choice, dict):
+            wanted = (choice.get("function") or {}).get("name")
+            function = next((t["function"] for t in tools if t.get("function", {}).get("name") == wanted), function)
+        return function.get("name", ""), function.get("parameters") or {}, function.get("name")
+    return None
+
+
+class StubCompletions:
+    def __init__(self, latency: Latency, output_tokens: int, tokens_per_second: float, questions: int):
+        self.latency = latency
+        self.output_tokens = output_tokens
+        self.tokens_per_second = tokens_per_second
+        self.questions = questions
+        self.stats = {"requests": 0, "streamed": 0, "structured": 0, "completion_tokens": 0}
+
+    def answer(self, body: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """(content, tool call) for a request."""
+        messages = body.get("messages") or []
+        last = _message_text(messages[-1]) if messages else ""
+        structured = structured_request(body)
+        if structured is None:
+            return filler_text(last, max(1, self.output_tokens * 3 // 4)), None
+        self.stats["structured"] += 1
+        name, schema, tool = structured
+        if name == ResearchPlan.__name__:
+            topic = last.rsplit(":", 1)[-1].strip() or "topic"
+            arguments = fake_plan(ResearchPlan, topic, self.questions).model_dump_json()
+        else:
+            arguments = json.dumps(example_instance(schema))
+        if tool is None:
+            return arguments, None
+        return "", {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {"name": tool, "arguments": arguments}}
+
+    def usage(self, body: Dict[str, Any], content: str, tool_call: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        prompt = "".join(_message_text(m) for m in body.get("messages") or [])
+        completion = content + (tool_call["function"]["arguments"] if tool_call else "")
+        prompt_tokens = math.ceil(len(prompt) / CHARS_PER_TOKEN)
+        completion_tokens = math.ceil(len(completion) / CHARS_PER_TOKEN)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def generation_seconds(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+
+def build_app(
+    latency: Latency,
+    output_tokens: int = 400,
+    tokens_per_second: float = 0.0,
+    questions: int = 6,
+    chunk_tokens: int = 8,
+) -> FastAPI:
+    stub = StubCompletions(latency, output_tokens, tokens_per_second, questions)
+    app = FastAPI(title="OpenAI-compatible stub")
+    app.state.stub = stub
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", **stub.stats}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stub.stats["requests"] += 1
+        model = body.get("model") or "stub"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        content, tool_call = stub.answer(body)
+        usage = stub.usage(body, content, tool_call)
+        stub.stats["completion_tokens"] += usage["completion_tokens"]
+        finish_reason = "tool_calls" if tool_call else "stop"
+        # Time to the first token
+        await asyncio.sleep(latency.sample())
+
+        if not body.get("stream"):
+            await asyncio.sleep(stub.generation_seconds(usage["completion_tokens"]))
+            message: Dict[str, Any] = {"role": "assistant", "content": content or None}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": message, "logprobs": None, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+
+        stub.stats["streamed"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            size = max(1, chunk_tokens) * CHARS_PER_TOKEN
+            pieces: List[str] = [content[i:i + size] for i in range(0, len(content), size)]
+            for piece in pieces:
+                await asyncio.sleep(stub.generation_seconds(chunk_tokens))
+                yield chunk({"content": piece})
+            if tool_call:
+                yield chunk({"tool_calls": [{"index": 0, **tool_call}]})
+            yield chunk({}, finish_reason)
+            if include_usage:
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:1.0:0.4", help="Time to first token (see benchmarks.fakes.Latency)")
+    parser.add_argument("--output-tokens", type=int, default=400, help="Approximate tokens per text answer")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed after the first token (0: instant)")
+    parser.add_argument("--questions", type=int, default=6, help="Questions in research plans")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    app = build_app(Latency(args.latency, seed=args.seed), args.output_tokens, args.tokens_per_second, args.questions)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
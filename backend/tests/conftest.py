@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+# Keep on-disk caches out of the working tree and isolated per test session.
+# Must run before app.core.config is imported.
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="agentic-research-tests-"))
+os.environ.setdefault("CHECKPOINT_PATH", os.path.join(os.environ["CACHE_DIR"], "checkpoints.sqlite"))
+# The checkpointer's aiosqlite thread must be closed before the loop ends;
+# tests that need it enable it and close it themselves (see test_checkpoints.py)
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
+# tiktoken downloads its encodings on first use; count offline and deterministically
+os.environ.setdefault("TOKEN_COUNTER", "approx")
+# Completed runs would otherwise feed findings into later tests' runs;
+# test_knowledge.py enables it against its own index
+os.environ.setdefault("KNOWLEDGE_ENABLED", "false")
@@ -0,0 +1,123 @@
+import asyncio
+from typing import List, Optional
+from unittest.mock import patch
+
+import pytest
+from pydantic import BaseModel
+
+from benchmarks.fakes import FakeSearchTool, Latency
+from benchmarks.pipeline import parse_args, run_benchmark
+from benchmarks.stats import RSSSampler, percentile
+
+
+def test_latency_specs():
+    assert Latency("0.25").sample() == 0.25
+    assert Latency("fixed:0").sample() == 0
+    assert all(0.1 <= Latency("uniform:0.1:0.2", seed=3).sample() <= 0.2 for _ in range(20))
+    assert Latency("normal:0:1").sample() >= 0
+    with pytest.raises(ValueError):
+        Latency("poisson:1")
+
+
+def test_fake_search_results_differ_per_query():
+    tool = FakeSearchTool(result_chars=300)
+    first, second = tool.invoke("solid state batteries"), tool.invoke("grid storage")
+    assert len(first) <= 300 and first != second
+    assert tool.invoke("solid state batteries") == first
+
+
+def test_pipeline_benchmark_runs_offline():
+    args = parse_args([
+        "--concurrency", "1,2", "--warmup", "0", "--questions", "3",
+        "--llm-latency", "0", "--search-latency", "0", "--llm-output-tokens", "50",
+    ])
+    report = asyncio.run(run_benchmark(args))
+
+    assert [level["concurrency"] for level in report["levels"]] == [1, 2]
+    level = report["levels"][1]
+    assert level["runs"] == 2 and level["failed_runs"] == 0
+    assert level["nodes"]["research_planner"]["executions_per_run"] == 1
+    assert sum(level["nodes"][h]["executions_per_run"] for h in ("web_researcher", "technical_analyst", "business_analyst")) == 3
+    assert level["critical_path"][0] == "run"
+    assert level["throughput_runs_per_minute"] > 0
+    if level["peak_rss_mb"] is not None:
+        assert level["peak_rss_mb"] > 0
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(101)), 0.95) == 95
+
+
+@pytest.mark.asyncio
+async def test_rss_sampler_keeps_the_peak_of_the_block():
+    from benchmarks import stats
+
+    readings = iter([100.0, 180.0, 120.0])
+    with patch.object(stats, "current_rss_mb", lambda: next(readings, 110.0)):
+        async with RSSSampler(interval=0.001) as rss:
+            await asyncio.sleep(0.02)
+    assert rss.peak_mb == 180.0
+
+
+def _stub_chat_model(**kwargs):
+    import httpx
+    from langchain_openai import ChatOpenAI
+    from benchmarks.stub_openai import build_app
+
+    transport = httpx.ASGITransport(app=build_app(Latency("0"), output_tokens=40, questions=3))
+    return ChatOpenAI(
+        model="gpt-4o", api_key="sk-test", base_url="http://stub/v1",
+        http_async_client=httpx.AsyncClient(transport=transport), **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_stub_openai_serves_the_real_client():
+    from app.models.research import ResearchPlan
+
+    plan = await _stub_chat_model().with_structured_output(ResearchPlan).ainvoke("Create a research plan for: grid storage")
+    assert isinstance(plan, ResearchPlan) and len(plan.questions) == 3
+
+    chunks = [c async for c in _stub_chat_model(stream_usage=True).astream("Summarize grid storage")]
+    text = "".join(c.content for c in chunks)
+    usage = next(c.usage_metadata for c in chunks if c.usage_metadata)
+    assert len(text.split()) == 30
+    assert usage["output_tokens"] > 0 and usage["input_tokens"] > 0
+
+
+def test_stub_openai_example_instance_follows_schema():
+    from benchmarks.stub_openai import example_instance
+
+    class Item(BaseModel):
+        name: str
+        score: float
+
+    class Answer(BaseModel):
+        items: List[Item]
+        note: Optional[str] = None
+        count: int
+
+    Answer.model_validate(example_instance(Answer.model_json_schema()))
+
+
+def test_loadtest_mix_and_report():
+    from benchmarks.loadtest import Recorder, parse_mix
+
+    assert parse_mix("researcher=4,reader=2, monitor") == {"researcher": 4, "reader": 2, "monitor": 1}
+    with pytest.raises(ValueError):
+        parse_mix("spammer=3")
+
+    rec = Recorder()
+    rec.latencies["GET /health"] = [0.001 * i for i in range(1, 101)]
+    rec.statuses["GET /health"].update({"200": 99, "503": 1})
+    rec.runs = [{"status": "complete", "seconds": 2.0}, {"status": "error", "seconds": 1.0}, {"status": "timeout", "seconds": 9.0}]
+    rec.rejected = 3
+
+    endpoint = rec.endpoint_report()["GET /health"]
+    assert endpoint["requests"] == 100 and endpoint["errors"] == 1
+    assert endpoint["p50_ms"] == 51.0 and endpoint["p99_ms"] == 99.0 and endpoint["max_ms"] == 100.0
+    runs = rec.run_report(60.0)
+    assert (runs["started"], runs["completed"], runs["failed"], runs["timed_out"], runs["rejected"]) == (3, 1, 1, 1, 3)
+    assert runs["completion_seconds"]["p95"] == 2.0
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from app.utils.cache import TieredCache
+from app.core import search
+
+
+def test_tiered_cache_memory_and_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = TieredCache("test", path=path, ttl=60)
+
+    assert cache.get("k") is None
+    cache.set("k", {"answer": 42})
+    assert cache.get("k") == {"answer": 42}
+
+    # A new instance (e.g. after a restart) is served from the disk tier
+    reopened = TieredCache("test", path=path, ttl=60)
+    assert reopened.get("k") == {"answer": 42}
+    assert reopened.get("k") == {"answer": 42}
+
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_tiered_cache_ttl(tmp_path):
+    cache = TieredCache("test", path=str(tmp_path / "cache.sqlite"), ttl=60)
+    with patch("app.utils.cache.time.time", return_value=1000.0):
+        cache.set("k", "v")
+    with patch("app.utils.cache.time.time", return_value=1100.0):
+        assert cache.get("k") is None
+        # Stale entries are still reachable with an explicit max_age
+        assert cache.get("k", max_age=3600) == "v"
+
+
+def test_tiered_cache_evicts_least_recently_used(tmp_path):
+    cache = TieredCache("test", path=str(tmp_path / "cache.sqlite"), ttl=float("inf"), max_entries=2, memory_entries=1)
+    with patch("app.utils.cache.time.time", side_effect=[1.0, 2.0, 3.0, 4.0, 5.0]):
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")  # memory miss, disk hit refreshes a
+        cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_tiered_cache_max_bytes(tmp_path):
+    cache = TieredCache("test", path=str(tmp_path / "cache.sqlite"), max_bytes=30, memory_entries=1)
+    cache.set("a", "x" * 20)
+    cache.set("b", "y" * 20)
+    cache.set("huge", "z" * 100)
+
+    rows = cache._conn.execute("SELECT key FROM cache").fetchall()
+    assert rows == [("b",)]
+
+
+@pytest.mark.asyncio
+async def test_run_search_reuses_normalized_queries(tmp_path):
+    cache = TieredCache("search", path=str(tmp_path / "search.sqlite"))
+    tool = MagicMock()
+    tool.invoke.return_value = "results"
+
+    with patch.object(search, "search_cache", cache):
+        assert await search.run_search(tool, "Quantum  Computing") == "results"
+        assert await search.run_search(tool, "quantum computing ") == "results"
+
+    tool.invoke.assert_called_once_with("Quantum  Computing")
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,143 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.agents.base import BaseAgent
+from app.api.routes import research
+from app.core.graph import build_research_graph
+from app.core.checkpoints import get_checkpointer, close_checkpointer, thread_config
+from app.core.config import settings
+from app.core.store import research_store
+from app.core.scheduler import run_scheduler
+
+client = TestClient(app)
+
+
+@pytest_asyncio.fixture
+async def checkpointing():
+    with patch.object(settings, "CHECKPOINT_ENABLED", True):
+        yield
+        await close_checkpointer()
+
+
+class OutageSynthesizerAgent(BaseAgent):
+    """A real agent (so failures go through BaseAgent.run_agent) that fails while the outage lasts."""
+
+    def __init__(self, outage):
+        super().__init__()
+        self.outage = outage
+
+    async def invoke(self, state):
+        if self.outage:
+            raise RuntimeError("LLM outage")
+        state["synthesized_content"] = "Report"
+        return state
+
+
+def mocked_graph(calls, fail_synth, synthesizer=None):
+    """
+    Research graph whose agents record calls; the synthesizer raises while
+    fail_synth is set, unless a real synthesizer agent is given.
+    """
+    plan = {"questions": [{"id": "q1", "question": "Stack", "category": "technical"}]}
+
+    def record(name, update):
+        async def run(state: dict):
+            calls.append(name)
+            return update
+        return run
+
+    async def synth_run(state: dict):
+        calls.append("content_synthesizer")
+        if fail_synth:
+            raise RuntimeError("LLM outage")
+        return {"synthesized_content": "Report"}
+
+    with patch("app.core.graph.ResearchPlannerAgent") as MockPlanner, \
+         patch("app.core.graph.WebResearcherAgent") as MockWeb, \
+         patch("app.core.graph.TechnicalAnalystAgent") as MockTech, \
+         patch("app.core.graph.BusinessAnalystAgent") as MockBiz, \
+         patch("app.core.graph.ContentSynthesizerAgent") as MockSynth, \
+         patch("app.core.graph.QualityReviewerAgent") as MockReview, \
+         patch("app.core.graph.HTMLDesignerAgent") as MockHTML:
+        MockPlanner.return_value.run_agent = record("research_planner", {"research_plan": plan})
+        MockWeb.return_value.run_agent = record("web_researcher", {})
+        MockTech.return_value.run_agent = record("technical_analyst", {"technical_findings": [{"question": "Stack"}]})
+        MockBiz.return_value.run_agent = record("business_analyst", {})
+        MockSynth.return_value.run_agent = synthesizer.run_agent if synthesizer else synth_run
+        MockReview.return_value.run_agent = record("quality_reviewer", {})
+        MockHTML.return_value.run_agent = record("html_designer", {"html_output": "<html></html>"})
+        return build_research_graph()
+
+
+@pytest.mark.asyncio
+async def test_resume_continues_from_last_completed_step(checkpointing):
+    calls, fail_synth = [], [True]
+    state = research.initial_research_state("cp-run", "Checkpoints", {})
+    research_store.create("cp-run", state)
+
+    with patch.object(research, "research_graph", mocked_graph(calls, fail_synth)):
+        await research.run_graph(state, "cp-run")
+        assert research_store.get("cp-run")["status"] == "error"
+        assert calls == ["research_planner", "technical_analyst", "content_synthesizer"]
+
+        fail_synth.clear()
+        await research.run_graph(research_store.get("cp-run"), "cp-run", resume=True)
+
+    result = research_store.get("cp-run")
+    assert result["status"] == "complete"
+    assert result["html_output"] == "<html></html>"
+    assert result["technical_findings"] == [{"question": "Stack"}]
+    # Only the failed step and the ones after it ran again
+    assert calls[3:] == ["content_synthesizer", "quality_reviewer", "html_designer"]
+    # Checkpoints are dropped once the run completes
+    saver = await get_checkpointer()
+    assert await saver.aget_tuple(thread_config("cp-run")) is None
+
+
+@pytest.mark.asyncio
+async def test_failing_agent_stops_the_run_and_keeps_its_checkpoint(checkpointing):
+    calls, outage = [], [True]
+    state = research.initial_research_state("agent-fail-run", "Checkpoints", {})
+    research_store.create("agent-fail-run", state)
+    saver = await get_checkpointer()
+
+    with patch.object(research, "research_graph", mocked_graph(calls, [], OutageSynthesizerAgent(outage))):
+        await research.run_graph(state, "agent-fail-run")
+        failed = research_store.get("agent-fail-run")
+        assert failed["status"] == "error"
+        assert "OutageSynthesizerAgent: LLM outage" in failed["errors"]
+        # The graph stopped at the failed node instead of running on to the end
+        assert calls == ["research_planner", "technical_analyst"]
+        assert await saver.aget_tuple(thread_config("agent-fail-run")) is not None
+
+        outage.clear()
+        await research.run_graph(research_store.get("agent-fail-run"), "agent-fail-run", resume=True)
+
+    result = research_store.get("agent-fail-run")
+    assert result["status"] == "complete"
+    assert result["synthesized_content"] == "Report"
+    assert calls[2:] == ["quality_reviewer", "html_designer"]
+    assert await saver.aget_tuple(thread_config("agent-fail-run")) is None
+
+
+@pytest.mark.asyncio
+async def test_recover_interrupted_runs_restarts_runs_without_checkpoint(checkpointing):
+    calls = []
+    research_store.create("stale-run", {**research.initial_research_state("stale-run", "Restart", {}), "status": "in_progress"})
+
+    with patch.object(research, "research_graph", mocked_graph(calls, [])):
+        resumed = await research.recover_interrupted_runs()
+        assert "stale-run" in resumed
+        await run_scheduler.join()
+
+    assert research_store.get("stale-run")["status"] == "complete"
+    assert calls[0] == "research_planner"
+
+
+def test_resume_endpoint_rejects_runs_that_are_not_failed():
+    research_store.create("done-run", {"topic": "T", "status": "complete"})
+
+    assert client.post("/research/done-run/resume").status_code == 409
+    assert client.post("/research/missing-run/resume").status_code == 404
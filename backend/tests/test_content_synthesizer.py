@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
-from app.agents.content_synthesizer import ContentSynthesizerAgent
+from app.agents.content_synthesizer import ContentSynthesizerAgent, pack_chunks
+from app.core.config import settings
 from app.core.state import ResearchState
 
 @pytest.mark.asyncio
@@ -33,3 +34,103 @@ async def test_content_synthesizer_agent():
         assert result_state["synthesized_content"] is not None
         assert "# Research Report" in result_state["synthesized_content"]
         assert "Research content synthesized." in result_state["progress_updates"]
+
+
+def test_pack_chunks_splits_without_dropping_text():
+    texts = ["a" * 4, "b" * 4, "c" * 11, "d" * 2]
+    chunks = pack_chunks(texts, 10)
+
+    assert all(len(c) <= 10 for c in chunks)
+    assert "".join(chunks) == "".join(texts)
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_synthesis_keeps_every_category():
+    calls = []
+
+    async def map_call(messages):
+        calls.append(messages[1].content)
+        return MagicMock(content=f"notes {len(calls)}")
+
+    with patch("app.agents.base.ChatOpenAI") as MockLLM, \
+         patch.object(settings, "SYNTHESIS_MODE", "map_reduce"), \
+         patch.object(settings, "SYNTHESIS_GROUP_MAX_CHARS", 400):
+        agent = ContentSynthesizerAgent()
+        agent.map_llm = MagicMock(ainvoke=AsyncMock(side_effect=map_call))
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="# Report"))
+
+        state = {
+            "topic": "EVs",
+            "web_findings": [{"question": "News?", "raw_content": "w" * 300}],
+            "technical_findings": [{"question": "Batteries?", "raw_content": "t" * 300}],
+            "business_findings": [{"question": "Market?", "raw_content": "b" * 300}],
+            "progress_updates": [], "errors": [], "metadata": {},
+        }
+        result = await agent.run_agent(state)
+
+    # One map call per question group, including the business findings at the end
+    assert len(calls) == 3
+    assert "b" * 300 in calls[2]
+    final_prompt = agent.llm.ainvoke.await_args.args[0][1].content
+    assert "notes 1" in final_prompt and "notes 3" in final_prompt
+    assert result["synthesized_content"] == "# Report"
+    assert result["metadata"]["synthesis"] == {"mode": "map_reduce", "groups": 3, "rounds": 1}
+
+
+@pytest.mark.asyncio
+async def test_single_synthesis_drops_lowest_priority_findings_first():
+    with patch("app.agents.base.ChatOpenAI"), \
+         patch.object(settings, "SYNTHESIS_MODE", "single"), \
+         patch.object(settings, "AGENT_TOKEN_BUDGETS", "content_synthesizer=400"):
+        agent = ContentSynthesizerAgent()
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="# Report"))
+
+        state = {
+            "topic": "EVs",
+            "research_plan": {"questions": [
+                {"id": "q1", "question": "Minor?", "priority": 1},
+                {"id": "q2", "question": "Key?", "priority": 5},
+            ]},
+            "web_findings": [
+                {"question_id": "q1", "question": "Minor?", "raw_content": "m" * 1000},
+                {"question_id": "q2", "question": "Key?", "raw_content": "k" * 1000},
+            ],
+            "progress_updates": [], "errors": [], "metadata": {},
+        }
+        await agent.run_agent(state)
+
+    final_prompt = agent.llm.ainvoke.await_args.args[0][1].content
+    assert "k" * 1000 in final_prompt
+    assert "m" * 1000 not in final_prompt
+
+
+@pytest.mark.asyncio
+async def test_sections_synthesis_retrieves_per_section():
+    prompts = []
+
+    async def section_call(messages):
+        prompts.append(messages[1].content)
+        return MagicMock(content=f"section body {len(prompts)}")
+
+    with patch("app.agents.base.ChatOpenAI"), \
+         patch.object(settings, "SYNTHESIS_MODE", "sections"), \
+         patch.object(settings, "SYNTHESIS_SECTION_TOP_K", 1):
+        agent = ContentSynthesizerAgent()
+        agent.llm.ainvoke = AsyncMock(side_effect=section_call)
+
+        state = {
+            "topic": "EVs",
+            "web_findings": [{"question": "News?", "raw_content": "Regulators published new charging standards."}],
+            "technical_findings": [{"question": "Batteries?", "raw_content": "Cell architecture and engineering specifications improved."}],
+            "business_findings": [{"question": "Market?", "raw_content": "Market revenue and demand grew 30%."}],
+            "progress_updates": [], "errors": [], "metadata": {},
+        }
+        result = await agent.run_agent(state)
+
+    report = result["synthesized_content"]
+    assert report.startswith("# EVs")
+    assert report.index("## Executive Summary") < report.index("## Market Analysis") < report.index("## Technical Analysis")
+    assert len(prompts) == 4
+    market_prompt = next(p for p in prompts if "Section: Market Analysis" in p)
+    assert "Market revenue" in market_prompt and "Cell architecture" not in market_prompt
+    assert result["metadata"]["synthesis"] == {"mode": "sections", "sections": 4, "chunks": 3}
@@ -0,0 +1,62 @@
+import pytest
+
+from app.core.graph import deduplicate_findings
+from app.utils.dedup import MinHasher, dedup_findings
+
+SNIPPET = (
+    "Solid state batteries replace the liquid electrolyte with a solid one, which "
+    "promises higher energy density and lower fire risk for electric vehicles."
+)
+OTHER = (
+    "The European market for heat pumps grew strongly in 2022 as gas prices rose "
+    "and governments expanded subsidies for residential installations."
+)
+
+
+def test_minhash_similarity_separates_near_and_distinct_texts():
+    hasher = MinHasher()
+    a, b, c = hasher.signatures([SNIPPET, SNIPPET + " Source: example.", OTHER])
+    assert (a == b).mean() > 0.8
+    assert (a == c).mean() < 0.2
+
+
+def test_dedup_collapses_findings_and_keeps_sources():
+    findings = [
+        ("Web", {"question_id": "q1", "question": "Batteries?", "raw_content": SNIPPET, "source": "DuckDuckGo"}),
+        ("Technical", {"question_id": "q2", "question": "Chemistry?", "raw_content": SNIPPET, "source": "Technical Analyst Agent"}),
+        ("Business", {"question_id": "q3", "question": "Heat pumps?", "raw_content": OTHER, "source": "Business Analyst Agent"}),
+    ]
+    deduped, stats = dedup_findings(findings)
+
+    assert [t for t, _ in deduped] == ["Web", "Business"]
+    assert deduped[0][1]["duplicates"][0]["question_id"] == "q2"
+    assert deduped[0][1]["duplicates"][0]["source"] == "Technical Analyst Agent"
+    # Untouched findings are passed through as-is
+    assert deduped[1][1] is findings[2][1]
+    assert stats["findings_merged"] == 1
+
+
+def test_dedup_removes_repeated_paragraphs():
+    findings = [
+        ("Web", {"question": "A?", "content": f"{SNIPPET}\n\n{OTHER}"}),
+        ("Business", {"question": "B?", "content": f"Market outlook is positive for the next decade in most regions.\n\n{SNIPPET}"}),
+    ]
+    deduped, stats = dedup_findings(findings)
+
+    assert stats["paragraphs_removed"] == 1
+    assert SNIPPET not in deduped[1][1]["content"]
+    assert "Market outlook" in deduped[1][1]["content"]
+
+
+@pytest.mark.asyncio
+async def test_dedup_node_overwrites_findings_and_records_savings():
+    state = {
+        "web_findings": [{"question": "Batteries?", "raw_content": SNIPPET}],
+        "technical_findings": [{"question": "Chemistry?", "raw_content": SNIPPET}],
+        "business_findings": [],
+    }
+    update = await deduplicate_findings(state)
+
+    assert update["technical_findings"].value == []
+    assert len(update["web_findings"].value) == 1
+    assert update["metadata"]["dedup"]["tokens_saved"] > 0
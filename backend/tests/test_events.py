@@ -0,0 +1,242 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.routes import research
+from app.core.events import RunEventBus, ArtifactStreams, event_bus, artifact_streams, DONE_EVENT, STATUS_EVENT
+from app.core.store import research_store
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_subscribe_resumes_after_last_event_id():
+    bus = RunEventBus()
+    bus.publish("r1", "progress", {"message": "one"})
+    bus.publish("r1", "progress", {"message": "two"})
+
+    async def publish_later():
+        await asyncio.sleep(0.01)
+        bus.publish("r1", "progress", {"message": "three"})
+        bus.publish("r1", DONE_EVENT, {"status": "complete"})
+
+    task = asyncio.create_task(publish_later())
+    received = [e async for e in bus.subscribe("r1", last_event_id=1)]
+    await task
+
+    assert [e["id"] for e in received] == [2, 3, 4]
+    assert received[-1]["type"] == DONE_EVENT
+
+
+@pytest.mark.asyncio
+async def test_subscribe_emits_events_published_while_suspended():
+    bus = RunEventBus()
+    bus.publish("r1", "progress", {"message": "one"})
+
+    received = []
+    async for event in bus.subscribe("r1"):
+        received.append(event)
+        if event["id"] == 1:
+            # Published while the subscriber is suspended at its yield
+            bus.publish("r1", STATUS_EVENT, {"status": "complete"})
+            bus.publish("r1", DONE_EVENT, {"status": "complete"})
+
+    assert [e["type"] for e in received] == ["progress", STATUS_EVENT, DONE_EVENT]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_heartbeat_and_bounded_history():
+    bus = RunEventBus(history=2)
+    for i in range(5):
+        bus.publish("r1", "progress", {"i": i})
+
+    stream = bus.subscribe("r1", heartbeat=0.01)
+    assert [(await stream.__anext__())["id"] for _ in range(2)] == [4, 5]
+    assert await stream.__anext__() is None
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_live_runs_outlast_finished_ones_and_evicted_subscribers_return():
+    bus = RunEventBus(max_runs=2)
+    bus.publish("live", "progress", {})
+    stream = bus.subscribe("live", last_event_id=1, heartbeat=0.01)
+    assert await stream.__anext__() is None
+    for run in ("done1", "done2"):
+        bus.publish(run, DONE_EVENT, {"status": "complete"})
+    assert bus.has_run("live") and not bus.has_run("done1")
+
+    # With no finished run left to drop, the live one goes and is closed
+    bus.publish("live2", "progress", {})
+    bus.publish("live3", "progress", {})
+    assert not bus.has_run("live")
+    assert [e async for e in stream] == []
+    assert [e async for e in bus.subscribe("never-published")] == []
+
+
+def test_missed_events_and_sse_snapshot_on_a_gap():
+    bus = RunEventBus(history=2)
+    for i in range(4):
+        bus.publish("r1", "progress", {"i": i})
+    assert bus.missed("r1", 1) and not bus.missed("r1", 2) and not bus.missed("unknown", 0)
+
+    research_store.create("gap-run", {"topic": "T", "status": "in_progress", "progress_updates": ["a"]})
+    with patch.object(research, "event_bus", bus):
+        for i in range(3):
+            bus.publish("gap-run", "progress", {"i": i})
+        bus.publish("gap-run", DONE_EVENT, {"status": "complete"})
+        blocks = [b for b in client.get("/research/gap-run/events").text.split("\n\n") if b]
+
+    assert blocks[0].startswith("id: 0\nevent: snapshot")
+    assert [b.split("\n")[0] for b in blocks[1:]] == ["id: 3", "id: 4"]
+
+
+class FakeGraph:
+    def copy(self, update=None):
+        return self
+
+    async def astream(self, state, config=None, stream_mode=None):
+        yield "updates", {"research_planner": {"progress_updates": ["Plan ready"]}}
+        yield "values", {**state, "progress_updates": state["progress_updates"] + ["Plan ready"]}
+        yield "updates", {"html_designer": {"html_output": "<html></html>", "errors": ["minor"]}}
+        yield "values", {**state, "html_output": "<html></html>", "errors": ["minor"]}
+
+
+@pytest.mark.asyncio
+async def test_run_graph_streams_events_and_persists_state():
+    research_store.create("stream-run", {"topic": "T", "status": "started", "progress_updates": [], "errors": []})
+    state = {"topic": "T", "customization": {}, "status": "started", "progress_updates": ["Research started"], "errors": []}
+
+    with patch.object(research, "research_graph", FakeGraph()):
+        await research.run_graph(state, "stream-run")
+
+    events = event_bus.events_after("stream-run")
+    assert [e["type"] for e in events] == ["status", "node", "progress", "node", "error", "done"]
+    assert events[2]["data"] == {"node": "research_planner", "message": "Plan ready"}
+    assert events[-1]["data"] == {"status": "complete"}
+    stored = research_store.get("stream-run")
+    assert stored["status"] == "complete"
+    assert stored["html_output"] == "<html></html>"
+
+
+def test_sse_endpoint_replays_from_last_event_id():
+    research_store.create("sse-run", {"topic": "T", "status": "complete"})
+    event_bus.publish("sse-run", "progress", {"message": "first"})
+    event_bus.publish("sse-run", "progress", {"message": "second"})
+    event_bus.publish("sse-run", DONE_EVENT, {"status": "complete"})
+
+    response = client.get("/research/sse-run/events", headers={"Last-Event-ID": "1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in response.text.split("\n\n") if b]
+    assert blocks[0] == 'id: 2\nevent: progress\ndata: {"message": "second"}'
+    assert blocks[1].startswith("id: 3\nevent: done")
+
+
+def test_sse_endpoint_sends_snapshot_for_runs_without_history():
+    research_store.create("old-run", {"topic": "T", "status": "complete", "progress_updates": ["a", "b"]})
+
+    response = client.get("/research/old-run/events")
+
+    assert "event: snapshot" in response.text
+    assert '"terminal": true' in response.text
+    assert client.get("/research/missing-run/events").status_code == 404
+
+
+def test_websocket_streams_events():
+    research_store.create("ws-run", {"topic": "T", "status": "complete"})
+    event_bus.publish("ws-run", "node", {"node": "research_planner", "keys": []})
+    event_bus.publish("ws-run", DONE_EVENT, {"status": "complete"})
+
+    with client.websocket_connect("/research/ws-run/ws?last_event_id=0") as ws:
+        first = ws.receive_json()
+        second = ws.receive_json()
+
+    assert first["type"] == "node"
+    assert second["type"] == DONE_EVENT
+
+
+def test_status_endpoint_projects_fields_and_new_progress():
+    log = [{"seq": i, "type": "progress", "node": None, "message": f"m{i}", "ts": 0} for i in range(1, 4)]
+    research_store.create("poll-run", {"topic": "T", "status": "in_progress", "html_output": "<html></html>", "progress_log": log})
+
+    body = client.get("/research/poll-run?fields=status,progress_log&after=1").json()
+
+    assert body == {"status": "in_progress", "progress_log": log[1:], "last_seq": 3}
+    assert client.get("/research/poll-run?fields=status&after=3").json() == {"status": "in_progress", "progress_log": [], "last_seq": 3}
+    assert "html_output" in client.get("/research/poll-run").json()
+    assert client.get("/research/poll-run?fields=bogus").status_code == 400
+    assert client.get("/research/missing-run?fields=status").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_artifact_stream_resumes_from_offset_and_signals_restart():
+    streams = ArtifactStreams()
+    streams.open("r1", "synthesized_content")
+    streams.append("r1", "synthesized_content", "# Title")
+    streams.append("r1", "synthesized_content", "\nBody")
+
+    resumed = streams.subscribe("r1", "synthesized_content", offset=3)
+    assert await resumed.__anext__() == {"offset": 12, "text": "itle\nBody", "reset": False}
+
+    streams.open("r1", "synthesized_content")
+    streams.append("r1", "synthesized_content", "Retry")
+    streams.close("r1", "synthesized_content")
+    assert [d async for d in resumed] == [{"offset": 5, "text": "Retry", "reset": True}]
+
+
+@pytest.mark.asyncio
+async def test_open_artifact_streams_are_not_evicted():
+    streams = ArtifactStreams(max_streams=2)
+    streams.open("live", "synthesized_content")
+    reader = streams.subscribe("live", "synthesized_content", heartbeat=0.01)
+    assert await reader.__anext__() is None
+    # Subscribing does not create streams; other runs' streams only push out closed ones
+    assert [d async for d in streams.subscribe("unknown", "html_output")] == []
+    for i in range(3):
+        streams.open(f"other{i}", "synthesized_content")
+        streams.close(f"other{i}", "synthesized_content")
+    assert streams.has_stream("live", "synthesized_content")
+    assert not streams.has_stream("other0", "synthesized_content")
+
+    streams.append("live", "synthesized_content", "Report")
+    streams.finish_run("live", {"synthesized_content": "Report"})
+    assert [d async for d in reader] == [{"offset": 6, "text": "Report", "reset": False}]
+    # Stored, so later readers are served from the store
+    assert not streams.has_stream("live", "synthesized_content")
+
+
+def test_artifact_stream_endpoint():
+    research_store.create("tokens-run", {"topic": "T", "status": "in_progress", "html_output": None})
+    artifact_streams.open("tokens-run", "html_output")
+    artifact_streams.append("tokens-run", "html_output", "<html>")
+    artifact_streams.append("tokens-run", "html_output", "</html>")
+    artifact_streams.close("tokens-run", "html_output")
+
+    response = client.get("/research/tokens-run/stream/html_output", headers={"Last-Event-ID": "2"})
+
+    assert 'id: 13\nevent: delta\ndata: {"text": "tml></html>", "reset": false}' in response.text
+    assert "event: done" in response.text
+
+    # Finished before this process saw it: served from the store
+    research_store.create("stored-run", {"topic": "T", "status": "complete", "synthesized_content": "Report"})
+    stored = client.get("/research/stored-run/stream/synthesized_content")
+    assert '"text": "Report"' in stored.text
+    assert client.get("/research/stored-run/stream/topic").status_code == 404
+
+
+def test_artifact_stream_waits_for_an_artifact_generated_in_another_process():
+    import threading
+
+    research_store.create("worker-run", {"topic": "T", "status": "in_progress", "html_output": None})
+    # A worker process stores the dashboard; this process never streams it
+    finish = threading.Timer(0.05, research_store.update, ("worker-run", {"status": "complete", "html_output": "<html>"}))
+    finish.start()
+    with patch.object(research, "ARTIFACT_POLL_SECONDS", 0.01):
+        response = client.get("/research/worker-run/stream/html_output")
+    finish.join()
+
+    assert 'id: 6\nevent: delta\ndata: {"text": "<html>", "reset": false}' in response.text
+    assert 'event: done\ndata: {"length": 6}' in response.text
@@ -1,7 +1,8 @@
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from app.core.graph import build_research_graph
-from app.core.state import ResearchState
+from app.core.config import settings
+from app.core.state import ResearchState, append_progress_log, progress_entry
 
 @pytest.mark.asyncio
 async def test_research_graph():
@@ -55,3 +56,104 @@ async def test_research_graph():
         # Check if updates were merged
         assert result.get("research_plan") == {"questions": ["q1"]}
         assert result.get("web_findings") == [{"id": "f1"}]
+
+
+@pytest.mark.asyncio
+async def test_questions_dispatched_once_and_run_in_parallel():
+    import asyncio
+
+    plan = {
+        "questions": [
+            {"id": "q1", "question": "Architecture", "category": "technical"},
+            {"id": "q2", "question": "Revenue", "category": "business"},
+            {"id": "q3", "question": "Market share", "category": "market"},
+            {"id": "q4", "question": "Latest news", "category": "news"},
+        ]
+    }
+    handled = []
+    both_started = asyncio.Event()
+
+    async def mock_planner_run(state: dict):
+        return {"research_plan": plan, "progress_updates": ["planned"]}
+
+    def make_handler(name, field):
+        async def run(state: dict):
+            q_id = state["question"]["id"]
+            handled.append((name, q_id))
+            if {"technical_analyst", "business_analyst"} <= {n for n, _ in handled}:
+                both_started.set()
+            # Only completes if the analysts are running at the same time
+            await asyncio.wait_for(both_started.wait(), timeout=2)
+            return {field: [{"question_id": q_id}], "progress_updates": [f"{name} {q_id}"], "errors": [f"{name} {q_id} warning"]}
+        return run
+
+    async def mock_synth_run(state: dict):
+        return {"synthesized_content": f"{len(state['technical_findings'])}+{len(state['business_findings'])}"}
+
+    async def noop_run(state: dict):
+        return {}
+
+    with patch("app.core.graph.ResearchPlannerAgent") as MockPlanner, \
+         patch("app.core.graph.WebResearcherAgent") as MockWeb, \
+         patch("app.core.graph.TechnicalAnalystAgent") as MockTech, \
+         patch("app.core.graph.BusinessAnalystAgent") as MockBiz, \
+         patch("app.core.graph.ContentSynthesizerAgent") as MockSynth, \
+         patch("app.core.graph.QualityReviewerAgent") as MockReview, \
+         patch("app.core.graph.HTMLDesignerAgent") as MockHTML:
+
+        MockPlanner.return_value.run_agent = mock_planner_run
+        MockWeb.return_value.run_agent = make_handler("web_researcher", "web_findings")
+        MockTech.return_value.run_agent = make_handler("technical_analyst", "technical_findings")
+        MockBiz.return_value.run_agent = make_handler("business_analyst", "business_findings")
+        MockSynth.return_value.run_agent = mock_synth_run
+        MockReview.return_value.run_agent = noop_run
+        MockHTML.return_value.run_agent = noop_run
+
+        graph = build_research_graph()
+
+        initial_state: ResearchState = {
+            "topic": "Test Topic",
+            "customization": {},
+            "research_plan": None,
+            "web_findings": [],
+            "technical_findings": [],
+            "business_findings": [],
+            "synthesized_content": None,
+            "html_output": None,
+            "quality_report": None,
+            "status": "started",
+            "progress_updates": ["Research started"],
+            "errors": [],
+            "metadata": {"research_id": "r1"}
+        }
+
+        result = await graph.ainvoke(initial_state, config={"max_concurrency": 4})
+
+        # Every question handled exactly once, market questions only by the business analyst
+        assert sorted(handled) == [
+            ("business_analyst", "q2"),
+            ("business_analyst", "q3"),
+            ("technical_analyst", "q1"),
+            ("web_researcher", "q4"),
+        ]
+        assert result["metadata"]["question_routes"] == {
+            "q1": "technical_analyst", "q2": "business_analyst",
+            "q3": "business_analyst", "q4": "web_researcher",
+        }
+        # Writes from concurrent tasks are merged rather than overwritten
+        assert sorted(f["question_id"] for f in result["business_findings"]) == ["q2", "q3"]
+        assert len(result["errors"]) == 4
+        assert result["progress_updates"][:2] == ["Research started", "planned"]
+        assert "Research phase finished with 4 findings." in result["progress_updates"]
+        assert result["metadata"]["finding_counts"] == {"web": 1, "technical": 1, "business": 2}
+        assert result["synthesized_content"] == "1+2"
+        assert result["metadata"]["research_id"] == "r1"
+
+
+def test_progress_log_is_sequenced_and_bounded():
+    with patch.object(settings, "PROGRESS_LOG_MAX", 3):
+        log = append_progress_log([], [progress_entry("a"), progress_entry("b")])
+        log = append_progress_log(log, [progress_entry(m) for m in ("c", "d", "e")])
+
+    assert [e["seq"] for e in log] == [3, 4, 5]
+    assert [e["message"] for e in log] == ["c", "d", "e"]
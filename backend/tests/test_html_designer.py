@@ -2,6 +2,8 @@ import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from app.agents.html_designer import HTMLDesignerAgent
 from app.core.state import ResearchState
+from app.core.events import artifact_streams
+from langchain_core.messages import AIMessageChunk
 
 @pytest.mark.asyncio
 async def test_html_designer_agent():
@@ -32,3 +34,29 @@ async def test_html_designer_agent():
         assert result_state["html_output"] is not None
         assert "<!DOCTYPE html>" in result_state["html_output"]
         assert "HTML Report generated." in result_state["progress_updates"]
+
+
+@pytest.mark.asyncio
+async def test_html_designer_streams_tokens_with_identical_output():
+    raw = "```html\n<!DOCTYPE html><html><body>Report</body></html>\n```"
+    tokens = [raw[i:i + 7] for i in range(0, len(raw), 7)]
+
+    async def astream(messages):
+        for token in tokens:
+            yield AIMessageChunk(content=token)
+
+    with patch("app.agents.base.ChatOpenAI") as MockLLM:
+        MockLLM.return_value.ainvoke = AsyncMock(return_value=MagicMock(content=raw))
+        MockLLM.return_value.astream = astream
+        agent = HTMLDesignerAgent()
+        state = {
+            "topic": "Test", "customization": {}, "synthesized_content": "# Report",
+            "html_output": None, "progress_updates": [], "errors": [], "metadata": {},
+        }
+
+        blocking = await agent.run_agent(state)
+        streamed = await agent.run_agent({**state, "metadata": {"research_id": "html-stream"}})
+
+    assert streamed["html_output"] == blocking["html_output"]
+    assert streamed["html_output"].startswith("<!DOCTYPE html>")
+    assert artifact_streams.text("html-stream", "html_output") == raw
@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.core.jobs import SQLiteJobQueue
+from app.core.scheduler import SchedulerFullError
+from app.core.store import MemoryResearchStore
+from app import worker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def test_claim_order_positions_and_limits(queue):
+    with patch.object(settings, "MAX_RUNS_PER_CLIENT", 2), patch.object(settings, "MAX_QUEUED_RUNS", 3):
+        assert queue.enqueue("r1", client_id="a") == 1
+        assert queue.enqueue("r2", client_id="b") == 2
+        assert queue.enqueue("urgent", client_id="b", priority=5) == 1
+        with pytest.raises(SchedulerFullError):
+            queue.enqueue("r3", client_id="b")
+        with pytest.raises(SchedulerFullError) as full:
+            queue.enqueue("r4", client_id="c")
+        assert full.value.retry_after > 0
+
+    assert queue.position("r2") == 3
+    assert [queue.claim("w1").research_id for _ in range(3)] == ["urgent", "r1", "r2"]
+    assert queue.claim("w1") is None
+    assert queue.position("r2") is None
+    assert queue.stats() == {"running": 3}
+
+
+def test_stale_jobs_are_requeued_as_resumes(queue):
+    queue.enqueue("r1")
+    job = queue.claim("w1")
+    assert job.resume is False
+
+    assert queue.requeue_stale(stale_after=60) == 0
+    assert queue.requeue_stale(stale_after=-1) == 1
+    assert queue.heartbeat(job.id, "w1") is False
+
+    again = queue.claim("w2")
+    assert (again.research_id, again.resume, again.attempts) == ("r1", True, 2)
+    # The previous owner can no longer finish or release it
+    assert queue.complete(job.id, "done", "w1") is False
+    queue.release(job.id, "w1")
+    assert queue.stats() == {"running": 1}
+    assert queue.complete(again.id, "done", "w2") is True
+    assert queue.stats() == {"done": 1}
+
+
+@pytest.mark.asyncio
+async def test_run_job_stops_when_the_job_is_reassigned(queue):
+    store = MemoryResearchStore({})
+    store.create("r1", {"topic": "A", "status": "queued"})
+    queue.enqueue("r1")
+    job = queue.claim("w1")
+    cancelled = asyncio.Event()
+
+    async def fake_run_graph(state, r_id, resume=False):
+        try:
+            # Another worker takes the run over while this one is still executing it
+            queue.requeue_stale(stale_after=-1)
+            queue.claim("w2")
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with patch.object(worker, "research_store", store), \
+         patch.object(settings, "WORKER_HEARTBEAT_SECONDS", 0.01), \
+         patch("app.api.routes.research.run_graph", fake_run_graph):
+        await asyncio.wait_for(worker.run_job(queue, job, "w1"), timeout=5)
+
+    assert cancelled.is_set()
+    # Still running, now on w2: not completed or released by w1
+    assert queue.stats() == {"running": 1}
+    assert queue.claim("w3") is None
+
+
+@pytest.mark.asyncio
+async def test_worker_loop_runs_jobs_and_releases_on_shutdown(queue):
+    store = MemoryResearchStore({})
+    store.create("done-run", {"topic": "A", "status": "queued"})
+    store.create("slow-run", {"topic": "B", "status": "queued"})
+    queue.enqueue("done-run")
+    queue.enqueue("slow-run")
+    ran, stop = [], asyncio.Event()
+
+    async def fake_run_graph(state, r_id, resume=False):
+        ran.append((r_id, resume))
+        if r_id == "slow-run":
+            # Shut down only once the other job has been marked done
+            while queue.stats().get("done") != 1:
+                await asyncio.sleep(0.01)
+            stop.set()
+            await asyncio.sleep(3600)
+
+    with patch.object(worker, "research_store", store), \
+         patch("app.api.routes.research.run_graph", fake_run_graph):
+        await asyncio.wait_for(worker.worker_loop("w1", concurrency=2, queue=queue, stop=stop), timeout=5)
+
+    assert ran == [("done-run", False), ("slow-run", False)]
+    # The interrupted run goes back to the queue to be resumed from its checkpoint
+    assert queue.stats() == {"done": 1, "queued": 1}
+    assert queue.claim("w2").resume is True
+
+
+def test_worker_mode_queue_calls_run_off_the_event_loop(queue):
+    from fastapi.testclient import TestClient
+    from app import main
+    from app.api.routes import research
+
+    on_loop = []
+
+    def in_event_loop():
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    class RecordingQueue:
+        def enqueue(self, *args, **kwargs):
+            on_loop.append(in_event_loop())
+            return queue.enqueue(*args, **kwargs)
+
+        def stats(self):
+            on_loop.append(in_event_loop())
+            return queue.stats()
+
+    client = TestClient(main.app)
+    with patch.object(settings, "EXECUTION_MODE", "worker"), \
+         patch.object(research, "get_job_queue", RecordingQueue), \
+         patch.object(main, "get_job_queue", RecordingQueue):
+        response = client.post("/research", json={"topic": "Queued"})
+        stats = client.get("/scheduler/stats").json()
+        client.get("/metrics")
+
+    assert response.json()["status"] == "queued"
+    assert stats == {"mode": "worker", "jobs": {"queued": 1}}
+    # SQLite work that can block on other processes' locks stays in worker threads
+    assert on_loop == [False, False, False]
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import knowledge
+from app.core.config import settings
+from app.core.graph import dispatch_questions, route_research_questions
+from app.core.knowledge import KnowledgeBase
+
+client = TestClient(app)
+
+RUN_STATE = {
+    "topic": "Electric vehicles",
+    "web_findings": [
+        {"question_id": "q1", "question": "What is the market size of electric vehicles in Europe?",
+         "raw_content": "The European EV market reached 3 million units.", "source": "DuckDuckGo"},
+    ],
+    "technical_findings": [
+        {"question_id": "q2", "question": "How do solid state batteries work?",
+         "content": "Solid electrolytes replace liquid ones.", "source": "Technical Analyst Agent"},
+        {"question_id": "q3", "question": "Old reused question?", "content": "Reused text.", "reused_from": "other"},
+    ],
+    "business_findings": [],
+}
+
+
+@pytest.fixture
+def kb(tmp_path):
+    kb = KnowledgeBase(str(tmp_path / "knowledge.sqlite"))
+    with patch.object(settings, "KNOWLEDGE_ENABLED", True), patch.object(knowledge, "_knowledge_base", kb):
+        yield kb
+
+
+def test_add_run_indexes_findings_and_replaces_earlier_copy(kb):
+    assert kb.add_run("run-1", RUN_STATE) == 2
+    assert kb.add_run("run-1", RUN_STATE) == 2
+    assert kb.stats() == {"findings": 2, "runs": 1}
+
+    results = kb.search("battery electrolytes")
+    assert results[0]["research_id"] == "run-1"
+    assert results[0]["field"] == "technical_findings"
+    assert results[0]["finding"]["source"] == "Technical Analyst Agent"
+    assert kb.search("battery", max_age=-1) == []
+    # FTS syntax in user input is treated as plain text
+    assert kb.search('market" OR NEAR(') != []
+
+
+def test_find_reusable_needs_matching_question_and_topic(kb):
+    kb.add_run("run-1", RUN_STATE)
+    question = "Market size of electric vehicles in Europe"
+    assert kb.find_reusable(question, "Electric vehicles", 0.9, 3600)["research_id"] == "run-1"
+    assert kb.find_reusable("Market size of electric vehicles in Asia", "Electric vehicles", 0.9, 3600) is None
+
+
+def test_find_reusable_ignores_generic_questions_from_other_topics(kb):
+    kb.add_run("run-1", {
+        "topic": "Quantum computing in banking",
+        "web_findings": [{"question": "What are the key challenges?", "raw_content": "Error correction."}],
+    })
+    assert kb.find_reusable("What are the key challenges?", "Quantum computing in banking", 0.9, 3600) is not None
+    assert kb.find_reusable("What are the key challenges?", "Vertical farming", 0.9, 3600) is None
+    # Sharing one term is not the same topic
+    assert kb.find_reusable("What are the key challenges?", "Cloud computing costs for startups", 0.9, 3600) is None
+
+
+def test_search_endpoint(kb):
+    kb.add_run("run-1", RUN_STATE)
+    response = client.get("/research/search", params={"q": "European EV market"})
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["finding"]["question_id"] == "q1"
+    assert client.get("/research/search").status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_router_reuses_fresh_findings_instead_of_dispatching(kb):
+    kb.add_run("run-1", RUN_STATE)
+    plan = {"questions": [
+        {"id": "a", "question": "What is the market size of electric vehicles in Europe?", "category": "business"},
+        {"id": "b", "question": "Who makes charging stations?", "category": "general"},
+    ]}
+    state = {"topic": "Electric vehicles", "research_plan": plan, "metadata": {}}
+    update = await route_research_questions(state)
+
+    reused = update["web_findings"][0]
+    assert reused["question_id"] == "a" and reused["reused_from"] == "run-1"
+    assert update["metadata"]["reused_questions"] == ["a"]
+
+    sends = dispatch_questions({**state, "metadata": update["metadata"]})
+    assert [s.arg["question"]["id"] for s in sends] == ["b"]
@@ -0,0 +1,143 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from app.core.llm import CachedChatModel, llm_cache_key
+from app.core.config import settings
+from app.utils.cache import TieredCache
+from app.models.research import ResearchPlan
+from app.agents.quality_reviewer import QualityReviewerAgent
+
+
+@pytest.mark.asyncio
+async def test_cached_chat_model_skips_repeat_calls(tmp_path):
+    cache = TieredCache("llm", path=str(tmp_path / "llm.sqlite"))
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=AIMessage(content="Answer"))
+    cached_llm = CachedChatModel(llm, "gpt-test", 0.0, cache=cache)
+
+    messages = [SystemMessage(content="sys"), HumanMessage(content="question")]
+    first = await cached_llm.ainvoke(messages)
+    second = await cached_llm.ainvoke([SystemMessage(content="sys"), HumanMessage(content="question")])
+    await cached_llm.ainvoke([HumanMessage(content="other question")])
+
+    assert first.content == second.content == "Answer"
+    assert isinstance(second, AIMessage)
+    assert llm.ainvoke.await_count == 2
+
+    # Served from disk after a restart
+    restarted = CachedChatModel(llm, "gpt-test", 0.0, cache=TieredCache("llm", path=str(tmp_path / "llm.sqlite")))
+    assert (await restarted.ainvoke(messages)).content == "Answer"
+    assert llm.ainvoke.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_shares_entries_with_ainvoke(tmp_path):
+    cache = TieredCache("llm", path=str(tmp_path / "llm.sqlite"))
+    calls = []
+
+    async def astream(messages):
+        calls.append(messages)
+        for token in ("Long ", "report"):
+            yield AIMessageChunk(content=token)
+
+    llm = MagicMock()
+    llm.astream = astream
+    llm.ainvoke = AsyncMock()
+    cached_llm = CachedChatModel(llm, "gpt-test", 0.0, cache=cache)
+    messages = [HumanMessage(content="write")]
+
+    first = [c.content async for c in cached_llm.astream(messages)]
+    second = [c.content async for c in cached_llm.astream(messages)]
+
+    assert first == ["Long ", "report"]
+    assert second == ["Long report"]
+    assert (await cached_llm.ainvoke(messages)).content == "Long report"
+    assert len(calls) == 1
+    llm.ainvoke.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cached_structured_output_is_keyed_by_schema(tmp_path):
+    cache = TieredCache("llm", path=str(tmp_path / "llm.sqlite"))
+    plan = ResearchPlan(questions=[], estimated_time="1 hour")
+    structured = MagicMock()
+    structured.ainvoke = AsyncMock(return_value=plan)
+    llm = MagicMock()
+    llm.with_structured_output.return_value = structured
+
+    cached_llm = CachedChatModel(llm, "gpt-test", 0.0, cache=cache)
+    messages = [HumanMessage(content="plan it")]
+
+    await cached_llm.with_structured_output(ResearchPlan).ainvoke(messages)
+    result = await cached_llm.with_structured_output(ResearchPlan).ainvoke(messages)
+
+    assert isinstance(result, ResearchPlan)
+    assert result.estimated_time == "1 hour"
+    assert structured.ainvoke.await_count == 1
+    assert llm_cache_key("gpt-test", 0.0, messages, ResearchPlan) != llm_cache_key("gpt-test", 0.0, messages)
+
+
+@pytest.mark.asyncio
+async def test_call_options_are_keyed_and_cache_io_runs_off_the_loop(tmp_path):
+    import asyncio
+
+    on_loop = []
+
+    class RecordingCache(TieredCache):
+        def get(self, key, *args, **kwargs):
+            on_loop.append(self._in_loop())
+            return super().get(key, *args, **kwargs)
+
+        def set(self, key, value, *args, **kwargs):
+            on_loop.append(self._in_loop())
+            return super().set(key, value, *args, **kwargs)
+
+        @staticmethod
+        def _in_loop():
+            try:
+                asyncio.get_running_loop()
+                return True
+            except RuntimeError:
+                return False
+
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=AIMessage(content="Answer"))
+    cached_llm = CachedChatModel(llm, "gpt-test", 0.0, cache=RecordingCache("llm", path=str(tmp_path / "llm.sqlite")))
+    messages = [HumanMessage(content="question")]
+
+    await cached_llm.ainvoke(messages)
+    await cached_llm.ainvoke(messages, stop=["\n"])
+    await cached_llm.ainvoke(messages, stop=["\n"])
+    assert llm.ainvoke.await_count == 2
+    assert on_loop and not any(on_loop)
+
+    # Options that can't be keyed (e.g. callbacks) bypass the cache
+    await cached_llm.ainvoke(messages, config={"callbacks": [object()]})
+    await cached_llm.ainvoke(messages, config={"callbacks": [object()]})
+    assert llm.ainvoke.await_count == 4
+
+
+def test_llm_cache_key_includes_model_and_temperature():
+    messages = [HumanMessage(content="hi")]
+    assert llm_cache_key("a", 0.0, messages) == llm_cache_key("a", 0.0, [HumanMessage(content="hi")])
+    assert llm_cache_key("a", 0.0, messages) != llm_cache_key("b", 0.0, messages)
+    assert llm_cache_key("a", 0.0, messages) != llm_cache_key("a", 0.7, messages)
+
+
+def test_agent_cache_opt_in_forces_deterministic_temperature(tmp_path):
+    with patch("app.agents.base.ChatOpenAI") as MockLLM, \
+         patch.object(settings, "LLM_CACHE_ENABLED", True), \
+         patch.object(settings, "LLM_CACHE_AGENTS", "quality_reviewer"), \
+         patch.object(settings, "CACHE_DIR", str(tmp_path)), \
+         patch("app.core.llm._llm_cache", None):
+
+        agent = QualityReviewerAgent()
+        assert agent.use_cache is True
+        assert isinstance(agent.llm, CachedChatModel)
+        assert MockLLM.call_args.kwargs["temperature"] == 0
+
+        settings.LLM_CACHE_AGENTS = "research_planner"
+        agent = QualityReviewerAgent()
+        assert agent.use_cache is False
+        assert agent.llm is MockLLM.return_value
+        assert MockLLM.call_args.kwargs["temperature"] == 0.7
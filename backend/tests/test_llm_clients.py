@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.agents.quality_reviewer import QualityReviewerAgent
+from app.agents.html_designer import HTMLDesignerAgent
+from app.core.config import settings
+from app.core.llm_clients import ModelRateLimiter, PooledLLMTransport, rate_limiter_for, request_cost
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_requests_over_the_token_rate():
+    limiter = ModelRateLimiter("m", rpm=0, tpm=600)  # 10 tokens per second
+    with patch("app.core.llm_clients.asyncio.sleep", new=AsyncMock()) as sleep:
+        assert await limiter.acquire(600) == 0
+        wait = await limiter.acquire(5)
+
+    assert wait == pytest.approx(0.5, abs=0.01)
+    sleep.assert_awaited_once()
+    stats = limiter.stats()
+    assert stats["calls"] == 2 and stats["delayed"] == 1
+    assert stats["max_wait_seconds"] == pytest.approx(0.5, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_limiter_caps_requests_per_minute():
+    limiter = ModelRateLimiter("m", rpm=2, tpm=0)
+    with patch("app.core.llm_clients.asyncio.sleep", new=AsyncMock()):
+        waits = [await limiter.acquire(0) for _ in range(3)]
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(30, abs=0.1)
+
+
+def test_request_cost_only_counts_chat_completions():
+    body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions", json=body)
+    assert request_cost(request) == ("gpt-4o", 150)
+    assert request_cost(httpx.Request("GET", "https://api.openai.com/v1/models")) == (None, 0)
+
+
+def test_agents_share_one_chat_model_and_http_client():
+    first, second = QualityReviewerAgent(), HTMLDesignerAgent()
+    assert first.llm is second.llm
+    assert first.llm.http_async_client is second.llm.http_async_client
+
+
+@pytest.mark.asyncio
+async def test_pooled_transport_rate_limits_each_completion():
+    transport = PooledLLMTransport(httpx.Limits())
+    transport._transports[asyncio.get_running_loop()] = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(2):
+            await client.post("https://api.openai.com/v1/chat/completions", json={"model": "pool-test", "messages": []})
+        await client.get("https://api.openai.com/v1/models")
+
+    assert rate_limiter_for("pool-test").stats()["calls"] == 2
+
+
+def test_settle_returns_unused_reservations():
+    limiter = ModelRateLimiter("m", rpm=60, tpm=600)
+    now = time.monotonic()
+    with patch("app.core.llm_clients.time.monotonic", return_value=now):
+        limiter.requests.reserve(1, now)
+        limiter.tokens.reserve(500, now)
+        # Failed without a response: request and tokens come back
+        limiter.settle(500)
+        assert limiter.requests.level == 60 and limiter.tokens.level == 600
+
+        limiter.tokens.reserve(500, now)
+        limiter.settle(500, used=120)
+        assert limiter.tokens.level == 480
+        limiter.tokens.reserve(100, now)
+        limiter.settle(100, used=300)
+        assert limiter.tokens.level == 180
+
+
+@pytest.mark.asyncio
+async def test_pooled_transport_settles_reservations_with_reported_usage():
+    body = json.dumps({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5}}).encode()
+    calls = []
+
+    class Body(httpx.AsyncByteStream):
+        # Unread like a network response, so the body passes through the transport's stream
+        async def __aiter__(self):
+            yield body
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 2:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, stream=Body())
+
+    transport = PooledLLMTransport(httpx.Limits())
+    transport._transports[asyncio.get_running_loop()] = httpx.MockTransport(handler)
+    request = {"model": "settle-test", "messages": [], "max_tokens": 1000}
+    with patch.object(settings, "LLM_DEFAULT_RPM", 600), patch.object(settings, "LLM_DEFAULT_TPM", 100000):
+        limiter = rate_limiter_for("settle-test")
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.post("https://api.openai.com/v1/chat/completions", json=request)
+            with pytest.raises(httpx.ConnectError):
+                await client.post("https://api.openai.com/v1/chat/completions", json=request)
+
+    # Only the completed call's request and its reported 15 tokens stay spent
+    assert limiter.requests.level == pytest.approx(599, abs=0.1)
+    assert limiter.tokens.level == pytest.approx(100000 - 15, abs=5)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.agents.base import AgentError, BaseAgent
+from app.core.llm_clients import PooledLLMTransport
+from app.core.metrics import current_agent, response_usage
+from app.main import app
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class FlakyMetricsAgent(BaseAgent):
+    async def invoke(self, state):
+        state["errors"].append("search timed out")
+        if state.get("topic") == "boom":
+            raise RuntimeError("boom")
+        return state
+
+
+def test_metrics_endpoint():
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "research_runs_active 0.0" in response.text
+    assert "research_node_duration_seconds" in response.text
+
+
+def test_response_usage_reads_json_and_streams():
+    assert response_usage(b'{"usage": {"prompt_tokens": 3}}') == {"prompt_tokens": 3}
+    stream = (
+        b'data: {"choices": [{"delta": {"content": "hi"}}], "usage": null}\n\n'
+        b'data: {"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2}}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    assert response_usage(stream) == {"prompt_tokens": 5, "completion_tokens": 2}
+
+
+@pytest.mark.asyncio
+async def test_run_agent_records_duration_and_errors():
+    agent = FlakyMetricsAgent()
+    before_ok = sample("research_node_duration_seconds_count", agent="flaky_metrics", status="ok")
+    before_errors = sample("research_agent_errors_total", agent="flaky_metrics")
+
+    await agent.run_agent({"topic": "fine", "errors": []})
+    with pytest.raises(AgentError):
+        await agent.run_agent({"topic": "boom", "errors": []})
+
+    assert sample("research_node_duration_seconds_count", agent="flaky_metrics", status="ok") == before_ok + 1
+    assert sample("research_node_duration_seconds_count", agent="flaky_metrics", status="failed") >= 1
+    # One error from each run, plus the exception
+    assert sample("research_agent_errors_total", agent="flaky_metrics") == before_errors + 3
+
+
+@pytest.mark.asyncio
+async def test_transport_records_llm_latency_and_tokens():
+    transport = PooledLLMTransport(httpx.Limits())
+    usage = {"prompt_tokens": 120, "completion_tokens": 30}
+    body = json.dumps({"choices": [], "usage": usage}).encode()
+
+    class Body(httpx.AsyncByteStream):
+        # Unread like a network response, so the body passes through the transport's stream
+        async def __aiter__(self):
+            yield body
+
+    transport._transports[asyncio.get_running_loop()] = httpx.MockTransport(
+        lambda request: httpx.Response(200, stream=Body())
+    )
+    labels = {"agent": "metrics_test", "model": "metrics-model"}
+    token = current_agent.set("metrics_test")
+    try:
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.post("https://api.openai.com/v1/chat/completions", json={"model": "metrics-model", "messages": []})
+    finally:
+        current_agent.reset(token)
+
+    assert sample("research_llm_tokens_total", kind="prompt", **labels) == 120
+    assert sample("research_llm_tokens_total", kind="completion", **labels) == 30
+    assert sample("research_llm_request_duration_seconds_count", model="metrics-model", status="2xx") == 1
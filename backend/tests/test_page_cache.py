@@ -0,0 +1,117 @@
+import httpx
+import pytest
+from unittest.mock import patch
+from app.utils.cache import TieredCache
+from app.utils.page_cache import PageCache, cache_max_age, parse_domain_freshness
+from app.utils.scraper import PageFetcher, scrape_url
+
+PAGE = b"<html><head><title>Cached</title></head><body><p>Body</p></body></html>"
+
+
+def make_cache(tmp_path, **kwargs):
+    return PageCache(TieredCache("pages", path=str(tmp_path / "pages.sqlite")), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_not_modified_reuses_cached_extraction(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v1"'}, content=PAGE)
+
+    cache = make_cache(tmp_path)
+    fetcher = PageFetcher(transport=httpx.MockTransport(handler))
+
+    first = await scrape_url("https://example.com/page", fetcher=fetcher, cache=cache)
+    with patch("app.utils.scraper.parse_page") as mock_parse:
+        second = await scrape_url("https://example.com/page", fetcher=fetcher, cache=cache)
+        mock_parse.assert_not_called()
+    await fetcher.aclose()
+
+    assert first == second
+    assert second["title"] == "Cached"
+    assert "if-none-match" not in requests[0].headers
+    assert requests[1].headers["if-none-match"] == '"v1"'
+    assert cache.stats()["revalidated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_not_modified_updates_validators_and_freshness(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"etag": '"v2"', "cache-control": "max-age=3600"})
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v1"'}, content=PAGE)
+
+    cache = make_cache(tmp_path)
+    fetcher = PageFetcher(transport=httpx.MockTransport(handler))
+    for _ in range(3):
+        await scrape_url("https://example.com/page", fetcher=fetcher, cache=cache)
+    await fetcher.aclose()
+
+    # The third call is fresh for the max-age sent with the 304
+    assert len(requests) == 2
+    entry = cache.lookup("https://example.com/page", 5000)
+    assert entry["etag"] == '"v2"' and entry["max_age"] == 3600 and entry["fresh"]
+
+
+@pytest.mark.asyncio
+async def test_last_modified_is_sent_as_if_modified_since(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, headers={"last-modified": "Wed, 21 Oct 2015 07:28:00 GMT"}, content=PAGE)
+
+    cache = make_cache(tmp_path)
+    fetcher = PageFetcher(transport=httpx.MockTransport(handler))
+    await scrape_url("https://example.com/lm", fetcher=fetcher, cache=cache)
+    await scrape_url("https://example.com/lm", fetcher=fetcher, cache=cache)
+    await fetcher.aclose()
+
+    assert requests[1].headers["if-modified-since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+@pytest.mark.asyncio
+async def test_domain_freshness_skips_revalidation(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request.url.host)
+        return httpx.Response(200, content=PAGE)
+
+    cache = make_cache(tmp_path, domain_freshness={"wikipedia.org": 3600})
+    fetcher = PageFetcher(transport=httpx.MockTransport(handler))
+    for _ in range(2):
+        await scrape_url("https://en.wikipedia.org/wiki/X", fetcher=fetcher, cache=cache)
+        await scrape_url("https://example.com/x", fetcher=fetcher, cache=cache)
+    await fetcher.aclose()
+
+    # Wikipedia is served fresh from cache; example.com has no validators so is refetched
+    assert requests == ["en.wikipedia.org", "example.com", "example.com"]
+
+
+def test_parse_domain_freshness():
+    assert parse_domain_freshness("wikipedia.org=86400, .python.org=60,bad,x=y") == {
+        "wikipedia.org": 86400,
+        "python.org": 60,
+    }
+    cache = PageCache(None, default_freshness=5, domain_freshness={"python.org": 60, "docs.python.org": 600})
+    assert cache.freshness_for("https://docs.python.org/3/") == 600
+    assert cache.freshness_for("https://www.python.org/") == 60
+    assert cache.freshness_for("https://example.com/") == 5
+    # A domain override beats the server's max-age, which beats the default
+    assert cache.freshness_for("https://docs.python.org/3/", max_age=30) == 600
+    assert cache.freshness_for("https://example.com/", max_age=30) == 30
+
+
+def test_cache_max_age():
+    assert cache_max_age(httpx.Headers({"cache-control": "public, max-age=300"})) == 300
+    assert cache_max_age(httpx.Headers({"cache-control": "no-cache, max-age=300"})) == 0
+    assert cache_max_age(httpx.Headers({"cache-control": "private"})) is None
+    assert cache_max_age(httpx.Headers({})) is None
@@ -0,0 +1,25 @@
+from app.utils.retrieval import BM25Index, chunk_text, tokenize
+from app.utils.tokens import count_tokens
+
+
+def test_bm25_ranks_relevant_documents_first():
+    index = BM25Index([
+        "Battery chemistry and cell architecture of solid state packs.",
+        "Market size of electric vehicles grew, with revenue and demand rising.",
+        "The market for used cars is cooling.",
+        "Unrelated note about office furniture.",
+    ])
+    hits = index.search("EV market revenue growth", k=2)
+
+    assert [doc for doc, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("quantum", k=3) == []
+
+
+def test_chunk_text_respects_token_size():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 60 for i in range(10)) + "\n\n" + "long " * 500
+    chunks = chunk_text(text, 100)
+
+    assert len(chunks) > 5
+    assert all(count_tokens(c) <= 100 for c in chunks)
+    assert sum(len(tokenize(c)) for c in chunks) == len(tokenize(text))
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+from app.core.routing import route_question, route_questions, normalize_questions, question_concurrency
+
+
+def test_route_questions_assigns_each_question_once():
+    plan = {
+        "questions": [
+            {"id": "q1", "question": "Stack", "category": "technical"},
+            {"id": "q2", "question": "Market size", "category": "market"},
+            {"id": "q3", "question": "Funding", "category": "general", "assigned_agent": "business_analyst"},
+            {"id": "q4", "question": "Specs", "category": "news"},
+            {"id": "q1", "question": "Duplicate id", "category": "technical"},
+            "Bare string question",
+        ],
+        "agent_assignments": {"q4": "technical_analyst"},
+    }
+
+    routes = route_questions(plan)
+
+    assert [q["id"] for q in routes["technical_analyst"]] == ["q1", "q4"]
+    assert [q["id"] for q in routes["business_analyst"]] == ["q2", "q3"]
+    assert [q["question"] for q in routes["web_researcher"]] == ["Bare string question"]
+    assert sum(len(qs) for qs in routes.values()) == 5
+
+
+def test_route_question_precedence():
+    plan = {"agent_assignments": {"q1": "technical_analyst"}}
+
+    # assigned_agent on the question wins over the plan and the category
+    assert route_question({"id": "q1", "category": "market", "assigned_agent": "web_researcher"}, plan) == "web_researcher"
+    assert route_question({"id": "q1", "category": "market"}, plan) == "technical_analyst"
+    # Unknown agents fall back to the category, unknown categories to the web researcher
+    assert route_question({"id": "q2", "category": "industry", "assigned_agent": "oracle"}) == "business_analyst"
+    assert route_question({"id": "q3", "category": "philosophy"}) == "web_researcher"
+    assert route_question({"id": "q4", "assigned_agent": "market_analyst"}) == "business_analyst"
+
+
+def test_normalize_questions_handles_missing_plan():
+    assert normalize_questions(None) == []
+    assert route_questions(None) == {"web_researcher": [], "technical_analyst": [], "business_analyst": []}
+
+
+def test_question_concurrency_respects_configured_cap():
+    with patch("app.core.routing.settings") as mock_settings:
+        mock_settings.MAX_CONCURRENT_QUESTIONS = 4
+        assert question_concurrency({}) == 4
+        assert question_concurrency({"max_concurrency": 2}) == 2
+        assert question_concurrency({"max_concurrency": 10}) == 4
+        assert question_concurrency({"max_concurrency": "bogus"}) == 4
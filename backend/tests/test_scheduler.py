@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.routes import research
+from app.core.config import settings
+from app.core.scheduler import RunScheduler, SchedulerFullError
+
+
+@pytest.mark.asyncio
+async def test_scheduler_caps_concurrency_and_orders_queue():
+    scheduler = RunScheduler(max_concurrent=2, max_queued=10, per_client=10)
+    release = asyncio.Event()
+    started = []
+
+    def job(name):
+        async def run():
+            started.append(name)
+            await release.wait()
+        return run
+
+    assert scheduler.submit("a1", job("a1"), client_id="a") == 0
+    assert scheduler.submit("a2", job("a2"), client_id="a") == 0
+    assert scheduler.submit("a3", job("a3"), client_id="a") == 1
+    # Client a already has two runs executing, so b goes first
+    assert scheduler.submit("b1", job("b1"), client_id="b") == 1
+    assert scheduler.submit("urgent", job("urgent"), client_id="a", priority=5) == 1
+    assert [scheduler.position(r) for r in ("urgent", "b1", "a3")] == [1, 2, 3]
+
+    await asyncio.sleep(0)
+    assert started == ["a1", "a2"]
+    release.set()
+    await scheduler.join()
+
+    assert started == ["a1", "a2", "urgent", "b1", "a3"]
+    assert scheduler.stats()["completed"] == 5
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_over_quota_and_full_queue():
+    scheduler = RunScheduler(max_concurrent=1, max_queued=1, per_client=2, run_estimate=30)
+    never = asyncio.Event()
+
+    async def run():
+        await never.wait()
+
+    scheduler.submit("a1", run, client_id="a")
+    scheduler.submit("a2", run, client_id="a")
+    with pytest.raises(SchedulerFullError):
+        scheduler.submit("a3", run, client_id="a")
+    with pytest.raises(SchedulerFullError) as full:
+        scheduler.submit("b1", run, client_id="b")
+
+    # One queued run ahead over one slot: about two run lengths
+    assert full.value.retry_after == 60
+    assert scheduler.submit("recovered", run, client_id="recovery", force=True) == 1
+    assert scheduler.stats()["rejected"] == 2
+    never.set()
+    await scheduler.join()
+
+
+def test_client_identity_trusts_x_client_id_only_from_configured_proxies():
+    client = TestClient(app)
+    with patch.object(research, "submit_run", return_value=0) as submit:
+        client.post("/research", json={"topic": "Spoofed"}, headers={"X-Client-Id": "someone-else"})
+        assert submit.call_args.args[2] == "testclient"
+
+        with patch.object(settings, "TRUSTED_CLIENT_ID_PROXIES", "10.0.0.5, testclient"):
+            client.post("/research", json={"topic": "Proxied"}, headers={"X-Client-Id": "user-42"})
+        assert submit.call_args.args[2] == "user-42"
+
+
+def test_start_research_does_not_overwrite_a_run_that_already_started():
+    from app.core.store import research_store
+
+    async def submit(state, r_id, client_id, priority=0):
+        # The run got going before the handler recorded "started"
+        research_store.update(r_id, {"status": "in_progress"})
+        return 0
+
+    with patch.object(research, "submit_run", submit):
+        response = TestClient(app).post("/research", json={"topic": "Fast"})
+
+    assert response.json()["status"] == "started"
+    assert research_store.get(response.json()["research_id"])["status"] == "in_progress"
+
+
+def test_start_research_rejects_out_of_range_priority():
+    client = TestClient(app)
+    assert client.post("/research", json={"topic": "T", "priority": 10**6}).status_code == 422
+    assert client.post("/research", json={"topic": "T", "priority": -1}).status_code == 422
+
+
+def test_start_research_returns_429_with_retry_after_when_full():
+    scheduler = RunScheduler(max_concurrent=1, max_queued=1, per_client=5)
+    released = threading.Event()
+
+    async def blocked_run(state, r_id, resume=False):
+        while not released.is_set():
+            await asyncio.sleep(0.01)
+
+    with patch.object(settings, "RESUME_ON_STARTUP", False), \
+         patch.object(research, "run_scheduler", scheduler), \
+         patch.object(research, "run_graph", blocked_run), \
+         TestClient(app) as client:
+        # One event loop for all requests, as under uvicorn
+        first = client.post("/research", json={"topic": "One"})
+        second = client.post("/research", json={"topic": "Two"})
+        third = client.post("/research", json={"topic": "Three"})
+        status = client.get(f"/research/{second.json()['research_id']}?fields=status").json()
+
+        released.set()
+        client.portal.call(scheduler.join)
+
+    assert first.json()["status"] == "started"
+    assert second.json()["status"] == "queued"
+    assert second.json()["queue_position"] == 1
+    assert status == {"status": "queued", "queue_position": 1}
+    assert third.status_code == 429
+    assert int(third.headers["Retry-After"]) > 0
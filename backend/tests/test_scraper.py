@@ -0,0 +1,110 @@
+import asyncio
+import httpx
+import pytest
+from app.utils.scraper import PageFetcher, scrape_url, scrape_urls
+
+PAGE = b"<html><head><title> Example </title></head><body><nav>menu</nav><p>Hello   world</p><script>x()</script></body></html>"
+
+
+@pytest.mark.asyncio
+async def test_scrape_url_extracts_text():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=PAGE))
+    fetcher = PageFetcher(transport=transport)
+
+    result = await scrape_url("https://example.com/a", fetcher=fetcher)
+    await fetcher.aclose()
+
+    assert result == {"title": "Example", "source": "https://example.com/a", "content": "Example\nHello\nworld"}
+
+
+@pytest.mark.asyncio
+async def test_scrape_url_returns_none_on_http_error():
+    transport = httpx.MockTransport(lambda request: httpx.Response(404))
+    fetcher = PageFetcher(transport=transport)
+
+    assert await scrape_url("https://example.com/missing", fetcher=fetcher) is None
+    await fetcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_scrape_urls_respects_per_host_limit_and_yields_in_completion_order():
+    active = {"example.com": 0, "other.com": 0}
+    peak = {"example.com": 0, "other.com": 0}
+    delays = {"/slow": 0.05, "/fast": 0.0}
+
+    async def handler(request: httpx.Request):
+        host = request.url.host
+        active[host] += 1
+        peak[host] = max(peak[host], active[host])
+        await asyncio.sleep(delays.get(request.url.path, 0.01))
+        active[host] -= 1
+        return httpx.Response(200, content=PAGE)
+
+    fetcher = PageFetcher(max_connections=10, max_per_host=2, transport=httpx.MockTransport(handler))
+    urls = ["https://other.com/slow", "https://other.com/fast"] + [f"https://example.com/{i}" for i in range(6)]
+
+    order = [url async for url, result in scrape_urls(urls, fetcher=fetcher)]
+    await fetcher.aclose()
+
+    assert sorted(order) == sorted(urls)
+    assert order.index("https://other.com/fast") < order.index("https://other.com/slow")
+    assert peak["example.com"] == 2
+    # Host limits are dropped once nothing holds or waits for them
+    assert fetcher._host_limits == {} and fetcher._host_users == {}
+
+
+@pytest.mark.asyncio
+async def test_non_html_responses_are_skipped_without_reading_body():
+    class UnreadableStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            raise AssertionError("body should not be read")
+            yield b""
+
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"content-type": "application/pdf"}, stream=UnreadableStream())
+    )
+    fetcher = PageFetcher(transport=transport)
+
+    assert await scrape_url("https://example.com/file.pdf", fetcher=fetcher) is None
+    await fetcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_caps_downloaded_bytes():
+    big_page = b"<html><body>" + b"<p>filler text</p>" * 1000 + b"</body></html>"
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=big_page)
+    )
+    fetcher = PageFetcher(transport=transport)
+
+    html = await fetcher.fetch_html("https://example.com/big", max_bytes=1024)
+    await fetcher.aclose()
+
+    assert len(html) == 1024
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+def test_parser_backends_extract_the_same_text(parser):
+    from app.utils.scraper import extract_text
+
+    result = extract_text(PAGE, "https://example.com", parser=parser)
+
+    assert result == {"title": "Example", "source": "https://example.com", "content": "Example\nHello\nworld"}
+
+
+@pytest.mark.asyncio
+async def test_large_pages_are_parsed_in_process_pool():
+    from unittest.mock import patch
+    from app.utils import scraper
+
+    big_page = b"<html><head><title>Big</title></head><body>" + b"<p>word</p>" * 2000 + b"</body></html>"
+    with patch.object(scraper.settings, "SCRAPER_INLINE_PARSE_BYTES", 1024), \
+         patch.object(scraper.settings, "SCRAPER_PARSE_WORKERS", 1):
+        try:
+            result = await scraper.parse_page(big_page, "https://example.com/big", max_chars=100)
+            assert scraper._parse_pool is not None
+        finally:
+            scraper.shutdown_parse_pool()
+
+    assert result["title"] == "Big"
+    assert result["content"].endswith("... (truncated)")
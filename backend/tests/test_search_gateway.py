@@ -0,0 +1,180 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from app.core import search
+from app.core.search import (
+    AdaptiveConcurrency,
+    CircuitBreaker,
+    SearchGateway,
+    SearchUnavailableError,
+    is_rate_limited,
+)
+from app.main import app
+from app.utils.cache import TieredCache
+
+
+class RatelimitException(Exception):
+    pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_gateway(failures=3, cooldown=30.0, clock=None, max_retries=2, concurrency=4):
+    breaker = CircuitBreaker(failures, cooldown, clock=clock or Clock())
+    return SearchGateway(
+        breaker,
+        AdaptiveConcurrency(concurrency, decrease_interval=0),
+        max_retries=max_retries,
+        backoff_base=0.001,
+        backoff_max=0.01,
+    )
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(RatelimitException("https://duckduckgo.com 202 Ratelimit"))
+    assert is_rate_limited(Exception("HTTP 429 Too Many Requests"))
+    assert not is_rate_limited(ValueError("bad query"))
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    clock = Clock()
+    breaker = CircuitBreaker(2, cooldown=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "open"
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()  # only one at a time
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "open"
+    assert breaker.snapshot()["trips"] == 2
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.snapshot()["state"] == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_adaptive_concurrency_aimd():
+    limiter = AdaptiveConcurrency(8, min_limit=2, decrease_interval=0)
+    limiter.on_overload()
+    assert limiter.limit == 4
+    limiter.on_overload()
+    limiter.on_overload()
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == 3
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_limits_slots():
+    limiter = AdaptiveConcurrency(2)
+    running, peak = 0, 0
+
+    async def work():
+        nonlocal running, peak
+        async with limiter.slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(work() for _ in range(6)))
+    assert peak == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_rate_limited_searches(tmp_path):
+    gateway = make_gateway()
+    tool = MagicMock()
+    tool.invoke.side_effect = [RatelimitException("202 Ratelimit"), "results"]
+
+    with patch.object(search, "search_cache", TieredCache("search", path=str(tmp_path / "s.sqlite"))):
+        assert await gateway.search(tool, "ai chips") == "results"
+
+    assert tool.invoke.call_count == 2
+    stats = gateway.stats()
+    assert stats["retries"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["concurrency"]["limit"] == 2
+    assert stats["breaker"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried(tmp_path):
+    gateway = make_gateway()
+    tool = MagicMock()
+    tool.invoke.side_effect = ValueError("bad query")
+
+    with patch.object(search, "search_cache", TieredCache("search", path=str(tmp_path / "s.sqlite"))):
+        with pytest.raises(ValueError):
+            await gateway.search(tool, "ai chips")
+
+    assert tool.invoke.call_count == 1
+    assert gateway.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_serves_stale_results_or_fails_fast(tmp_path):
+    cache = TieredCache("search", path=str(tmp_path / "s.sqlite"))
+    gateway = make_gateway(failures=2, max_retries=1)
+    tool = MagicMock()
+    tool.invoke.side_effect = RatelimitException("202 Ratelimit")
+
+    with patch.object(search, "search_cache", cache), \
+         patch.object(search.settings, "SEARCH_CACHE_TTL_SECONDS", -1):
+        # Past the TTL, so never a hit, but fine as a fallback
+        cache.set("ai chips", "old results")
+        assert await gateway.search(tool, "AI chips") == "old results"
+        assert gateway.stats()["breaker"]["state"] == "open"
+        calls = tool.invoke.call_count
+
+        with pytest.raises(SearchUnavailableError):
+            await gateway.search(tool, "robotics")
+        assert await gateway.search(tool, "ai chips") == "old results"
+
+    # Nothing reached the provider while the circuit was open
+    assert tool.invoke.call_count == calls == 2
+    stats = gateway.stats()
+    assert stats["stale_served"] == 2
+    assert stats["fast_failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_the_circuit(tmp_path):
+    clock = Clock()
+    gateway = make_gateway(failures=1, cooldown=30, clock=clock, max_retries=0)
+    tool = MagicMock()
+    tool.invoke.side_effect = [TimeoutError("read timeout"), "results"]
+
+    with patch.object(search, "search_cache", TieredCache("search", path=str(tmp_path / "s.sqlite"))):
+        with pytest.raises(TimeoutError):
+            await gateway.search(tool, "quantum")
+        with pytest.raises(SearchUnavailableError):
+            await gateway.search(tool, "quantum")
+        clock.now = 31
+        assert await gateway.search(tool, "quantum") == "results"
+
+    assert gateway.stats()["breaker"]["state"] == "closed"
+
+
+def test_search_health_endpoint():
+    response = TestClient(app).get("/health/search")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["breaker"]["state"] in ("closed", "open", "half_open")
+    assert "limit" in body["concurrency"]
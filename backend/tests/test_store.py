@@ -0,0 +1,82 @@
+import pytest
+from app.core.store import MemoryResearchStore, SQLiteResearchStore, build_research_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryResearchStore({})
+    return SQLiteResearchStore(str(tmp_path / "research.sqlite"))
+
+
+def test_create_update_and_get(store):
+    store.create("r1", {"topic": "EVs", "status": "started", "errors": []})
+    store.create("r2", {"topic": "AI", "status": "started", "errors": []})
+
+    updated = store.update("r1", {"status": "error", "errors": ["boom"]})
+
+    assert updated == {"topic": "EVs", "status": "error", "errors": ["boom"]}
+    assert store.get("r1") == updated
+    assert store.get("missing") is None
+    assert store.update("missing", {"status": "error"}) is None
+
+    store.delete("r2")
+    assert store.get("r2") is None
+
+
+def test_save_replaces_state_and_status_index(store):
+    store.create("r1", {"topic": "EVs", "status": "started"})
+    store.create("r2", {"topic": "AI", "status": "started"})
+    store.save("r1", {"topic": "EVs", "status": "complete", "html_output": "<html></html>"})
+
+    assert store.get("r1")["html_output"] == "<html></html>"
+    assert store.list_by_status("started") == ["r2"]
+    assert store.list_by_status("complete") == ["r1"]
+
+
+def test_field_projection_and_progress_after(store):
+    log = [{"seq": i, "type": "progress", "message": f"m{i}"} for i in range(1, 6)]
+    store.create("r1", {"topic": "EVs", "status": "in_progress", "html_output": "<html></html>", "progress_log": log})
+
+    assert store.get_fields("r1", ["status", "missing"]) == {"status": "in_progress", "missing": None}
+    assert [e["seq"] for e in store.get_progress("r1", after=3)] == [4, 5]
+    assert store.get_progress("r1", after=5) == []
+    assert store.get_fields("missing", ["status"]) is None
+    assert store.get_progress("missing") is None
+
+
+def test_claim_is_conditional_on_status(store):
+    store.create("r1", {"topic": "EVs", "status": "error"})
+
+    assert store.claim("r1", ["error", "failed"], "resuming") is True
+    assert store.claim("r1", ["error", "failed"], "resuming") is False
+    assert store.get("r1")["status"] == "resuming"
+    assert store.list_by_status("resuming") == ["r1"]
+    assert store.claim("missing", ["error"], "resuming") is False
+
+
+def test_traces_are_stored_apart_from_the_state(store):
+    store.create("r1", {"topic": "EVs", "status": "complete"})
+    store.save_trace("r1", {"spans": [{"id": 1}]})
+
+    assert store.get_trace("r1") == {"spans": [{"id": 1}]}
+    assert "spans" not in store.get("r1")
+    store.delete("r1")
+    assert store.get_trace("r1") is None
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "research.sqlite")
+    api_worker = SQLiteResearchStore(path)
+    other_worker = SQLiteResearchStore(path)
+
+    api_worker.create("r1", {"topic": "EVs", "status": "started"})
+    other_worker.update("r1", {"status": "complete"})
+
+    assert api_worker.get("r1")["status"] == "complete"
+    assert api_worker._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_build_research_store_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        build_research_store("redis")
@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.utils.tokens import (
+    BudgetItem,
+    TokenBudget,
+    context_limit,
+    count_tokens,
+    priority_weight,
+    truncate_tokens,
+)
+
+
+def test_context_limit_resolves_snapshots_and_overrides():
+    assert context_limit("gpt-4o-mini-2024-07-18") == 128000
+    assert context_limit("gpt-4-0613") == 8192
+    assert context_limit("unknown-model") == 8192
+    with patch.object(settings, "MODEL_CONTEXT_LIMITS", "unknown-model=32000, bad"):
+        assert context_limit("unknown-model") == 32000
+
+
+def test_truncate_tokens_respects_limit():
+    text = "word " * 1000
+    cut = truncate_tokens(text, 100)
+    assert count_tokens(cut) <= 100
+    assert cut.endswith("...(truncated)...")
+    assert truncate_tokens("short", 100) == "short"
+
+
+def test_budget_caps_and_weights():
+    with patch.object(settings, "LLM_OUTPUT_TOKEN_RESERVE", 1000):
+        assert TokenBudget("gpt-4", max_tokens=None).total == 8192 - 1000
+        assert TokenBudget("gpt-4o", max_tokens=4000, weight=priority_weight(1)).total == 1600
+    assert priority_weight(5) == 1.0
+    assert priority_weight(None) == priority_weight(3)
+
+
+def test_fill_trims_lowest_priority_and_keeps_order():
+    budget = TokenBudget("gpt-4o", max_tokens=260)
+    items = [
+        BudgetItem("a" * 400, priority=1),
+        BudgetItem("b" * 400, priority=5),
+        BudgetItem("c" * 400, priority=3),
+        BudgetItem("d" * 400, priority=1),
+    ]
+    kept = budget.fill(items)
+
+    # b and c fit whole, a is cut to the remaining budget, d is dropped
+    assert kept[1:] == ["b" * 400, "c" * 400]
+    assert kept[0].startswith("a") and len(kept[0]) < 400
+    assert budget.used <= budget.total
+    assert budget.trimmed > 100
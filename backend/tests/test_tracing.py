@@ -0,0 +1,207 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from app.api.routes import research
+from app.core import search
+from app.core.graph import build_research_graph
+from app.core.store import research_store
+from app.core.tracing import (
+    active_trace, chrome_trace, critical_path, end_run_trace, span, start_run_trace, trace_summary,
+)
+from app.main import app
+
+client = TestClient(app)
+
+
+def make_span(id, parent, cat, start, end, name=None):
+    return {"id": id, "parent": parent, "name": name or cat, "cat": cat, "start": start, "end": end, "args": {}}
+
+
+def test_spans_nest_under_the_current_span():
+    async def work():
+        trace = start_run_trace("nesting")
+        with span("planner", "node"):
+            await asyncio.gather(*(search_like(i) for i in range(2)))
+        with span("outside", "node"):
+            pass
+        assert active_trace("nesting") is not None
+        return end_run_trace(trace, status="complete")
+
+    async def search_like(i):
+        with span("search", "search", query=f"q{i}") as s:
+            await asyncio.sleep(0.01)
+            s.set(result_chars=10)
+
+    trace = asyncio.run(work())
+    spans = {s["id"]: s for s in trace["spans"]}
+    root, planner, *searches, outside = trace["spans"]
+    assert root["name"] == "run" and root["args"]["status"] == "complete"
+    assert planner["parent"] == root["id"] and outside["parent"] == root["id"]
+    assert [s["parent"] for s in searches] == [planner["id"]] * 2
+    assert searches[0]["args"] == {"query": "q0", "result_chars": 10}
+    assert all(s["end"] >= s["start"] for s in spans.values())
+    assert active_trace("nesting") is None
+
+
+def test_spans_outside_a_run_are_ignored():
+    with span("search", "search") as s:
+        s.set(result_chars=1)
+    assert s.id is None
+
+
+def test_critical_path_follows_the_latest_finishing_children():
+    spans = [
+        make_span(1, None, "run", 0, 10),
+        make_span(2, 1, "node", 0, 2, "planner"),
+        # Two concurrent researchers; the slower one gates the run
+        make_span(3, 1, "node", 2, 5, "web"),
+        make_span(4, 1, "node", 2, 8, "tech"),
+        make_span(5, 4, "llm", 3, 7),
+        make_span(6, 1, "node", 8, 10, "synth"),
+    ]
+    assert [s["id"] for s in critical_path(spans)] == [1, 2, 4, 5, 6]
+
+    summary = trace_summary({"spans": spans, "dropped": 0})
+    assert summary["wall_seconds"] == 10
+    assert summary["network_seconds"] == 4
+    assert summary["network_share"] == 0.4
+    assert summary["by_category"]["node"] == 10
+    assert [p["name"] for p in summary["critical_path"]] == ["run", "planner", "tech", "llm", "synth"]
+
+
+def test_queue_waits_are_neither_network_nor_cpu():
+    spans = [
+        make_span(1, None, "run", 0, 10),
+        make_span(2, 1, "node", 0, 10, "web"),
+        # Queued for a search slot, then for the LLM rate limit while a search runs
+        make_span(3, 2, "queue", 0, 3, "search_slot_wait"),
+        make_span(4, 2, "search", 3, 5),
+        make_span(5, 2, "queue", 4, 7, "rate_limit_wait"),
+        make_span(6, 2, "llm", 7, 8),
+    ]
+    summary = trace_summary({"spans": spans, "dropped": 0})
+    assert summary["network_seconds"] == 3
+    # Only waits with no network call in flight count as queue time
+    assert summary["queue_seconds"] == 5
+    assert summary["cpu_seconds"] == 2
+    assert summary["queue_share"] == 0.5 and summary["cpu_share"] == 0.2
+
+
+def test_rate_limit_and_search_slot_waits_are_traced_as_queue_spans():
+    from app.core.llm_clients import ModelRateLimiter
+
+    async def work():
+        trace = start_run_trace("queued")
+        slots = search.AdaptiveConcurrency(1)
+
+        async def searcher(i):
+            async with slots.slot(query=f"q{i}"):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(searcher(0), searcher(1))
+        limiter = ModelRateLimiter("m", rpm=0, tpm=6000)  # 100 tokens per second
+        await limiter.acquire(6000)
+        await limiter.acquire(2)
+        return end_run_trace(trace)
+
+    trace = asyncio.run(work())
+    queued = [s for s in trace["spans"] if s["cat"] == "queue"]
+    # Only calls that actually waited get a span
+    assert [s["name"] for s in queued] == ["search_slot_wait", "rate_limit_wait"]
+    assert queued[0]["args"] == {"query": "q1"}
+    assert queued[1]["args"]["model"] == "m"
+    assert trace_summary(trace)["queue_seconds"] > 0
+
+
+def test_chrome_trace_rows_nest_properly():
+    spans = [
+        make_span(1, None, "run", 0, 10),
+        make_span(2, 1, "node", 1, 6, "web"),
+        make_span(3, 1, "node", 2, 8, "tech"),
+        make_span(4, 2, "search", 1.5, 5),
+        make_span(5, 3, "search", 3, 7),
+    ]
+    trace = chrome_trace({"research_id": "r", "started_at": 0, "spans": spans, "dropped": 0})
+    events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert events[1]["ts"] == 1_000_000 and events[1]["dur"] == 5_000_000
+    by_row = {}
+    for e in events:
+        by_row.setdefault(e["tid"], []).append(e)
+    # Complete events on one row must nest or not overlap at all
+    for row in by_row.values():
+        for a in row:
+            for b in row:
+                a_end, b_end = a["ts"] + a["dur"], b["ts"] + b["dur"]
+                overlap = a["ts"] < b_end and b["ts"] < a_end
+                nested = (a["ts"] <= b["ts"] and b_end <= a_end) or (b["ts"] <= a["ts"] and a_end <= b_end)
+                assert not overlap or nested
+    # Each search sits on its node's row
+    tid = {e["args"]["span_id"]: e["tid"] for e in events}
+    assert tid[4] == tid[2] and tid[5] == tid[3]
+    assert trace["summary"]["critical_path"][0]["name"] == "run"
+
+
+def traced_graph():
+    plan = {"questions": [{"id": "q1", "question": "Stack", "category": "technical"}]}
+    tool = MagicMock()
+    tool.invoke.return_value = "search results"
+
+    async def planner(state):
+        return {"research_plan": plan}
+
+    async def analyst(state):
+        await search.run_search(tool, "tracing stack question")
+        return {"technical_findings": [{"question": "Stack"}]}
+
+    async def nothing(state):
+        return {}
+
+    with patch("app.core.graph.ResearchPlannerAgent") as MockPlanner, \
+         patch("app.core.graph.WebResearcherAgent") as MockWeb, \
+         patch("app.core.graph.TechnicalAnalystAgent") as MockTech, \
+         patch("app.core.graph.BusinessAnalystAgent") as MockBiz, \
+         patch("app.core.graph.ContentSynthesizerAgent") as MockSynth, \
+         patch("app.core.graph.QualityReviewerAgent") as MockReview, \
+         patch("app.core.graph.HTMLDesignerAgent") as MockHTML:
+        MockPlanner.return_value.run_agent = planner
+        MockTech.return_value.run_agent = analyst
+        for mock in (MockWeb, MockBiz, MockSynth, MockReview, MockHTML):
+            mock.return_value.run_agent = nothing
+        return build_research_graph()
+
+
+@pytest.mark.asyncio
+async def test_run_graph_stores_a_trace_per_run():
+    state = research.initial_research_state("traced-run", "Tracing", {})
+    research_store.create("traced-run", state)
+
+    with patch.object(research, "research_graph", traced_graph()), \
+         patch.object(search, "search_cache", None):
+        await research.run_graph(state, "traced-run")
+
+    trace = research_store.get_trace("traced-run")
+    spans = {s["name"]: s for s in trace["spans"]}
+    assert spans["run"]["args"]["status"] == "complete"
+    assert spans["research_planner"]["parent"] == spans["run"]["id"]
+    assert spans["technical_analyst"]["args"]["question_id"] == "q1"
+    # The search made inside the node is its child
+    assert spans["search"]["parent"] == spans["technical_analyst"]["id"]
+    assert spans["search"]["args"]["outcome"] == "ok"
+
+
+def test_trace_endpoint():
+    research_store.create("trace-api", {"topic": "T", "status": "complete"})
+    research_store.save_trace("trace-api", {
+        "research_id": "trace-api", "started_at": 0, "dropped": 0,
+        "spans": [make_span(1, None, "run", 0, 2), make_span(2, 1, "llm", 0.5, 1.5)],
+    })
+
+    body = client.get("/research/trace-api/trace").json()
+    assert [e["name"] for e in body["traceEvents"] if e["ph"] == "X"] == ["run", "llm"]
+    assert body["summary"]["network_share"] == 0.5
+
+    research_store.create("untraced", {"topic": "T", "status": "queued"})
+    assert client.get("/research/untraced/trace").status_code == 404
+    assert client.get("/research/missing/trace").json()["detail"] == "Research not found"
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { ResearchState, ResearchResponse, Customization } from '../types/research';
+import { ResearchState, ResearchResponse, ResearchProgress, Customization } from '../types/research';
 
 // Use Next.js proxy to avoid CORS
 const API_URL = '/api';
@@ -24,4 +24,12 @@ export const getResearchState = async (researchId: string): Promise<ResearchStat
     return response.data;
 };
 
+// Cheap poll: only status and the progress events after `afterSeq`
+export const getResearchProgress = async (researchId: string, afterSeq: number): Promise<ResearchProgress> => {
+    const response = await api.get<ResearchProgress>(`/research/${researchId}`, {
+        params: { fields: 'status,progress_log', after: afterSeq },
+    });
+    return response.data;
+};
+
 export default api;
@@ -1,6 +1,6 @@
 import { create } from 'zustand';
-import { Customization, ChatMessage } from '../types/research';
-import { startResearch, getResearchState } from './api';
+import { Customization, ChatMessage, ResearchState } from '../types/research';
+import { startResearch, getResearchState, getResearchProgress } from './api';
 import { v4 as uuidv4 } from 'uuid';
 
 interface ChatStore {
@@ -68,25 +68,32 @@ export const useChatStore = create<ChatStore>((set, get) => ({
     },
 
     pollActiveRequest: async (researchId, messageId) => {
+        let lastSeq = 0;
+        let progress: string[] = [];
         const pollInterval = setInterval(async () => {
             const { updateMessage } = get();
             try {
-                const data = await getResearchState(researchId);
+                // Poll only new progress events; the full state is fetched once at the end
+                const update = await getResearchProgress(researchId, lastSeq);
+                lastSeq = update.last_seq;
+                progress = [...progress, ...update.progress_log.map((e) => e.message)];
 
+                const current = get().messages.find((m) => m.id === messageId)?.researchState;
                 updateMessage(messageId, {
-                    researchState: data,
-                    // Update sources if available
-                    sources: [
-                        ...data.web_findings,
-                        ...data.technical_findings,
-                        ...data.business_findings
-                    ]
+                    researchState: { ...current, status: update.status, progress_updates: progress } as ResearchState
                 });
 
-                if (data.status === 'complete' || data.status === 'error' || !!data.html_output) {
+                if (update.status === 'complete' || update.status === 'error' || update.status === 'failed') {
                     clearInterval(pollInterval);
+                    const data = await getResearchState(researchId);
                     set({ isLoading: false });
                     updateMessage(messageId, {
+                        researchState: data,
+                        sources: [
+                            ...data.web_findings,
+                            ...data.technical_findings,
+                            ...data.business_findings
+                        ],
                         isThinking: false,
                         content: data.synthesized_content || "Research complete."
                     });
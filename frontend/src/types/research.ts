@@ -17,6 +17,14 @@ export interface Customization {
     tone: 'professional' | 'academic' | 'creative';
 }
 
+export interface ProgressEvent {
+    seq: number;
+    type: 'progress' | 'error' | 'status';
+    node: string | null;
+    message: string;
+    ts: number;
+}
+
 export interface ResearchState {
     topic: string;
     customization: Customization;
@@ -27,12 +35,21 @@ export interface ResearchState {
     synthesized_content: string | null;
     html_output: string | null;
     quality_report: { score: number; critique: string } | null;
-    status: "started" | "in_progress" | "complete" | "error";
+    status: "queued" | "started" | "resuming" | "in_progress" | "complete" | "error" | "failed";
+    queue_position?: number;
     progress_updates: string[];
     errors: string[];
+    progress_log?: ProgressEvent[];
     metadata: Record<string, unknown>;
 }
 
+// Response of GET /research/{id}?fields=status,progress_log&after=N
+export interface ResearchProgress {
+    status: ResearchState["status"];
+    progress_log: ProgressEvent[];
+    last_seq: number;
+}
+
 export type MessageType = 'user' | 'assistant';
 
 export interface ChatMessage {